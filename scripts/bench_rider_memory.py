@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memória: dicionários por ciclista vs RiderRecord.
+
+Uso:
+    python bench_rider_memory.py [n_ciclistas] [ficheiro.csv]
+
+Replica as linhas de worldtour_2026_complete.csv até n_ciclistas (100k por
+omissão) e mede, com tracemalloc, a memória retida por ciclista:
+
+- dict: o que os scripts fazem hoje (csv.DictReader + dict por linha,
+  todas as strings como objetos novos);
+- RiderRecord: __slots__, strings repetidas internadas, números tipados.
+"""
+
+import csv
+import gc
+import io
+import sys
+import tracemalloc
+
+from rider_record import FIELDNAMES, RiderRecord
+
+
+def load_csv_text(filename: str, n: int) -> str:
+    """Gera um CSV com n linhas a partir das linhas do ficheiro de exemplo."""
+    with open(filename, 'r', encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f))
+
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=FIELDNAMES, extrasaction='ignore')
+    writer.writeheader()
+    for i in range(n):
+        row = dict(rows[i % len(rows)])
+        # Nomes únicos, como num plantel real; equipas/países/categorias repetem-se
+        row['last_name'] = f"{row['last_name']} {i}"
+        writer.writerow(row)
+    return out.getvalue()
+
+
+def measure(build) -> tuple:
+    """Memória retida (bytes) pelo resultado de build()."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, result
+
+
+def build_dicts(text: str) -> list:
+    return [dict(row) for row in csv.DictReader(io.StringIO(text))]
+
+
+def build_records(text: str) -> list:
+    return [RiderRecord.from_row(row) for row in csv.DictReader(io.StringIO(text))]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    filename = sys.argv[2] if len(sys.argv) > 2 else 'worldtour_2026_complete.csv'
+
+    text = load_csv_text(filename, n)
+
+    dict_bytes, dicts = measure(lambda: build_dicts(text))
+    del dicts
+    record_bytes, records = measure(lambda: build_records(text))
+    del records
+
+    print(f"{'=' * 60}")
+    print(f"Memória por ciclista ({n:,} ciclistas)")
+    print(f"{'=' * 60}")
+    print(f"  dict:        {dict_bytes / n:8.1f} bytes  ({dict_bytes / 1e6:7.1f} MB)")
+    print(f"  RiderRecord: {record_bytes / n:8.1f} bytes  ({record_bytes / 1e6:7.1f} MB)")
+    print(f"  Redução:     {(1 - record_bytes / dict_bytes) * 100:8.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Geração em massa de equipas bot para testes de carga.
+
+O BotTeamGenerator da app cria as equipas uma a uma; aqui geram-se 10k a 1M
+equipas válidas de uma vez a partir do CSV final de ciclistas:
+
+- composição exata por categoria do FantasyGameRules (3 GC, 3 CLIMBER,
+  3 SPRINT, 2 TT, 2 HILLS, 2 ONEDAY), custo <= 100M e no máximo 3
+  ciclistas da mesma equipa;
+- estratégia por equipa como no selectStrategy da app (40% BALANCED,
+  20% CLIMBER_HEAVY, 15% SPRINTER_HEAVY, 15% GC_FOCUSED, 10% VALUE_PICKS);
+  a estratégia muda o peso de cada ciclista dentro da sua categoria;
+- amostragem vetorizada em blocos: cada categoria é sorteada pelos pesos
+  para o bloco inteiro (um searchsorted na distribuição acumulada) e as
+  linhas com repetidos, acima do orçamento ou com mais de 3 da mesma
+  equipa voltam a ser sorteadas;
+- 8 ativos e capitão como em selectActiveCyclists / selectCaptain;
+- com a mesma semente, o resultado é sempre o mesmo.
+
+Cada bloco é escrito e descartado, por isso a memória não cresce com o
+número de equipas. A saída é NDJSON (uma equipa por linha) ou SQLite com as
+tabelas fantasy_teams e team_cyclists da app, conforme a extensão.
+
+Uso:
+    pip install numpy
+    python bot_teams.py ciclistas_final.csv n_equipas output.ndjson|output.db [--seed 42]
+    python bot_teams.py --bench [n_equipas]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("A instalar numpy...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "numpy"])
+    import numpy as np
+
+from fantasy_rules import CATEGORY_REQUIREMENTS, INITIAL_BUDGET, MAX_FROM_SAME_PRO_TEAM
+from rider_record import read_csv
+from squad_solver import CATEGORIES, RiderPool, random_pool, to_units
+
+SEASON = 2026
+CHUNK_SIZE = 10_000
+MAX_RESAMPLES = 200
+ACTIVE_TOP = 6
+ACTIVE_RANDOM = 2
+BOT_USER_PREFIX = 'bot_user_'
+
+# BotTeamGenerator.selectStrategy: (estratégia, percentagem), por ordem
+STRATEGIES = [
+    ('BALANCED', 40),
+    ('CLIMBER_HEAVY', 20),
+    ('SPRINTER_HEAVY', 15),
+    ('GC_FOCUSED', 15),
+    ('VALUE_PICKS', 10),
+]
+
+# Categorias favorecidas por cada estratégia (prioritizeCyclists)
+STRATEGY_FOCUS = {
+    'CLIMBER_HEAVY': ('CLIMBER', 'GC', 'HILLS'),
+    'SPRINTER_HEAVY': ('SPRINT', 'TT', 'ONEDAY'),
+    'GC_FOCUSED': ('GC', 'CLIMBER', 'TT'),
+}
+
+# BotTeamService.generateBotPoints: pontos iniciais base (+0..30)
+BOT_BASE_POINTS = {
+    'BALANCED': 50,
+    'CLIMBER_HEAVY': 60,
+    'SPRINTER_HEAVY': 55,
+    'GC_FOCUSED': 70,
+    'VALUE_PICKS': 40,
+}
+
+TEAM_PREFIXES = ['FC', 'SC', 'Ciclismo', 'Dragoes', 'Aguias', 'Leoes', 'Unidos', 'Racing',
+                 'Cycling', 'Team', 'Elite', 'Pro', 'Velo', 'Pedal', 'Road', 'Sprint',
+                 'Climb', 'Victory', 'Furia', 'Poder', 'Velocidade', 'Montanha']
+TEAM_SUFFIXES = ['Portugal', 'Lisboa', 'Porto', 'Braga', 'Coimbra', 'Faro', 'Aveiro',
+                 'Setubal', 'Leiria', 'Viseu', 'Evora', 'Santarem', 'Cascais', 'Sintra',
+                 'Funchal', 'Algarve', 'Minho', 'Douro', 'Alentejo', 'Beira', 'Norte', 'Sul']
+
+
+def strategy_index(team_index: np.ndarray) -> np.ndarray:
+    """selectStrategy: posição team_index % 100 na distribuição de percentagens."""
+    bounds = np.cumsum([percent for _, percent in STRATEGIES])
+    return np.searchsorted(bounds, team_index % 100, side='right')
+
+
+def rider_id(name: str) -> str:
+    """Id estável a partir do nome ("Tadej Pogačar" -> "tadej-pogačar")."""
+    return name.strip().lower().replace(' ', '-')
+
+
+def strategy_weights(pool: RiderPool) -> np.ndarray:
+    """Peso de cada ciclista para cada estratégia (estratégias x ciclistas)."""
+    strength = pool.points / pool.points.max() if pool.points.max() > 0 else np.zeros(len(pool))
+    weights = np.ones((len(STRATEGIES), len(pool)))
+    for s, (name, _) in enumerate(STRATEGIES):
+        if name in STRATEGY_FOCUS:
+            focus = np.isin(pool.category, [CATEGORIES.index(c) for c in STRATEGY_FOCUS[name]])
+            weights[s] = np.where(focus, 1 + 4 * strength, 1.0)
+        elif name == 'VALUE_PICKS':
+            # Melhor relação pontos/preço, quase só ciclistas até 8M
+            value = pool.points / np.maximum(pool.prices, 0.1)
+            value = value / value.max() if value.max() > 0 else value
+            weights[s] = (0.1 + value) * np.where(pool.prices <= 8.0, 1.0, 0.05)
+    return weights
+
+
+class BotTeamSampler:
+    """Sorteia plantéis válidos em blocos, com pesos por estratégia."""
+
+    def __init__(self, pool: RiderPool, seed: int = 42, budget: float = INITIAL_BUDGET):
+        self.pool = pool
+        self.rng = np.random.default_rng(seed)
+        self.budget = to_units(budget)
+        self.members = [np.flatnonzero(pool.category == c) for c in range(len(CATEGORIES))]
+        for c, name in enumerate(CATEGORIES):
+            if len(self.members[c]) < CATEGORY_REQUIREMENTS[name]:
+                raise ValueError(f"{name}: {len(self.members[c])} ciclistas, "
+                                 f"o plantel precisa de {CATEGORY_REQUIREMENTS[name]}")
+        # Distribuição acumulada de cada estratégia, por categoria; a estratégia s
+        # ocupa o intervalo [s, s + 1) para um único searchsorted por bloco
+        weights = strategy_weights(pool)
+        self.cdf = []
+        for members in self.members:
+            w = weights[:, members]
+            cdf = np.cumsum(w, axis=1) / w.sum(axis=1, keepdims=True)
+            self.cdf.append((cdf + np.arange(len(STRATEGIES))[:, None]).ravel())
+        # Ciclistas sem equipa não contam para o limite: cada um tem um código só seu
+        team_codes: Dict[str, int] = {}
+        self.team = np.array([team_codes.setdefault(t, len(team_codes)) if t else -1 - i
+                              for i, t in enumerate(pool.teams)], dtype=np.int64)
+
+    def _draw(self, c: int, strategies: np.ndarray, k: int) -> np.ndarray:
+        """k posições na categoria c por linha, sorteadas com reposição pelos pesos."""
+        m = len(self.members[c])
+        u = self.rng.random((len(strategies), k)) + strategies[:, None]
+        pos = np.searchsorted(self.cdf[c], u, side='right') - strategies[:, None] * m
+        return np.minimum(pos, m - 1)
+
+    def _sample(self, strategies: np.ndarray) -> np.ndarray:
+        """Um plantel por linha (n x 15), sem validar orçamento nem equipas."""
+        picks = []
+        for c, name in enumerate(CATEGORIES):
+            k = CATEGORY_REQUIREMENTS[name]
+            pos = self._draw(c, strategies, k)
+            # Sem reposição: volta a sortear as linhas com o mesmo ciclista duas vezes
+            while True:
+                ordered = np.sort(pos, axis=1)
+                repeated = np.flatnonzero((ordered[:, 1:] == ordered[:, :-1]).any(axis=1))
+                if not len(repeated):
+                    break
+                pos[repeated] = self._draw(c, strategies[repeated], k)
+            picks.append(self.members[c][pos])
+        return np.concatenate(picks, axis=1)
+
+    def _valid(self, squads: np.ndarray) -> np.ndarray:
+        within_budget = self.pool.cost[squads].sum(axis=1) <= self.budget
+        teams = np.sort(self.team[squads], axis=1)
+        # 4 iguais seguidos depois de ordenar = mais de 3 da mesma equipa
+        limit = MAX_FROM_SAME_PRO_TEAM
+        overfull = (teams[:, limit:] == teams[:, :-limit]).any(axis=1)
+        return within_budget & ~overfull
+
+    def sample(self, strategies: np.ndarray) -> np.ndarray:
+        """
+        Plantéis válidos para cada estratégia pedida.
+
+        As linhas inválidas voltam a ser sorteadas até MAX_RESAMPLES vezes;
+        as que continuarem inválidas ficam a -1 (como os "failed" da app).
+        """
+        squads = self._sample(strategies)
+        invalid = np.flatnonzero(~self._valid(squads))
+        for _ in range(MAX_RESAMPLES):
+            if not len(invalid):
+                break
+            squads[invalid] = self._sample(strategies[invalid])
+            invalid = invalid[~self._valid(squads[invalid])]
+        squads[invalid] = -1
+        return squads
+
+    def lineup(self, squads: np.ndarray):
+        """
+        (ativos, capitão) como selectActiveCyclists / selectCaptain.
+
+        Ativos: os 6 com mais pontos + int(preço * 10) e 2 ao acaso dos restantes.
+        Capitão: o de maior pontos + int(preço * 5).
+        """
+        n = len(squads)
+        points = self.pool.points[squads]
+        prices = self.pool.prices[squads]
+        order = np.argsort(-(points + np.trunc(prices * 10)), axis=1, kind='stable')
+        rest = order[:, ACTIVE_TOP:]
+        shuffled = np.take_along_axis(rest, np.argsort(self.rng.random(rest.shape), axis=1), axis=1)
+        active = np.zeros(squads.shape, dtype=bool)
+        rows = np.arange(n)[:, None]
+        active[rows, order[:, :ACTIVE_TOP]] = True
+        active[rows, shuffled[:, :ACTIVE_RANDOM]] = True
+        captain = np.argmax(points + np.trunc(prices * 5), axis=1)
+        return active, captain
+
+
+def generate(pool: RiderPool, n_teams: int, seed: int = 42,
+             chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[List[Dict], int]]:
+    """Gera as equipas em blocos de chunk_size: (equipas do bloco, quantas falharam)."""
+    sampler = BotTeamSampler(pool, seed)
+    ids = [rider_id(name) for name in pool.names]
+    now = int(time.time() * 1000)
+
+    for start in range(0, n_teams, chunk_size):
+        team_index = np.arange(start, min(start + chunk_size, n_teams))
+        strategies = strategy_index(team_index)
+        squads = sampler.sample(strategies)
+        ok = squads[:, 0] >= 0
+        team_index, strategies, squads = team_index[ok], strategies[ok], squads[ok]
+        active, captain = sampler.lineup(squads)
+        cost = pool.prices[squads].sum(axis=1)
+        bonus = sampler.rng.integers(0, 31, len(squads))
+        prefixes = sampler.rng.integers(0, len(TEAM_PREFIXES), len(squads))
+        suffixes = sampler.rng.integers(0, len(TEAM_SUFFIXES), len(squads))
+        uuid_bytes = sampler.rng.bytes(32 * len(squads))
+
+        teams = []
+        for row, i in enumerate(team_index.tolist()):
+            strategy = STRATEGIES[strategies[row]][0]
+            team_id = str(uuid.UUID(bytes=uuid_bytes[32 * row:32 * row + 16], version=4))
+            user_id = BOT_USER_PREFIX + str(uuid.UUID(bytes=uuid_bytes[32 * row + 16:32 * row + 32], version=4))
+            teams.append({
+                'id': team_id,
+                'userId': user_id,
+                'teamName': f"{TEAM_PREFIXES[prefixes[row]]} {TEAM_SUFFIXES[suffixes[row]]} {i + 1}",
+                'season': SEASON,
+                'budget': round(max(INITIAL_BUDGET - float(cost[row]), 0.0), 1),
+                'totalPoints': BOT_BASE_POINTS[strategy] + int(bonus[row]),
+                'isBot': True,
+                'strategy': strategy,
+                'createdAt': now,
+                'cyclists': [{
+                    'cyclistId': ids[r],
+                    'isActive': bool(active[row, s]),
+                    'isCaptain': bool(s == captain[row]),
+                    'purchasePrice': float(pool.prices[r]),
+                } for s, r in enumerate(squads[row].tolist())],
+            })
+        yield teams, int((~ok).sum())
+
+
+class NdjsonWriter:
+    """Uma equipa por linha, com os ciclistas embutidos (como no Firestore)."""
+
+    def __init__(self, filename: str):
+        self.file = open(filename, 'w', encoding='utf-8')
+
+    def write(self, teams: List[Dict]):
+        self.file.writelines(json.dumps(team, ensure_ascii=False) + '\n' for team in teams)
+
+    def close(self):
+        self.file.close()
+
+
+class SqliteWriter:
+    """Tabelas fantasy_teams e team_cyclists com as colunas das entidades Room."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS fantasy_teams (
+            id TEXT PRIMARY KEY, userId TEXT NOT NULL, teamName TEXT NOT NULL,
+            season INTEGER NOT NULL, budget REAL NOT NULL, totalPoints INTEGER NOT NULL,
+            isBot INTEGER NOT NULL, createdAt INTEGER NOT NULL, updatedAt INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS team_cyclists (
+            teamId TEXT NOT NULL, cyclistId TEXT NOT NULL, isActive INTEGER NOT NULL,
+            isCaptain INTEGER NOT NULL, purchasePrice REAL NOT NULL,
+            purchasedAt INTEGER NOT NULL, season INTEGER NOT NULL,
+            PRIMARY KEY (teamId, cyclistId)
+        );
+    """
+
+    def __init__(self, filename: str):
+        self.conn = sqlite3.connect(filename)
+        self.conn.executescript(self.SCHEMA)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+
+    def write(self, teams: List[Dict]):
+        with self.conn:
+            self.conn.executemany(
+                'INSERT INTO fantasy_teams VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(t['id'], t['userId'], t['teamName'], t['season'], t['budget'], t['totalPoints'],
+                  1, t['createdAt'], t['createdAt']) for t in teams])
+            self.conn.executemany(
+                'INSERT INTO team_cyclists VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(t['id'], c['cyclistId'], int(c['isActive']), int(c['isCaptain']),
+                  c['purchasePrice'], t['createdAt'], t['season'])
+                 for t in teams for c in t['cyclists']])
+
+    def close(self):
+        self.conn.close()
+
+
+def open_writer(filename: str):
+    if os.path.splitext(filename)[1].lower() in ('.db', '.sqlite', '.sqlite3'):
+        return SqliteWriter(filename)
+    return NdjsonWriter(filename)
+
+
+def write_teams(pool: RiderPool, n_teams: int, filename: str, seed: int = 42) -> int:
+    """Gera e escreve n_teams equipas bloco a bloco. Retorna as escritas."""
+    writer = open_writer(filename)
+    written = failed = 0
+    try:
+        for teams, chunk_failed in generate(pool, n_teams, seed):
+            writer.write(teams)
+            written += len(teams)
+            failed += chunk_failed
+            print(f"  {written:,}/{n_teams:,} equipas", end='\r')
+    finally:
+        writer.close()
+    print()
+    if failed:
+        print(f"⚠ {failed} equipas sem plantel válido ao fim de {MAX_RESAMPLES} sorteios")
+    return written
+
+
+def check_team(pool: RiderPool, team: Dict, ids: Dict[str, int]) -> Optional[str]:
+    """Erro de validação de uma equipa gerada, ou None (para verificação)."""
+    riders = [ids[c['cyclistId']] for c in team['cyclists']]
+    if len(set(riders)) != len(riders):
+        return 'ciclistas repetidos'
+    for c, name in enumerate(CATEGORIES):
+        count = sum(1 for r in riders if pool.category[r] == c)
+        if count != CATEGORY_REQUIREMENTS[name]:
+            return f'{name}: {count}'
+    if sum(to_units(pool.prices[r]) for r in riders) > to_units(INITIAL_BUDGET):
+        return 'orçamento'
+    teams = [pool.teams[r] for r in riders if pool.teams[r]]
+    if any(teams.count(t) > MAX_FROM_SAME_PRO_TEAM for t in teams):
+        return 'equipa'
+    if sum(c['isActive'] for c in team['cyclists']) != ACTIVE_TOP + ACTIVE_RANDOM:
+        return 'ativos'
+    if sum(c['isCaptain'] for c in team['cyclists']) != 1:
+        return 'capitão'
+    return None
+
+
+def benchmark(n_teams: int = 100_000, seed: int = 42):
+    """Gera n_teams equipas de um conjunto aleatório de 600 ciclistas e valida uma amostra."""
+    rng = np.random.default_rng(seed)
+    pool = random_pool(rng, 600, 30)
+    ids = {rider_id(name): i for i, name in enumerate(pool.names)}
+
+    t0 = time.perf_counter()
+    sampler = BotTeamSampler(pool, seed)
+    failed = 0
+    for start in range(0, n_teams, CHUNK_SIZE):
+        squads = sampler.sample(strategy_index(np.arange(start, min(start + CHUNK_SIZE, n_teams))))
+        sampler.lineup(squads)
+        failed += int((squads[:, 0] < 0).sum())
+    t1 = time.perf_counter()
+    print(f"{n_teams:,} plantéis sorteados em {t1 - t0:.2f}s ({failed} sem plantel válido)")
+
+    t0 = time.perf_counter()
+    count = 0
+    for teams, _failed in generate(pool, n_teams, seed):
+        if count == 0:
+            for team in teams[:1000]:
+                error = check_team(pool, team, ids)
+                if error:
+                    raise AssertionError(f"Equipa {team['id']} inválida: {error}")
+        count += len(teams)
+    t1 = time.perf_counter()
+    print(f"{count:,} equipas completas (ids, nomes, ativos) em {t1 - t0:.2f}s")
+    print("  Amostra de 1000 equipas válida ✓")
+
+    first = next(generate(pool, 10, seed))[0]
+    again = next(generate(pool, 10, seed))[0]
+    assert [t['id'] for t in first] == [t['id'] for t in again]
+    print("  Mesma semente, mesmas equipas ✓")
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--bench':
+        benchmark(int(args[1]) if len(args) > 1 else 100_000)
+        return
+
+    seed = 42
+    if '--seed' in args:
+        pos = args.index('--seed')
+        seed = int(args[pos + 1])
+        del args[pos:pos + 2]
+
+    if len(args) != 3:
+        print("Uso: python bot_teams.py ciclistas_final.csv n_equipas output.ndjson|output.db [--seed 42]")
+        print("     python bot_teams.py --bench [n_equipas]")
+        sys.exit(1)
+
+    input_file, n_teams, output_file = args[0], int(args[1]), args[2]
+    records = list(read_csv(input_file))
+    pool = RiderPool.from_records(records)
+    print(f"{len(pool)} de {len(records)} ciclistas com categoria válida")
+
+    try:
+        # Falha já se faltarem ciclistas numa categoria, antes de criar o ficheiro
+        BotTeamSampler(pool, seed)
+    except ValueError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    written = write_teams(pool, n_teams, output_file, seed)
+    print(f"✓ {written:,} equipas guardadas em {output_file} ({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
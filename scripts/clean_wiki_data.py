@@ -1,11 +1,19 @@
 #!/usr/bin/env python3
 """
 Clean Wikipedia cyclist data and add team associations
+
+Usage:
+    python clean_wiki_data.py
+    python parse_wiki.py --stream | python clean_wiki_data.py --stream | ...
 """
 
 import json
 import re
-import csv
+import sys
+
+from rider_record import RiderRecord, read_csv, write_csv
+from rider_stream import read_stream, stream_stdio, write_stream
+from team_index import resolve_team
 
 # Known team patterns to filter out
 TEAM_PATTERNS = [
@@ -79,23 +87,17 @@ TOP_CYCLISTS = {
 
 def is_likely_team_name(name):
     """Check if name looks like a team name"""
+    if resolve_team(name):
+        return True
     name_lower = name.lower()
     return any(pattern in name_lower for pattern in TEAM_PATTERNS)
 
-def main():
-    # Read the raw CSV
-    with open('wiki_cyclists.csv', 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f, fieldnames=['first_name', 'last_name', 'team', 'nationality', 'age', 'uci_ranking', 'speciality', 'price', 'category'])
-        rows = list(reader)
-
-    print(f'Read {len(rows)} rows from wiki_cyclists.csv')
-
-    # Clean and enrich data
-    cyclists = []
+def clean(rows):
+    """Yield cleaned cyclists as the raw rows arrive"""
     seen_names = set()
 
     for row in rows:
-        full_name = f"{row['first_name']} {row['last_name']}".strip()
+        full_name = row.full_name
 
         # Skip team names
         if is_likely_team_name(full_name):
@@ -106,7 +108,7 @@ def main():
             continue
 
         # Skip single word names
-        if not row['last_name'] or len(row['last_name'].strip()) < 2:
+        if not row.last_name or len(row.last_name) < 2:
             continue
 
         seen_names.add(full_name.lower())
@@ -119,43 +121,43 @@ def main():
                 break
 
         if enriched:
-            cyclists.append({
-                'first_name': row['first_name'],
-                'last_name': row['last_name'],
-                'team': enriched['team'],
-                'nationality': enriched['nationality'],
-                'age': '',
-                'uci_ranking': str(enriched['ranking']),
-                'speciality': enriched['category'],
-                'price': str(enriched['price']),
-                'category': enriched['category']
-            })
+            yield RiderRecord(
+                row.first_name,
+                row.last_name,
+                team=enriched['team'],
+                nationality=enriched['nationality'],
+                uci_ranking=enriched['ranking'],
+                speciality=enriched['category'],
+                price=enriched['price'],
+                category=enriched['category'],
+            )
         else:
-            cyclists.append({
-                'first_name': row['first_name'],
-                'last_name': row['last_name'],
-                'team': '',
-                'nationality': '',
-                'age': '',
-                'uci_ranking': '',
-                'speciality': '',
-                'price': '5.0',
-                'category': 'ROULEUR'
-            })
+            yield RiderRecord(row.first_name, row.last_name)
+
+def main():
+    if '--stream' in sys.argv[1:]:
+        with stream_stdio() as (inp, out):
+            count = write_stream(clean(read_stream(inp)), out)
+        print(f'Cleaned {count} cyclists', file=sys.stderr)
+        return
+
+    # Read the raw CSV
+    rows = list(read_csv('wiki_cyclists.csv', header=False))
+
+    print(f'Read {len(rows)} rows from wiki_cyclists.csv')
+
+    # Clean and enrich data
+    cyclists = list(clean(rows))
 
     print(f'Cleaned to {len(cyclists)} cyclists')
 
     # Save clean CSV
-    with open('worldtour_2026_complete.csv', 'w', newline='', encoding='utf-8') as f:
-        fieldnames = ['first_name', 'last_name', 'team', 'nationality', 'age', 'uci_ranking', 'speciality', 'price', 'category']
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        for cyclist in cyclists:
-            writer.writerow(cyclist)
+    write_csv('worldtour_2026_complete.csv', cyclists, header=False)
 
     print(f'Saved to worldtour_2026_complete.csv')
 
     # Count enriched vs basic
-    enriched_count = sum(1 for c in cyclists if c['team'])
+    enriched_count = sum(1 for c in cyclists if c.team)
     print(f'Enriched cyclists: {enriched_count}')
     print(f'Basic cyclists: {len(cyclists) - enriched_count}')
 
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Motor de datas partilhado pelos scripts (nascimentos, provas, notícias).
+
+Antes cada script tinha a sua cascata de strptime dentro de try/except
+(calculate_age, calculate_age_from_birthday) e chamava datetime.now() em
+cada linha; as datas das notícias passavam pelo DateParser.kt no telemóvel.
+Aqui:
+
+- o formato é inferido uma vez por fonte/coluna (a partir de uma amostra) e
+  fica em cache no DateEngine; só os valores que não encaixam nesse formato
+  passam pelos outros;
+- parse_column converte a coluna toda de uma vez para datetime64[D] (NaT nos
+  valores inválidos), sem exceções por linha;
+- as idades são calculadas contra uma única data de referência, fixada
+  quando o DateEngine é criado;
+- meses por extenso ou abreviados em português e inglês ("1 de fevereiro de
+  2026", "21-Sep-1998"), e as regras do DateParser.kt para datas em texto
+  livre e em URLs de notícias.
+
+Uso:
+    pip install numpy
+    python date_engine.py "21-Sep-1998" "1 de fevereiro de 2026" ...
+    python date_engine.py --bench [n_linhas]
+"""
+
+import re
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("A instalar dependências...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "numpy"])
+    import numpy as np
+
+MONTHS = {
+    'janeiro': 1, 'fevereiro': 2, 'março': 3, 'marco': 3, 'abril': 4, 'maio': 5, 'junho': 6,
+    'julho': 7, 'agosto': 8, 'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12,
+    'jan': 1, 'fev': 2, 'mar': 3, 'abr': 4, 'mai': 5, 'jun': 6,
+    'jul': 7, 'ago': 8, 'set': 9, 'out': 10, 'nov': 11, 'dez': 12,
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+    'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12,
+    'feb': 2, 'apr': 4, 'aug': 8, 'sep': 9, 'sept': 9, 'oct': 10, 'dec': 12,
+}
+
+MONTH_NAMES = '|'.join(sorted(MONTHS, key=len, reverse=True))
+
+# Amostra usada para inferir o formato de uma coluna
+SAMPLE = 50
+
+# Datas das notícias: o DateParser.kt só aceita anos de 2020 a 2030
+NEWS_YEARS = (2020, 2030)
+
+
+class DateFormat:
+    """Um formato: expressão regular para o valor todo e a posição do dia, mês e ano."""
+
+    def __init__(self, name: str, pattern: str, order: Tuple[int, int, int]):
+        self.name = name
+        self.regex = re.compile(pattern, re.I)
+        self.order = order
+
+    def match(self, value: str) -> Optional[Tuple[int, int, int]]:
+        """(ano, mês, dia) se o valor tiver este formato (sem validar o dia)."""
+        found = self.regex.fullmatch(value)
+        if found is None:
+            return None
+        d, m, y = (found.group(i) for i in self.order)
+        month = int(m) if m.isdigit() else MONTHS.get(m.lower().rstrip('.'))
+        if month is None:
+            return None
+        return int(y), month, int(d)
+
+    def match_many(self, values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Versão em coluna de match: (máscara dos valores com este formato,
+        componentes ano/mês/dia dessas linhas). Uma só fullmatch por valor;
+        a conversão dos números e dos nomes dos meses é feita em numpy.
+        """
+        found = [self.regex.fullmatch(v) for v in values]
+        hits = np.array([m is not None for m in found], dtype=bool)
+        parts = np.zeros((len(values), 3), dtype=np.int64)
+        if not hits.any():
+            return hits, parts
+        d, m, y = np.array([f.group(*self.order) for f in found if f is not None]).T
+        names, index = np.unique(m, return_inverse=True)
+        months = np.array([int(n) if n.isdigit() else MONTHS.get(n.lower().rstrip('.'), 0) for n in names])
+        parts[hits] = np.stack([y.astype(np.int64), months[index], d.astype(np.int64)], axis=1)
+        hits[hits] = months[index] > 0
+        return hits, parts
+
+    def __repr__(self):
+        return f"DateFormat({self.name!r})"
+
+
+TIME = r'(?:[t\s]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:z|[+-]\d{2}:?\d{2})?)?'
+
+# Formatos conhecidos; na inferência, o que encaixar em mais valores ganha (empate: o primeiro)
+FORMATS = [
+    DateFormat('iso', rf'(\d{{4}})-(\d{{1,2}})-(\d{{1,2}}){TIME}', (3, 2, 1)),
+    DateFormat('dd/mm/aaaa', r'(\d{1,2})/(\d{1,2})/(\d{4})(?:\s+(?:às\s+)?\d{1,2}:\d{2})?', (1, 2, 3)),
+    DateFormat('dd-mm-aaaa', r'(\d{1,2})-(\d{1,2})-(\d{4})', (1, 2, 3)),
+    DateFormat('dd.mm.aaaa', r'(\d{1,2})\.(\d{1,2})\.(\d{4})', (1, 2, 3)),
+    DateFormat('aaaa/mm/dd', r'(\d{4})/(\d{1,2})/(\d{1,2})', (3, 2, 1)),
+    DateFormat('dia mês ano', rf'(\d{{1,2}})[\s\-]*(?:de\s+)?({MONTH_NAMES})\.?[\s\-,]*(?:de\s+)?(\d{{4}})', (1, 2, 3)),
+    DateFormat('mês dia ano', rf'({MONTH_NAMES})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?,?\s+(\d{{4}})', (2, 1, 3)),
+    DateFormat('aaaammdd', r'(\d{4})(\d{2})(\d{2})', (3, 2, 1)),
+]
+
+FORMATS_BY_NAME = {f.name: f for f in FORMATS}
+
+
+def clean(value) -> str:
+    return str(value).strip().lower() if value is not None else ''
+
+
+def infer_format(values: Iterable, sample: int = SAMPLE) -> Optional[DateFormat]:
+    """Formato que encaixa em mais valores de uma amostra (os primeiros não vazios)."""
+    cleaned = []
+    for value in values:
+        value = clean(value)
+        if value:
+            cleaned.append(value)
+            if len(cleaned) >= sample:
+                break
+    best, best_count = None, 0
+    for fmt in FORMATS:
+        count = sum(fmt.match(v) is not None for v in cleaned)
+        if count > best_count:
+            best, best_count = fmt, count
+    return best
+
+
+def to_datetime64(years: np.ndarray, months: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """datetime64[D] a partir dos componentes; dias ou meses impossíveis dão NaT."""
+    years, months, days = (np.asarray(a, dtype=np.int64) for a in (years, months, days))
+    valid = (months >= 1) & (months <= 12) & (days >= 1) & (days <= 31)
+    month_start = ((years - 1970) * 12 + np.where(valid, months, 1) - 1).astype('datetime64[M]')
+    result = month_start.astype('datetime64[D]') + np.where(valid, days, 1) - 1
+    # 31 de abril passa para maio: invalida
+    valid &= result.astype('datetime64[M]') == month_start
+    result[~valid] = np.datetime64('NaT')
+    return result
+
+
+def components(dates: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(ano, mês, dia) de um array datetime64[D]."""
+    months = dates.astype('datetime64[M]')
+    years = dates.astype('datetime64[Y]').astype(np.int64) + 1970
+    return years, months.astype(np.int64) % 12 + 1, (dates - months).astype(np.int64) + 1
+
+
+def ages_at(births: np.ndarray, reference: date) -> np.ndarray:
+    """Idades (float, NaN se a data for NaT) numa data de referência."""
+    years, months, days = components(births)
+    before = (reference.month < months) | ((reference.month == months) & (reference.day < days))
+    ages = (reference.year - years - before).astype(float)
+    ages[np.isnat(births)] = np.nan
+    return ages
+
+
+class DateEngine:
+    """
+    Formatos inferidos por chave (ex: 'pcs.birthdate') e uma data de referência
+    para todas as idades da execução.
+    """
+
+    def __init__(self, reference: Optional[date] = None, years: Tuple[int, int] = (1900, 2100)):
+        self.reference = date.today() if reference is None else reference
+        self.years = years
+        self.formats: Dict[str, Optional[DateFormat]] = {}
+
+    def format_for(self, key: Optional[str], values: Sequence) -> Optional[DateFormat]:
+        if key is None:
+            return infer_format(values)
+        if self.formats.get(key) is None:
+            self.formats[key] = infer_format(values)
+        return self.formats[key]
+
+    def parse_column(self, values: Sequence, key: Optional[str] = None) -> np.ndarray:
+        """Coluna inteira para datetime64[D]; NaT nos vazios e inválidos."""
+        values = [clean(v) for v in values]
+        fmt = self.format_for(key, values)
+        if fmt is not None:
+            hits, parts = fmt.match_many(values)
+        else:
+            hits, parts = np.zeros(len(values), dtype=bool), np.zeros((len(values), 3), dtype=np.int64)
+        for i in np.flatnonzero(~hits):
+            # Valor fora do formato da coluna: tenta os outros
+            if values[i]:
+                found = next((p for p in (f.match(values[i]) for f in FORMATS if f is not fmt) if p), None)
+                if found is not None:
+                    parts[i] = found
+        low, high = self.years
+        parts[(parts[:, 0] < low) | (parts[:, 0] > high)] = 0
+        return to_datetime64(parts[:, 0], parts[:, 1], parts[:, 2])
+
+    def parse(self, value, key: Optional[str] = None) -> Optional[date]:
+        parsed = self.parse_column([value], key)[0]
+        return None if np.isnat(parsed) else parsed.astype(date)
+
+    def ages(self, values: Sequence, key: Optional[str] = None) -> List[Optional[int]]:
+        """Idades de uma coluna de datas de nascimento (None se não der para ler)."""
+        ages = ages_at(self.parse_column(values, key), self.reference)
+        return [None if a != a else int(a) for a in ages.tolist()]
+
+    def age(self, value, key: Optional[str] = None) -> Optional[int]:
+        return self.ages([value], key)[0]
+
+
+# Texto livre e URLs das notícias (DateParser.kt)
+TEXT_PATTERNS = [
+    re.compile(rf"(\d{{1,2}})\s*de\s*({MONTH_NAMES})\s*de\s*(\d{{4}})", re.I),
+    re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})"),
+    re.compile(r"(\d{1,2})-(\d{1,2})-(\d{4})"),
+]
+
+URL_PATTERNS = [
+    (re.compile(r'/(\d{4})/(\d{2})/(\d{2})/'), (3, 2, 1)),
+    (re.compile(r'[-/](20\d{2})-(\d{2})-(\d{2})[-/]'), (3, 2, 1)),
+    (re.compile(r'[-/_](202\d)(\d{2})(\d{2})[-/_.]'), (3, 2, 1)),
+    (re.compile(r'[-/](\d{2})(\d{2})(202\d)[-/]'), (1, 2, 3)),
+    (re.compile(r'-(202\d)(\d{2})(\d{2})(?:[./]|$)'), (3, 2, 1)),
+]
+
+
+def checked_date(year: int, month: int, day: int, years: Tuple[int, int] = NEWS_YEARS) -> Optional[date]:
+    if not years[0] <= year <= years[1]:
+        return None
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def find_date(text: str, years: Tuple[int, int] = NEWS_YEARS) -> Optional[date]:
+    """parsePortugueseDateFromText: primeira data "1 de fevereiro de 2026" ou dd/mm/aaaa no texto."""
+    text = clean(text)
+    for pattern in TEXT_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            d, m, y = match.groups()
+            month = int(m) if m.isdigit() else MONTHS[m]
+            found = checked_date(int(y), month, int(d), years)
+            if found is not None:
+                return found
+    return None
+
+
+def date_from_url(url: str, years: Tuple[int, int] = NEWS_YEARS) -> Optional[date]:
+    """extractDateFromUrl: /2026/02/01/, -2026-02-01-, -20260201-, -01022026-."""
+    for pattern, (d, m, y) in URL_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            found = checked_date(int(match.group(y)), int(match.group(m)), int(match.group(d)), years)
+            if found is not None:
+                return found
+    return None
+
+
+def legacy_age(value: str, now: datetime) -> Optional[int]:
+    """Cascata antiga (calculate_age_from_birthday), para verificar o motor."""
+    for pattern in ("%d-%b-%Y", "%Y-%m-%d"):
+        try:
+            birth = datetime.strptime(value, pattern)
+            return now.year - birth.year - ((now.month, now.day) < (birth.month, birth.day))
+        except ValueError:
+            continue
+    return None
+
+
+def fake_birthdays(n: int, seed: int = 3) -> Dict[str, List[str]]:
+    """Duas colunas como as das fontes: '21-Sep-1998' (CyclingRanking) e ISO (procyclingstats)."""
+    rng = np.random.default_rng(seed)
+    births = [date(1975, 1, 1) + timedelta(days=int(d)) for d in rng.integers(0, 365 * 30, n)]
+    cyclingranking = [b.strftime('%d-%b-%Y') for b in births]
+    pcs = [b.isoformat() for b in births]
+    for column in (cyclingranking, pcs):
+        for i in rng.choice(n, size=n // 50, replace=False):
+            column[i] = '' if i % 2 else 'n/d'
+    return {'cyclingranking.birthday': cyclingranking, 'pcs.birthdate': pcs}
+
+
+def benchmark(n: int = 100000):
+    columns = fake_birthdays(n)
+    now = datetime.now()
+    print(f"{n} datas de nascimento por coluna:")
+    for key, values in columns.items():
+        t0 = time.perf_counter()
+        expected = [legacy_age(v, datetime.now()) for v in values]
+        legacy_time = time.perf_counter() - t0
+
+        engine = DateEngine(reference=now.date())
+        t0 = time.perf_counter()
+        ages = engine.ages(values, key)
+        engine_time = time.perf_counter() - t0
+
+        if ages != expected:
+            wrong = sum(a != e for a, e in zip(ages, expected))
+            raise AssertionError(f"{key}: {wrong} idades diferentes da cascata strptime")
+        print(f"  {key:<24} formato {engine.formats[key].name:<12} "
+              f"strptime {legacy_time:6.2f}s  motor {engine_time:6.2f}s  ({legacy_time / engine_time:.1f}x) ✓")
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--bench':
+        benchmark(int(args[1]) if len(args) > 1 else 100000)
+        return
+    if not args or args[0].startswith('--'):
+        print('Uso: python date_engine.py "21-Sep-1998" "1 de fevereiro de 2026" ...')
+        print("     python date_engine.py --bench [n_linhas]")
+        sys.exit(1)
+
+    engine = DateEngine()
+    for value, parsed, age in zip(args, engine.parse_column(args), engine.ages(args)):
+        print(f"  {value:<30} {'✗' if np.isnat(parsed) else parsed}  idade {age}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,19 +5,49 @@ Script para enriquecer dados de ciclistas usando a biblioteca procyclingstats.
 Uso:
     pip install procyclingstats
     python enrich_cyclists.py input.csv output.csv
+    python enrich_cyclists.py --retry-failed [output.csv]
+    python enrich_cyclists.py --budget N input.csv [output.csv] [--demand demand.csv]
+        [--races races.csv --participants race_participants.csv]
+    ... | python enrich_cyclists.py --stream | ...
 
 Formato do CSV de entrada (mínimo):
     Nome,Equipa,Ranking,URL
     Tadej Pogačar,UAE Team Emirates,1,rider/tadej-pogacar
 
 O script vai buscar: nacionalidade, idade, especialidade, e calcular o preço.
+Ciclistas cuja busca falhe ficam em failed_riders.json; o modo --retry-failed
+volta a buscar só esses e corrige o CSV de saída existente.
+
+Cada busca bem sucedida fica registada em refresh_state.json. O modo --budget
+busca só os N ciclistas com maior prioridade (refresh_scheduler.py: ranking,
+ownership, corridas próximas e tempo desde a última busca) e corrige as
+respetivas linhas no CSV de saída existente.
+
+Para backfills grandes em vários processos ou máquinas, ver work_queue.py
+(usa o queue_job deste script).
+
+Com --stream lê ciclistas (nove colunas) de um stream NDJSON no stdin e
+escreve-os enriquecidos no stdout, um a um (ver rider_stream.py). Sem
+profile_url, o URL é tentado a partir do nome. Os ficheiros que precisam
+do plantel inteiro (semelhantes, fotos, histórico de preços) não são
+escritos neste modo.
 """
 
 import csv
 import sys
 import time
-from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, Iterator
+
+from date_engine import DateEngine
+from price_history_store import record_run, take_option
+from price_tiers import pcs_price as calculate_price
+from refresh_scheduler import RefreshState, next_race_days, ownership_by_cyclist, read_input, schedule
+from retry_queue import RetryQueue, patch_csv
+from rider_photos import write_photo_list
+from rider_record import FIELDNAMES, RiderRecord, read_rows, write_csv
+from rider_stream import read_stream, stream_stdio, write_stream
+from similar_riders import write_neighbours
+from speciality_classifier import classify_rider, speciality_points
 
 # Tenta importar/instalar a biblioteca
 try:
@@ -42,104 +72,10 @@ COUNTRY_CODES = {
     'LTU': 'Lithuania', 'MEX': 'Mexico', 'ARG': 'Argentina', 'VEN': 'Venezuela',
 }
 
+SOURCE = 'enrich_cyclists'
 
-def calculate_age(birthdate: str) -> Optional[int]:
-    """Calcula idade a partir da data de nascimento (YYYY-MM-DD)."""
-    if not birthdate:
-        return None
-    try:
-        birth = datetime.strptime(birthdate, "%Y-%m-%d")
-        today = datetime.now()
-        age = today.year - birth.year - ((today.month, today.day) < (birth.month, birth.day))
-        return age
-    except:
-        return None
-
-
-def calculate_price(ranking: int, speciality_points: Dict[str, int]) -> float:
-    """
-    Calcula o preço do ciclista baseado no ranking e pontos de especialidade.
-
-    Fórmula:
-    - Top 10: 10-15M
-    - Top 50: 6-10M
-    - Top 100: 4-6M
-    - Resto: 3-5M
-    """
-    if ranking <= 5:
-        base_price = 14.0 - (ranking - 1) * 0.5  # 15, 14.5, 14, 13.5, 13
-    elif ranking <= 10:
-        base_price = 12.0 - (ranking - 6) * 0.4  # ~10-12
-    elif ranking <= 25:
-        base_price = 9.5 - (ranking - 11) * 0.15  # ~7.5-9.5
-    elif ranking <= 50:
-        base_price = 7.0 - (ranking - 26) * 0.08  # ~5-7
-    elif ranking <= 100:
-        base_price = 5.5 - (ranking - 51) * 0.03  # ~4-5.5
-    elif ranking <= 200:
-        base_price = 4.5 - (ranking - 101) * 0.01  # ~3.5-4.5
-    else:
-        base_price = 4.0
-
-    # Ajusta baseado em pontos de especialidade
-    total_spec_points = sum(speciality_points.values()) if speciality_points else 0
-    if total_spec_points > 2000:
-        base_price += 1.0
-    elif total_spec_points > 1000:
-        base_price += 0.5
-
-    return round(max(3.0, min(15.0, base_price)), 1)
-
-
-def determine_category(speciality_points: Dict[str, int]) -> str:
-    """
-    Determina a categoria do ciclista baseado nos pontos por especialidade.
-
-    Especialidades do PCS:
-    - one-day-races
-    - gc (general classification)
-    - time-trial
-    - sprint
-    - climber
-    - hills (puncheur)
-    """
-    if not speciality_points:
-        return "ROULEUR"
-
-    # Encontra a especialidade com mais pontos
-    max_spec = max(speciality_points, key=speciality_points.get, default=None)
-
-    if max_spec == "sprint":
-        return "SPRINTER"
-    elif max_spec == "climber":
-        return "CLIMBER"
-    elif max_spec == "gc":
-        return "GC"
-    elif max_spec in ["one-day-races", "hills"]:
-        return "CLASSICS"
-    elif max_spec == "time-trial":
-        return "ROULEUR"
-    else:
-        return "ROULEUR"
-
-
-def get_speciality_name(speciality_points: Dict[str, int]) -> str:
-    """Retorna o nome da especialidade principal."""
-    if not speciality_points:
-        return ""
-
-    max_spec = max(speciality_points, key=speciality_points.get, default=None)
-
-    spec_names = {
-        "sprint": "Sprinter",
-        "climber": "Climber",
-        "gc": "GC",
-        "one-day-races": "Classics",
-        "hills": "Puncheur",
-        "time-trial": "Time Trial"
-    }
-
-    return spec_names.get(max_spec, "All-rounder")
+# Idades contra uma só data de referência para a execução toda
+DATES = DateEngine()
 
 
 def extract_rider_url(url_or_name: str) -> str:
@@ -171,11 +107,13 @@ def extract_rider_url(url_or_name: str) -> str:
     return f"rider/{name}"
 
 
-def fetch_rider_data(url_path: str) -> Optional[Dict[str, Any]]:
+def fetch_rider_data(url_path: str, retry_queue: Optional[RetryQueue] = None,
+                     output_file: str = '', **context: Any) -> Optional[Dict[str, Any]]:
     """
     Busca dados de um ciclista usando a API procyclingstats.
 
-    Retorna um dicionário com todos os dados ou None se falhar.
+    Retorna um dicionário com todos os dados ou None se falhar. Se for dada
+    uma retry_queue, a falha fica registada com a classe do erro e o contexto.
     """
     try:
         rider = Rider(url_path)
@@ -189,10 +127,11 @@ def fetch_rider_data(url_path: str) -> Optional[Dict[str, Any]]:
             'weight': data.get('weight'),
             'height': data.get('height'),
             'speciality_points': {},
+            'photo_url': data.get('image_url') or '',
         }
 
         # Pontos por especialidade
-        spec_points = data.get('points_per_specialty', {})
+        spec_points = speciality_points(data)
         if spec_points:
             result['speciality_points'] = spec_points
 
@@ -200,9 +139,72 @@ def fetch_rider_data(url_path: str) -> Optional[Dict[str, Any]]:
 
     except Exception as e:
         print(f"  Erro ao buscar {url_path}: {e}")
+        if retry_queue is not None:
+            retry_queue.add(SOURCE, url_path, e, output=output_file, **context)
         return None
 
 
+def apply_fetched_data(cyclist: RiderRecord, fetched: Dict[str, Any], ranking: int):
+    """Atualiza os dados base de um ciclista com os dados buscados."""
+    if fetched['nationality']:
+        cyclist.update(nationality=fetched['nationality'])
+
+    if fetched['birthdate']:
+        cyclist.update(age=DATES.age(fetched['birthdate'], key='pcs.birthdate'))
+
+    spec_points = fetched.get('speciality_points', {})
+    if spec_points:
+        speciality, category, _secondary = classify_rider(spec_points)
+        cyclist.update(
+            speciality=speciality,
+            category=category,
+            price=calculate_price(ranking, spec_points),
+        )
+    else:
+        cyclist.update(price=calculate_price(ranking, {}))
+
+
+def queue_job(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Um ciclista do work_queue.py (name, team, ranking, url). Retorna a linha do CSV ou None."""
+    ranking = payload.get('ranking', 999)
+    fetched = fetch_rider_data(extract_rider_url(payload['url']), name=payload['name'],
+                               team=payload['team'], ranking=ranking)
+    if not fetched:
+        return None
+    cyclist_data = RiderRecord.from_name(payload['name'], team=payload['team'], uci_ranking=ranking)
+    apply_fetched_data(cyclist_data, fetched, ranking)
+    return cyclist_data.to_row()
+
+
+def enrich_stream(records: Iterable[RiderRecord]) -> Iterator[RiderRecord]:
+    """Enriquece cada ciclista de um stream assim que chega (modo --stream)."""
+    retry_queue = RetryQueue()
+    refresh_state = RefreshState()
+    try:
+        for cyclist_data in records:
+            name = cyclist_data.full_name
+            ranking = cyclist_data.uci_ranking or 999
+            url_path = extract_rider_url(cyclist_data.profile_url or name)
+            print(f"A processar: {name}...")
+            fetched = fetch_rider_data(url_path, retry_queue, '', name=name,
+                                       team=cyclist_data.team, ranking=ranking)
+            if fetched:
+                retry_queue.resolve(SOURCE, url_path)
+                refresh_state.mark(url_path)
+                apply_fetched_data(cyclist_data, fetched, ranking)
+                print(f"  ✓ {cyclist_data.nationality} | {cyclist_data.category} | €{cyclist_data.price}M")
+            else:
+                cyclist_data.update(price=calculate_price(ranking, {}))
+                print("  ✗ Sem dados adicionais, usando defaults")
+            yield cyclist_data
+
+            # Rate limiting para não sobrecarregar o site
+            time.sleep(1.5)
+    finally:
+        retry_queue.save()
+        refresh_state.save()
+
+
 def process_csv(input_file: str, output_file: str):
     """
     Processa o CSV de entrada e gera um CSV enriquecido.
@@ -212,8 +214,15 @@ def process_csv(input_file: str, output_file: str):
 
     Formato de saída:
     first_name,last_name,team,nationality,age,uci_ranking,speciality,price,category
+
+    Ao lado ficam a tabela de ciclistas semelhantes (similar_riders.py) e a
+    lista de fotos (rider_photos.py).
     """
     cyclists = []
+    speciality_points = []
+    photos = []
+    retry_queue = RetryQueue()
+    refresh_state = RefreshState()
 
     print(f"\n{'='*60}")
     print("Enriquecedor de Dados de Ciclistas")
@@ -238,102 +247,198 @@ def process_csv(input_file: str, output_file: str):
         print(f"[{i}/{len(rows)}] A processar: {name}...")
 
         # Dados base
-        cyclist_data = {
-            'name': name,
-            'team': team,
-            'ranking': ranking,
-            'nationality': '',
-            'age': None,
-            'speciality': '',
-            'category': 'ROULEUR',
-            'price': 5.0,
-        }
+        cyclist_data = RiderRecord.from_name(name, team=team, uci_ranking=ranking)
+        spec_points = {}
 
         # Tenta buscar dados adicionais
         if url:
             url_path = extract_rider_url(url)
-            fetched = fetch_rider_data(url_path)
+            fetched = fetch_rider_data(url_path, retry_queue, output_file,
+                                       name=name, team=team, ranking=ranking)
 
             if fetched:
                 # Atualiza com dados buscados
-                if fetched['nationality']:
-                    cyclist_data['nationality'] = fetched['nationality']
-
-                if fetched['birthdate']:
-                    cyclist_data['age'] = calculate_age(fetched['birthdate'])
-
+                retry_queue.resolve(SOURCE, url_path)
+                refresh_state.mark(url_path)
+                apply_fetched_data(cyclist_data, fetched, ranking)
                 spec_points = fetched.get('speciality_points', {})
-                if spec_points:
-                    cyclist_data['speciality'] = get_speciality_name(spec_points)
-                    cyclist_data['category'] = determine_category(spec_points)
-                    cyclist_data['price'] = calculate_price(ranking, spec_points)
-                else:
-                    cyclist_data['price'] = calculate_price(ranking, {})
-
-                print(f"  ✓ {cyclist_data['nationality']} | {cyclist_data['category']} | €{cyclist_data['price']}M")
+                photos.append((name, fetched['photo_url']))
+
+                print(f"  ✓ {cyclist_data.nationality} | {cyclist_data.category} | €{cyclist_data.price}M")
             else:
-                cyclist_data['price'] = calculate_price(ranking, {})
+                cyclist_data.update(price=calculate_price(ranking, {}))
                 print(f"  ✗ Sem dados adicionais, usando defaults")
         else:
-            cyclist_data['price'] = calculate_price(ranking, {})
+            cyclist_data.update(price=calculate_price(ranking, {}))
             print(f"  - Sem URL, usando ranking para preço")
 
         cyclists.append(cyclist_data)
+        speciality_points.append(spec_points)
 
         # Rate limiting para não sobrecarregar o site
         time.sleep(1.5)
 
-    # Separa nome em primeiro e último nome
-    for c in cyclists:
-        name_parts = c['name'].split(' ', 1)
-        c['first_name'] = name_parts[0]
-        c['last_name'] = name_parts[1] if len(name_parts) > 1 else ''
-
     # Escreve o CSV de saída
     print(f"\n{'='*60}")
     print(f"A guardar {len(cyclists)} ciclistas em: {output_file}")
 
-    fieldnames = ['first_name', 'last_name', 'team', 'nationality', 'age',
-                  'uci_ranking', 'speciality', 'price', 'category']
-
-    with open(output_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-
-        for c in cyclists:
-            writer.writerow({
-                'first_name': c['first_name'],
-                'last_name': c['last_name'],
-                'team': c['team'],
-                'nationality': c['nationality'],
-                'age': c['age'] if c['age'] else '',
-                'uci_ranking': c['ranking'],
-                'speciality': c['speciality'],
-                'price': c['price'],
-                'category': c['category'],
-            })
+    write_csv(output_file, cyclists)
+
+    similar_file = write_neighbours(output_file, cyclists, speciality_points)
+    print(f"Ciclistas semelhantes por faixa de preço em: {similar_file}")
+    print(f"Fotos para o rider_photos.py em: {write_photo_list(output_file, photos)}")
+    print(f"Histórico de preços: {record_run(output_file, cyclists)} preços novos")
+
+    retry_queue.save()
+    refresh_state.save()
 
     print(f"\n{'='*60}")
     print("CONCLUÍDO!")
     print(f"{'='*60}")
 
+    failed = retry_queue.pending(SOURCE, output_file)
+    if failed:
+        print(f"\n{len(failed)} ciclistas falharam e ficaram em {retry_queue.path}")
+        print(f"Para tentar de novo: python enrich_cyclists.py --retry-failed {output_file}")
+
     # Estatísticas
     categories = {}
     for c in cyclists:
-        cat = c['category']
+        cat = c.category
         categories[cat] = categories.get(cat, 0) + 1
 
     print("\nEstatísticas por categoria:")
     for cat, count in sorted(categories.items()):
         print(f"  {cat}: {count}")
 
-    avg_price = sum(c['price'] for c in cyclists) / len(cyclists)
+    avg_price = sum(c.price for c in cyclists) / len(cyclists)
     print(f"\nPreço médio: €{avg_price:.2f}M")
 
 
+def retry_failed(output_file: str):
+    """
+    Volta a buscar apenas os ciclistas em failed_riders.json e corrige
+    as respetivas linhas no CSV de saída existente.
+    """
+    retry_queue = RetryQueue()
+    refresh_state = RefreshState()
+    entries = retry_queue.pending(SOURCE, output_file)
+
+    print(f"\n{'='*60}")
+    print("Nova tentativa de ciclistas falhados")
+    print(f"{'='*60}")
+    print(f"\n{len(entries)} ciclistas pendentes para {output_file}\n")
+
+    recovered = []
+    for i, entry in enumerate(entries, 1):
+        context = entry['context']
+        ranking = context.get('ranking', 999)
+        print(f"[{i}/{len(entries)}] {context.get('name', entry['key'])} "
+              f"({entry['error_class']}, {entry['attempts']} tentativas)...")
+
+        fetched = fetch_rider_data(entry['key'], retry_queue, output_file, **context)
+        if fetched:
+            cyclist_data = RiderRecord.from_name(context.get('name', ''),
+                                                 team=context.get('team', ''),
+                                                 uci_ranking=ranking)
+            apply_fetched_data(cyclist_data, fetched, ranking)
+            recovered.append(cyclist_data)
+            retry_queue.resolve(SOURCE, entry['key'])
+            refresh_state.mark(entry['key'])
+            print(f"  ✓ {cyclist_data.nationality} | {cyclist_data.category} | €{cyclist_data.price}M")
+        else:
+            print("  ✗ Falhou outra vez")
+
+        time.sleep(1.5)
+
+    if recovered:
+        patch_csv(output_file, FIELDNAMES, [c.to_row() for c in recovered])
+        print(f"Histórico de preços: {record_run(output_file, recovered)} preços novos")
+    retry_queue.save()
+    refresh_state.save()
+
+    print(f"\nRecuperados: {len(recovered)} | Ainda em falha: {len(entries) - len(recovered)}")
+
+
+def refresh_budget(input_file: str, output_file: str, budget: int,
+                   demand_file: str = '', races_file: str = '', participants_file: str = ''):
+    """
+    Busca só os `budget` ciclistas com maior prioridade (refresh_scheduler.py)
+    e corrige as respetivas linhas no CSV de saída existente.
+    """
+    retry_queue = RetryQueue()
+    refresh_state = RefreshState()
+    riders = [r for r in read_input(input_file) if r['url']]
+    keys = [extract_rider_url(r['url']) for r in riders]
+    ownership = ownership_by_cyclist(read_rows(demand_file)) if demand_file else {}
+    race_days = {}
+    if races_file and participants_file:
+        race_days = next_race_days(read_rows(races_file), read_rows(participants_file),
+                                   int(time.time() * 1000))
+    chosen = schedule(riders, keys, budget, refresh_state, ownership, race_days)
+
+    print(f"\n{'='*60}")
+    print("Atualização por prioridade")
+    print(f"{'='*60}")
+    print(f"\n{len(chosen)} de {len(riders)} ciclistas a buscar para {output_file}\n")
+
+    refreshed = []
+    for n, i in enumerate(chosen, 1):
+        rider, url_path = riders[i], keys[i]
+        print(f"[{n}/{len(chosen)}] A processar: {rider['name']}...")
+
+        fetched = fetch_rider_data(url_path, retry_queue, output_file, name=rider['name'],
+                                   team=rider['team'], ranking=rider['ranking'])
+        if fetched:
+            cyclist_data = RiderRecord.from_name(rider['name'], team=rider['team'],
+                                                 uci_ranking=rider['ranking'])
+            apply_fetched_data(cyclist_data, fetched, rider['ranking'])
+            refreshed.append(cyclist_data)
+            retry_queue.resolve(SOURCE, url_path)
+            refresh_state.mark(url_path)
+            print(f"  ✓ {cyclist_data.nationality} | {cyclist_data.category} | €{cyclist_data.price}M")
+        else:
+            print("  ✗ Falhou, fica para a próxima execução")
+
+        time.sleep(1.5)
+
+    if refreshed:
+        patch_csv(output_file, FIELDNAMES, [c.to_row() for c in refreshed])
+        print(f"Histórico de preços: {record_run(output_file, refreshed)} preços novos")
+    retry_queue.save()
+    refresh_state.save()
+
+    print(f"\nAtualizados: {len(refreshed)} | Falharam: {len(chosen) - len(refreshed)}")
+
+
 def main():
-    if len(sys.argv) < 2:
+    if len(sys.argv) == 2 and sys.argv[1] == '--stream':
+        with stream_stdio() as (inp, out):
+            count = write_stream(enrich_stream(read_stream(inp)), out)
+        print(f"✓ {count} ciclistas enriquecidos", file=sys.stderr)
+        return
+
+    if len(sys.argv) >= 4 and sys.argv[1] == '--budget' and sys.argv[2].isdigit():
+        args = sys.argv[3:]
+        demand_file = take_option(args, '--demand', '')
+        races_file = take_option(args, '--races', '')
+        participants_file = take_option(args, '--participants', '')
+        if len(args) in (1, 2) and not args[-1].startswith('--') and bool(races_file) == bool(participants_file):
+            refresh_budget(args[0], args[1] if len(args) > 1 else 'cyclists_enriched.csv',
+                           int(sys.argv[2]), demand_file, races_file, participants_file)
+            return
+
+    if len(sys.argv) >= 2 and sys.argv[1] == '--retry-failed':
+        output_file = sys.argv[2] if len(sys.argv) > 2 else 'cyclists_enriched.csv'
+        retry_failed(output_file)
+        return
+
+    if len(sys.argv) < 2 or sys.argv[1] == '--budget':
         print("Uso: python enrich_cyclists.py input.csv [output.csv]")
+        print("     python enrich_cyclists.py --retry-failed [output.csv]")
+        print("     python enrich_cyclists.py --budget N input.csv [output.csv] [--demand demand.csv] "
+              "[--races races.csv --participants race_participants.csv]")
+        print("     ... | python enrich_cyclists.py --stream | ...")
         print("\nFormato do CSV de entrada:")
         print("  Nome,Equipa,Ranking,URL")
         print("  Tadej Pogačar,UAE Team Emirates,1,rider/tadej-pogacar")
@@ -18,9 +18,14 @@ import sys
 import time
 import re
 import io
-from datetime import datetime
 from typing import Optional, Dict, Any, List
 
+from date_engine import DateEngine
+from price_history_store import record_run
+from price_tiers import cyclingranking_price as calculate_price
+from rider_record import FIELDNAMES_WITH_URL, RiderRecord, write_csv
+from speciality_classifier import category_from_name
+
 # Fix Windows console encoding
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
 sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
@@ -58,95 +63,8 @@ COUNTRY_MAP = {
     'CRO': 'Croatia', 'SRB': 'Serbia', 'ROU': 'Romania', 'BUL': 'Bulgaria',
 }
 
-
-def calculate_age_from_birthday(birthday_str: str) -> Optional[int]:
-    """Calcula idade a partir de string de data (ex: '21-Sep-1998')."""
-    if not birthday_str:
-        return None
-    try:
-        birth = datetime.strptime(birthday_str, "%d-%b-%Y")
-        today = datetime.now()
-        age = today.year - birth.year - ((today.month, today.day) < (birth.month, birth.day))
-        return age
-    except:
-        try:
-            # Tenta formato alternativo
-            birth = datetime.strptime(birthday_str, "%Y-%m-%d")
-            today = datetime.now()
-            age = today.year - birth.year - ((today.month, today.day) < (birth.month, birth.day))
-            return age
-        except:
-            return None
-
-
-def calculate_price(ranking: int) -> float:
-    """
-    Calcula o preço do ciclista baseado no ranking UCI.
-
-    Escala:
-    - Top 5: €13-15M
-    - Top 10: €10-12M
-    - Top 25: €7.5-10M
-    - Top 50: €5.5-7.5M
-    - Top 100: €4.5-5.5M
-    - Top 200: €4-4.5M
-    - Resto: €3.5-4M
-    """
-    if ranking <= 1:
-        return 15.0
-    elif ranking <= 3:
-        return 14.0 - (ranking - 2) * 0.5
-    elif ranking <= 5:
-        return 13.0 - (ranking - 4) * 0.5
-    elif ranking <= 10:
-        return 12.0 - (ranking - 6) * 0.4
-    elif ranking <= 25:
-        return 10.0 - (ranking - 11) * 0.15
-    elif ranking <= 50:
-        return 7.5 - (ranking - 26) * 0.08
-    elif ranking <= 100:
-        return 5.5 - (ranking - 51) * 0.02
-    elif ranking <= 200:
-        return 4.5 - (ranking - 101) * 0.005
-    else:
-        return 4.0
-
-    return round(max(3.5, min(15.0, price)), 1)
-
-
-def infer_category_from_team_and_name(name: str, team: str) -> str:
-    """
-    Tenta inferir a categoria baseado no nome e equipa.
-    Usa conhecimento de ciclistas famosos.
-    """
-    name_lower = name.lower()
-
-    # Sprinters conhecidos
-    sprinters = ['philipsen', 'milan', 'groenewegen', 'merlier', 'ackermann',
-                 'cavendish', 'jakobsen', 'kooij', 'de lie', 'groves', 'matthews']
-    if any(s in name_lower for s in sprinters):
-        return "SPRINTER"
-
-    # GC riders conhecidos
-    gc_riders = ['pogačar', 'pogacar', 'vingegaard', 'evenepoel', 'roglic', 'roglič',
-                 'almeida', 'ayuso', 'rodriguez', 'yates', 'mas', 'carapaz', 'bernal',
-                 'hindley', 'vlasov', 'tiberi', 'jorgenson', 'uijtdebroeks', 'thomas']
-    if any(g in name_lower for g in gc_riders):
-        return "GC"
-
-    # Climbers conhecidos
-    climbers = ['healy', 'vine', 'gaudu', 'martinez', 'bilbao', 'landa', 'ciccone',
-                'buitrago', 'quintana', 'kuss', 'powless', 'bardet', 'gall']
-    if any(c in name_lower for c in climbers):
-        return "CLIMBER"
-
-    # Classics specialists
-    classics = ['van der poel', 'van aert', 'pidcock', 'pedersen', 'asgreen',
-                'mohoric', 'mohorič', 'alaphilippe', 'laporte', 'van baarle', 'benoot']
-    if any(c in name_lower for c in classics):
-        return "CLASSICS"
-
-    return "ROULEUR"
+# Idades contra uma só data de referência para a execução toda
+DATES = DateEngine()
 
 
 def search_cyclist_cyclingranking(name: str, team: str) -> Optional[Dict[str, Any]]:
@@ -322,61 +240,37 @@ def process_csv(input_file: str, output_file: str):
         print(f"[{i}/{len(rows)}] {name} ({team})...")
 
         # Dados base
-        cyclist_data = {
-            'name': name,
-            'team': team,
-            'ranking': ranking,
-            'nationality': nationality,
-            'age': None,
-            'speciality': infer_category_from_team_and_name(name, team),
-            'category': infer_category_from_team_and_name(name, team),
-            'price': calculate_price(ranking),
-            'profile_url': profile_url,
-        }
+        category = category_from_name(name)
+        cyclist_data = RiderRecord.from_name(
+            name,
+            team=team,
+            uci_ranking=ranking,
+            nationality=nationality,
+            speciality=category,
+            category=category,
+            price=calculate_price(ranking),
+            profile_url=profile_url,
+        )
 
         # Tenta buscar dados adicionais (opcional - pode ser lento)
         # Descomenta se quiseres buscar online:
         # fetched = search_cyclist_cyclingranking(name, team)
         # if fetched:
         #     if fetched['nationality']:
-        #         cyclist_data['nationality'] = fetched['nationality']
+        #         cyclist_data.update(nationality=fetched['nationality'])
         #     if fetched.get('birthday'):
-        #         cyclist_data['age'] = calculate_age_from_birthday(fetched['birthday'])
-        #     print(f"  ✓ Online: {cyclist_data['nationality']}")
+        #         cyclist_data.update(age=DATES.age(fetched['birthday'], key='cyclingranking.birthday'))
+        #     print(f"  ✓ Online: {cyclist_data.nationality}")
 
-        print(f"  → {cyclist_data['category']} | €{cyclist_data['price']:.1f}M")
+        print(f"  → {cyclist_data.category} | €{cyclist_data.price:.1f}M")
         cyclists.append(cyclist_data)
 
-    # Separa nome em primeiro e último nome
-    for c in cyclists:
-        name_parts = c['name'].split(' ', 1)
-        c['first_name'] = name_parts[0]
-        c['last_name'] = name_parts[1] if len(name_parts) > 1 else ''
-
     # Escreve o CSV de saída
     print(f"\n{'='*60}")
     print(f"A guardar {len(cyclists)} ciclistas em: {output_file}")
 
-    fieldnames = ['first_name', 'last_name', 'team', 'nationality', 'age',
-                  'uci_ranking', 'speciality', 'price', 'category', 'profile_url']
-
-    with open(output_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-
-        for c in cyclists:
-            writer.writerow({
-                'first_name': c['first_name'],
-                'last_name': c['last_name'],
-                'team': c['team'],
-                'nationality': c['nationality'],
-                'age': c['age'] if c['age'] else '',
-                'uci_ranking': c['ranking'],
-                'speciality': c['speciality'],
-                'price': c['price'],
-                'category': c['category'],
-                'profile_url': c.get('profile_url', ''),
-            })
+    write_csv(output_file, cyclists, fieldnames=FIELDNAMES_WITH_URL)
+    print(f"Histórico de preços: {record_run(output_file, cyclists)} preços novos")
 
     print(f"\n{'='*60}")
     print("CONCLUÍDO!")
@@ -385,14 +279,14 @@ def process_csv(input_file: str, output_file: str):
     # Estatísticas
     categories = {}
     for c in cyclists:
-        cat = c['category']
+        cat = c.category
         categories[cat] = categories.get(cat, 0) + 1
 
     print("\nEstatísticas por categoria:")
     for cat, count in sorted(categories.items()):
         print(f"  {cat}: {count}")
 
-    total_value = sum(c['price'] for c in cyclists)
+    total_value = sum(c.price for c in cyclists)
     avg_price = total_value / len(cyclists) if cyclists else 0
     print(f"\nValor total: €{total_value:.1f}M")
     print(f"Preço médio: €{avg_price:.2f}M")
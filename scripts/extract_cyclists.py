@@ -5,14 +5,20 @@ e exportar para CSV compativel com a app CiclismoPortugal.
 
 Uso:
     python extract_cyclists.py
+    python extract_cyclists.py --stream team/url-1 team/url-2 ... | ...
 
-O script vai pedir os URLs das equipas e gerar um ficheiro cyclists.csv
+O script vai pedir os URLs das equipas e gerar um ficheiro cyclists.csv.
+Com --stream os ciclistas de cada equipa vão para o stdout como stream
+NDJSON (rider_stream.py) logo que a equipa é extraída.
 """
 
-import csv
 import sys
 import time
 
+from rider_record import RiderRecord, write_csv
+from rider_stream import stream_stdio, write_stream
+from speciality_classifier import classify_rider
+
 try:
     from procyclingstats import Team, Rider
 except ImportError:
@@ -38,35 +44,15 @@ def get_rider_details(rider_url: str) -> dict:
         first_name = name_parts[0] if name_parts else ''
         last_name = name_parts[1] if len(name_parts) > 1 else ''
 
-        # Get speciality from points breakdown
-        specialities = data.get('points_per_speciality', {})
-        main_speciality = ''
-        if specialities:
-            # Find highest scoring speciality
-            max_points = 0
-            for spec, points in specialities.items():
-                if points and points > max_points:
-                    max_points = points
-                    main_speciality = spec
-
-        # Map speciality to category
-        category = 'ROULEUR'
-        spec_lower = main_speciality.lower() if main_speciality else ''
-        if 'sprint' in spec_lower:
-            category = 'SPRINTER'
-        elif 'climb' in spec_lower or 'mountain' in spec_lower:
-            category = 'CLIMBER'
-        elif 'gc' in spec_lower or 'stage' in spec_lower:
-            category = 'GC'
-        elif 'one_day' in spec_lower or 'classic' in spec_lower:
-            category = 'CLASSICS'
+        # Speciality and category from points breakdown
+        speciality, category, _secondary = classify_rider(data.get('points_per_speciality', {}))
 
         return {
             'first_name': first_name,
             'last_name': last_name,
             'nationality': data.get('nationality', ''),
             'age': data.get('age', ''),
-            'speciality': main_speciality.replace('_', ' ').title() if main_speciality else '',
+            'speciality': speciality,
             'category': category
         }
     except Exception as e:
@@ -102,36 +88,26 @@ def extract_team_cyclists(team_url: str) -> list:
 
             print(f"  [{i+1}/{len(riders)}] {rider_name}...", end=' ')
 
-            # Parse name
-            name_parts = rider_name.split(' ', 1) if rider_name else ['', '']
-            first_name = name_parts[0] if name_parts else ''
-            last_name = name_parts[1] if len(name_parts) > 1 else ''
-
-            cyclist_data = {
-                'first_name': first_name,
-                'last_name': last_name,
-                'team': team_name,
-                'nationality': rider.get('nationality', ''),
-                'age': rider.get('age', ''),
-                'uci_ranking': '',
-                'speciality': '',
-                'price': '5.0',
-                'category': 'ROULEUR'
-            }
+            cyclist_data = RiderRecord.from_name(
+                rider_name,
+                team=team_name,
+                nationality=rider.get('nationality', ''),
+                age=rider.get('age', ''),
+            )
 
             # Try to get more details from rider page
             if rider_url:
                 time.sleep(0.5)  # Rate limiting
                 details = get_rider_details(rider_url)
                 if details:
-                    cyclist_data.update({
-                        'first_name': details.get('first_name', cyclist_data['first_name']),
-                        'last_name': details.get('last_name', cyclist_data['last_name']),
-                        'nationality': details.get('nationality', cyclist_data['nationality']),
-                        'age': details.get('age', cyclist_data['age']),
-                        'speciality': details.get('speciality', ''),
-                        'category': details.get('category', 'ROULEUR')
-                    })
+                    cyclist_data.update(
+                        first_name=details.get('first_name', cyclist_data.first_name),
+                        last_name=details.get('last_name', cyclist_data.last_name),
+                        nationality=details.get('nationality', cyclist_data.nationality),
+                        age=details.get('age', cyclist_data.age),
+                        speciality=details.get('speciality', ''),
+                        category=details.get('category', 'ROULEUR')
+                    )
 
             cyclists.append(cyclist_data)
             print("OK")
@@ -148,19 +124,27 @@ def export_to_csv(cyclists: list, filename: str = 'cyclists.csv'):
         print("Nenhum ciclista para exportar!")
         return
 
-    fieldnames = ['first_name', 'last_name', 'team', 'nationality', 'age',
-                  'uci_ranking', 'speciality', 'price', 'category']
-
-    with open(filename, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        # Don't write header - app expects data only
-        for cyclist in cyclists:
-            writer.writerow(cyclist)
+    # Don't write header - app expects data only
+    write_csv(filename, cyclists, header=False)
 
     print(f"\n✓ Exportados {len(cyclists)} ciclistas para {filename}")
 
 
+def stream_teams(team_urls: list):
+    """Ciclistas equipa a equipa, para o modo --stream"""
+    for i, url in enumerate(team_urls):
+        if i:
+            time.sleep(1)  # Delay between teams
+        yield from extract_team_cyclists(url)
+
+
 def main():
+    if len(sys.argv) > 2 and sys.argv[1] == '--stream':
+        with stream_stdio() as (_, out):
+            count = write_stream(stream_teams(sys.argv[2:]), out)
+        print(f"✓ {count} ciclistas enviados", file=sys.stderr)
+        return
+
     print("=" * 50)
     print("Extrator de Ciclistas - ProCyclingStats")
     print("=" * 50)
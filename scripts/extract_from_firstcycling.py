@@ -10,10 +10,11 @@ Uso:
 Gera um ficheiro cyclists.csv compativel com a app CiclismoPortugal.
 """
 
-import csv
 import sys
 import time
 
+from rider_record import RiderRecord, write_csv
+
 # Tenta importar/instalar a biblioteca
 try:
     from first_cycling_api import Rider, Team
@@ -65,22 +66,8 @@ def get_team_roster(team_id: int, team_name: str) -> list:
                     rider_name = rider.get('name', '')
                     nationality = rider.get('nationality', '')
 
-                    # Separar nome
-                    name_parts = rider_name.split(' ', 1) if rider_name else ['', '']
-                    first_name = name_parts[0] if name_parts else ''
-                    last_name = name_parts[1] if len(name_parts) > 1 else ''
-
-                    cyclists.append({
-                        'first_name': first_name,
-                        'last_name': last_name,
-                        'team': team_name,
-                        'nationality': nationality,
-                        'age': '',
-                        'uci_ranking': '',
-                        'speciality': '',
-                        'price': '5.0',
-                        'category': 'ROULEUR'
-                    })
+                    cyclists.append(RiderRecord.from_name(
+                        rider_name, team=team_name, nationality=nationality))
                     print(f"  + {rider_name}")
                 except Exception as e:
                     continue
@@ -97,13 +84,7 @@ def export_to_csv(cyclists: list, filename: str = 'cyclists_firstcycling.csv'):
         print("Nenhum ciclista para exportar!")
         return
 
-    fieldnames = ['first_name', 'last_name', 'team', 'nationality', 'age',
-                  'uci_ranking', 'speciality', 'price', 'category']
-
-    with open(filename, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        for cyclist in cyclists:
-            writer.writerow(cyclist)
+    write_csv(filename, cyclists, header=False)
 
     print(f"\n✓ Exportados {len(cyclists)} ciclistas para {filename}")
 
@@ -5,14 +5,21 @@ e exportar para CSV compativel com a app CiclismoPortugal.
 
 Uso:
     python extract_riders.py
+    python extract_riders.py --retry-failed
 
 Podes colar uma lista de URLs de ciclistas e o script gera um CSV.
+Os URLs que falharem ficam em failed_riders.json; o modo --retry-failed
+volta a buscar so esses e acrescenta-os ao cyclists.csv existente.
+Para listas grandes em varios processos ou maquinas, ver work_queue.py.
 """
 
-import csv
 import sys
 import time
 
+from retry_queue import RetryQueue, patch_csv
+from rider_record import FIELDNAMES, RiderRecord, write_csv
+from speciality_classifier import classify_rider
+
 try:
     from procyclingstats import Rider
 except ImportError:
@@ -22,8 +29,12 @@ except ImportError:
     from procyclingstats import Rider
 
 
-def extract_rider(rider_url: str, team_name: str = '') -> dict:
-    """Extrair dados de um ciclista"""
+SOURCE = 'extract_riders'
+
+
+def extract_rider(rider_url: str, team_name: str = '', retry_queue: RetryQueue = None,
+                  output_file: str = 'cyclists.csv') -> RiderRecord:
+    """Extrair dados de um ciclista (falhas ficam na retry_queue, se dada)"""
     try:
         # Clean URL - extract rider path
         if "procyclingstats.com/" in rider_url:
@@ -34,11 +45,7 @@ def extract_rider(rider_url: str, team_name: str = '') -> dict:
         rider = Rider(rider_path)
         data = rider.parse()
 
-        # Extract name parts
         name = data.get('name', '')
-        name_parts = name.split(' ', 1)
-        first_name = name_parts[0] if name_parts else ''
-        last_name = name_parts[1] if len(name_parts) > 1 else ''
 
         # Get team from data if not provided
         if not team_name:
@@ -46,27 +53,8 @@ def extract_rider(rider_url: str, team_name: str = '') -> dict:
             if teams:
                 team_name = teams[0].get('team_name', '') if isinstance(teams[0], dict) else str(teams[0])
 
-        # Get speciality from points breakdown
-        specialities = data.get('points_per_speciality', {})
-        main_speciality = ''
-        if specialities:
-            max_points = 0
-            for spec, points in specialities.items():
-                if points and points > max_points:
-                    max_points = points
-                    main_speciality = spec
-
-        # Map speciality to category
-        category = 'ROULEUR'
-        spec_lower = main_speciality.lower() if main_speciality else ''
-        if 'sprint' in spec_lower:
-            category = 'SPRINTER'
-        elif 'climb' in spec_lower or 'mountain' in spec_lower:
-            category = 'CLIMBER'
-        elif 'gc' in spec_lower or 'stage' in spec_lower:
-            category = 'GC'
-        elif 'one_day' in spec_lower or 'classic' in spec_lower:
-            category = 'CLASSICS'
+        # Speciality and category from points breakdown
+        speciality, category, _secondary = classify_rider(data.get('points_per_speciality', {}))
 
         # Calculate price based on ranking (simplified)
         price = 5.0
@@ -87,41 +75,78 @@ def extract_rider(rider_url: str, team_name: str = '') -> dict:
             except:
                 pass
 
-        return {
-            'first_name': first_name,
-            'last_name': last_name,
-            'team': team_name,
-            'nationality': data.get('nationality', ''),
-            'age': data.get('age', ''),
-            'uci_ranking': data.get('ranking_position', ''),
-            'speciality': main_speciality.replace('_', ' ').title() if main_speciality else '',
-            'price': str(price),
-            'category': category
-        }
+        return RiderRecord.from_name(
+            name,
+            team=team_name,
+            nationality=data.get('nationality', ''),
+            age=data.get('age', ''),
+            uci_ranking=data.get('ranking_position', ''),
+            speciality=speciality,
+            price=price,
+            category=category
+        )
 
     except Exception as e:
         print(f"Erro: {e}")
+        if retry_queue is not None:
+            retry_queue.add(SOURCE, rider_url, e, output=output_file, team=team_name)
         return None
 
 
+def queue_job(payload: dict) -> dict:
+    """Um ciclista do work_queue.py (url, team). Retorna a linha do CSV ou None."""
+    cyclist = extract_rider(payload['url'], payload.get('team', ''))
+    return cyclist.to_row() if cyclist else None
+
+
 def export_to_csv(cyclists: list, filename: str = 'cyclists.csv'):
     """Exportar ciclistas para CSV"""
     if not cyclists:
         print("Nenhum ciclista para exportar!")
         return
 
-    fieldnames = ['first_name', 'last_name', 'team', 'nationality', 'age',
-                  'uci_ranking', 'speciality', 'price', 'category']
-
-    with open(filename, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        for cyclist in cyclists:
-            writer.writerow(cyclist)
+    write_csv(filename, cyclists, header=False)
 
     print(f"\n✓ Exportados {len(cyclists)} ciclistas para {filename}")
 
 
+def retry_failed(filename: str = 'cyclists.csv'):
+    """Voltar a buscar so os ciclistas falhados e corrigir o CSV existente"""
+    retry_queue = RetryQueue()
+    entries = retry_queue.pending(SOURCE, filename)
+
+    print("=" * 60)
+    print(f"Nova tentativa de {len(entries)} ciclistas falhados")
+    print("=" * 60)
+
+    recovered = []
+    for i, entry in enumerate(entries):
+        url = entry['key']
+        print(f"[{i+1}/{len(entries)}] {url.split('rider/')[-1]} ({entry['error_class']})...", end=' ')
+
+        cyclist = extract_rider(url, entry['context'].get('team', ''), retry_queue, filename)
+        if cyclist:
+            recovered.append(cyclist)
+            retry_queue.resolve(SOURCE, url)
+            print(f"OK - {cyclist.full_name}")
+        else:
+            print("FALHOU")
+
+        time.sleep(0.5)  # Rate limiting
+
+    if recovered:
+        # O cyclists.csv nao tem cabecalho (a app espera so dados)
+        patch_csv(filename, FIELDNAMES, [c.to_row() for c in recovered], header=False)
+    retry_queue.save()
+
+    print(f"\nRecuperados: {len(recovered)} | Ainda em falha: {len(entries) - len(recovered)}")
+
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--retry-failed':
+        retry_failed()
+        return
+
     print("=" * 60)
     print("Extrator de Ciclistas Individuais - ProCyclingStats")
     print("=" * 60)
@@ -165,18 +190,26 @@ def main():
     print("=" * 60)
 
     cyclists = []
+    retry_queue = RetryQueue()
     for i, url in enumerate(rider_urls):
         print(f"[{i+1}/{len(rider_urls)}] {url.split('rider/')[-1]}...", end=' ')
 
-        cyclist = extract_rider(url, team_name)
+        cyclist = extract_rider(url, team_name, retry_queue)
         if cyclist:
             cyclists.append(cyclist)
-            print(f"OK - {cyclist['first_name']} {cyclist['last_name']}")
+            retry_queue.resolve(SOURCE, url)
+            print(f"OK - {cyclist.full_name}")
         else:
             print("FALHOU")
 
         time.sleep(0.5)  # Rate limiting
 
+    retry_queue.save()
+    failed = retry_queue.pending(SOURCE, 'cyclists.csv')
+    if failed:
+        print(f"\n{len(failed)} ciclistas falharam (ver {retry_queue.path})")
+        print("Para tentar de novo: python extract_riders.py --retry-failed")
+
     if cyclists:
         export_to_csv(cyclists)
         print("\n" + "=" * 60)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Regras do jogo fantasy da app, replicadas para os scripts.
+
+Estas tabelas têm de ficar iguais às da app:
+- StageType / StagePointsTable / JerseyBonusPoints / FinalGcBonusPoints
+  (domain/model/Stage.kt)
+- PointsCalculator.calculateOneDayPoints (domain/scoring/PointsCalculator.kt)
+- DynamicPriceCalculator (domain/pricing/DynamicPriceCalculator.kt)
+- FantasyGameRules (domain/rules/FantasyGameRules.kt)
+
+Se mudarem na app, mudam aqui.
+"""
+
+from typing import Dict, Optional
+
+# StageType.pointsMultiplier (a ordem define o índice usado nas matrizes)
+STAGE_TYPES = ['PROLOGUE', 'FLAT', 'HILLY', 'MOUNTAIN', 'ITT', 'TTT']
+
+STAGE_TYPE_MULTIPLIERS: Dict[str, float] = {
+    'PROLOGUE': 0.5,
+    'FLAT': 1.0,
+    'HILLY': 1.0,
+    'MOUNTAIN': 1.2,
+    'ITT': 1.2,
+    'TTT': 1.0,
+}
+
+# StageType.displayNamePt, aceite por StageType.fromString
+STAGE_TYPE_NAMES_PT: Dict[str, str] = {
+    'PROLOGUE': 'Prologo',
+    'FLAT': 'Plana',
+    'HILLY': 'Ondulada',
+    'MOUNTAIN': 'Montanha',
+    'ITT': 'Contra-Relogio Individual',
+    'TTT': 'Contra-Relogio por Equipas',
+}
+
+# StagePointsTable.basePoints (top 20)
+STAGE_BASE_POINTS: Dict[int, int] = {
+    1: 50, 2: 40, 3: 35, 4: 30, 5: 25, 6: 22, 7: 20, 8: 18, 9: 16, 10: 14,
+    11: 12, 12: 10, 13: 8, 14: 6, 15: 5, 16: 4, 17: 3, 18: 2, 19: 1, 20: 1,
+}
+
+# JerseyBonusPoints
+JERSEY_GC_LEADER = 10
+JERSEY_POINTS_LEADER = 5
+JERSEY_MOUNTAINS_LEADER = 5
+JERSEY_YOUNG_LEADER = 3
+
+# FinalGcBonusPoints
+FINAL_GC_BONUS: Dict[int, int] = {
+    1: 200, 2: 150, 3: 100, 4: 80, 5: 60, 6: 50, 7: 40, 8: 35, 9: 30, 10: 25,
+}
+
+# PointsCalculator.calculateOneDayPoints (11-20: 5, 21-30: 2)
+ONE_DAY_POINTS: Dict[int, int] = {
+    1: 100, 2: 70, 3: 50, 4: 40, 5: 35, 6: 30, 7: 25, 8: 20, 9: 15, 10: 10,
+    **{p: 5 for p in range(11, 21)},
+    **{p: 2 for p in range(21, 31)},
+}
+
+# Multiplicadores de capitão (CalculateStageFantasyPointsUseCase)
+CAPTAIN_MULTIPLIER = 2
+TRIPLE_CAPTAIN_MULTIPLIER = 3
+
+# Estados de quem não terminou (StageResultStatus)
+NON_FINISH_STATUSES = {'DNF', 'DNS', 'DSQ', 'OTL'}
+
+# FantasyGameRules: equipa
+INITIAL_BUDGET = 100.0
+TEAM_SIZE = 15
+ACTIVE_CYCLISTS = 8
+MAX_FROM_SAME_PRO_TEAM = 3
+
+# FantasyGameRules.CATEGORY_REQUIREMENTS (3 GC + 3 Climber + 3 Sprint + 2 TT + 2 Hills + 2 Oneday)
+CATEGORY_REQUIREMENTS: Dict[str, int] = {
+    'GC': 3,
+    'CLIMBER': 3,
+    'SPRINT': 3,
+    'TT': 2,
+    'HILLS': 2,
+    'ONEDAY': 2,
+}
+
+# Categoria/especialidade do CSV -> CyclistCategory (importação do Admin Sync)
+GAME_CATEGORIES: Dict[str, str] = {
+    'CLIMBER': 'CLIMBER', 'CLIMBING': 'CLIMBER', 'MOUNTAINS': 'CLIMBER',
+    'HILLS': 'HILLS', 'PUNCHEUR': 'HILLS', 'PUNCHER': 'HILLS',
+    'TT': 'TT', 'TIME TRIAL': 'TT', 'TIMETRIAL': 'TT', 'ITT': 'TT',
+    'SPRINT': 'SPRINT', 'SPRINTER': 'SPRINT',
+    'GC': 'GC', 'GENERAL CLASSIFICATION': 'GC', 'STAGE RACES': 'GC',
+    'ONEDAY': 'ONEDAY', 'ONE DAY': 'ONEDAY', 'CLASSICS': 'ONEDAY', 'CLASSIC': 'ONEDAY',
+}
+
+# DynamicPriceCalculator: limites de preço (em milhões)
+MIN_PRICE = 1.0
+MAX_PRICE = 25.0
+MAX_DAILY_CHANGE_PERCENT = 0.05  # 5% max por dia
+
+# Procura: +0.1M por cada 5% de aumento de ownership
+OWNERSHIP_THRESHOLD = 5.0
+PRICE_CHANGE_PER_THRESHOLD = 0.1
+
+# Pré-corrida: +1% por dia nos 5 dias antes da corrida
+PRE_RACE_BOOST_PER_DAY = 0.01
+PRE_RACE_BOOST_DAYS = 5
+
+# PriceChangeReason (CyclistPriceHistoryEntity)
+PRICE_CHANGE_REASONS = ['DEMAND', 'PRE_RACE_BOOST', 'RACE_RESET', 'RESULTS', 'MANUAL', 'INITIAL']
+
+
+def stage_type_from_string(value: str) -> str:
+    """StageType.fromString: nome ou nome em português, FLAT por omissão."""
+    value = (value or '').strip().lower()
+    for stage_type in STAGE_TYPES:
+        if value in (stage_type.lower(), STAGE_TYPE_NAMES_PT[stage_type].lower()):
+            return stage_type
+    return 'FLAT'
+
+
+def stage_points(position: int, stage_type: str) -> int:
+    """StagePointsTable.getPoints: (base * multiplicador).toInt()."""
+    base = STAGE_BASE_POINTS.get(position, 0)
+    # int() trunca como o toInt() do Kotlin (mesmo double IEEE)
+    return int(base * STAGE_TYPE_MULTIPLIERS[stage_type])
+
+
+def jersey_bonus(is_gc_leader: bool, is_points_leader: bool,
+                 is_mountains_leader: bool, is_young_leader: bool) -> int:
+    """JerseyBonusPoints.calculate."""
+    total = 0
+    if is_gc_leader:
+        total += JERSEY_GC_LEADER
+    if is_points_leader:
+        total += JERSEY_POINTS_LEADER
+    if is_mountains_leader:
+        total += JERSEY_MOUNTAINS_LEADER
+    if is_young_leader:
+        total += JERSEY_YOUNG_LEADER
+    return total
+
+
+def game_category(value: str) -> Optional[str]:
+    """CyclistCategory de uma categoria do CSV; None se a app a ignorar (ex: ROULEUR)."""
+    return GAME_CATEGORIES.get((value or '').strip().upper())
+
+
+def _coerce_in(value: float, minimum: float, maximum: float) -> float:
+    return max(minimum, min(maximum, value))
+
+
+def ownership_percent(ownership_count: int, total_teams: int) -> float:
+    """CyclistDemandEntity.ownershipPercent."""
+    return (ownership_count / total_teams) * 100 if total_teams > 0 else 0.0
+
+
+def demand_price_change(current_price: float, previous_ownership: float,
+                        current_ownership: float) -> float:
+    """DynamicPriceCalculator.calculateDemandPriceChange."""
+    # int() trunca para zero como o toInt() do Kotlin
+    thresholds = int((current_ownership - previous_ownership) / OWNERSHIP_THRESHOLD)
+    new_price = current_price + thresholds * PRICE_CHANGE_PER_THRESHOLD
+    return _coerce_in(new_price, MIN_PRICE, MAX_PRICE)
+
+
+def pre_race_boost(base_price: float, days_until_race: int) -> float:
+    """DynamicPriceCalculator.calculatePreRaceBoost."""
+    if days_until_race < 0 or days_until_race > PRE_RACE_BOOST_DAYS:
+        return base_price
+    boost_days = PRE_RACE_BOOST_DAYS - days_until_race
+    return _coerce_in(base_price * (1 + boost_days * PRE_RACE_BOOST_PER_DAY), MIN_PRICE, MAX_PRICE)
+
+
+def apply_daily_limit(current_price: float, calculated_price: float) -> float:
+    """DynamicPriceCalculator.applyDailyLimit."""
+    max_increase = current_price * (1 + MAX_DAILY_CHANGE_PERCENT)
+    max_decrease = current_price * (1 - MAX_DAILY_CHANGE_PERCENT)
+    return _coerce_in(_coerce_in(calculated_price, max_decrease, max_increase), MIN_PRICE, MAX_PRICE)
+
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Classificação incremental das ligas.
+
+Na app (LeagueFirestoreService.recalculateRankings) cada etapa pontuada volta
+a ordenar todos os membros da liga. Aqui a classificação vive numa estrutura
+de estatística de ordem e cada etapa só aplica as diferenças de pontos:
+
+- uma Fenwick tree indexada pelos pontos conta quantos membros há com cada
+  pontuação, por isso "quantos têm mais pontos" e "quem está na posição p"
+  custam O(log P) (P = amplitude de pontos, que cresce por duplicação);
+- cada pontuação tem um balde com os seus membros por ordem de entrada,
+  que desempata membros com os mesmos pontos.
+
+rank(), top() e around() ficam em O(log P) (+ o tamanho da resposta). O rank
+é o de getUserPosition na app: 1 + número de membros com mais pontos.
+
+Quando uma etapa muda quase todos os membros, apply() reconstrói tudo de uma
+vez com NumPy em vez de aplicar as diferenças uma a uma.
+
+Uso:
+    pip install numpy
+    python leaderboard.py league_members.csv team_stage_results.csv [output.csv]
+    python leaderboard.py --bench [n_membros]
+
+league_members.csv tem os campos de LeagueMemberEntity
+(leagueId,userId,teamId,teamName,rank,points,previousRank,...) e
+team_stage_results.csv é a saída do scoring_engine.py
+(teamId,raceId,stageNumber,pointsEarned,...). A saída (por omissão
+league_members_next.csv, nunca o próprio ficheiro de entrada) tem points, rank
+e previousRank atualizados.
+
+As etapas já somadas aos points de um ficheiro ficam registadas ao lado dele
+em <ficheiro>.stages.json (raceId:stageNumber). Só as etapas que faltam são
+aplicadas, por isso correr outra vez, ou com um ficheiro de resultados que
+inclui etapas antigas, não conta pontos a dobrar.
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+from bisect import bisect_left, insort
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("A instalar numpy...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "numpy"])
+    import numpy as np
+
+from rider_record import read_rows
+
+# Acima desta fração de membros alterados, apply() reconstrói em vez de atualizar
+REBUILD_FRACTION = 0.25
+
+MIN_CAPACITY = 1024
+
+
+class Fenwick:
+    """Contagens por pontuação em [low, low + capacidade), com somas de prefixo em O(log P)."""
+
+    def __init__(self, low: int, counts: Sequence[int]):
+        self.low = low
+        self.size = len(counts)
+        # Construção em O(P): cada nó soma-se ao pai
+        tree = [0] + [int(c) for c in counts]
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                tree[parent] += tree[i]
+        self.tree = tree
+        self.top_bit = 1 << (self.size.bit_length() - 1) if self.size else 0
+
+    def contains(self, score: int) -> bool:
+        return self.low <= score < self.low + self.size
+
+    def add(self, score: int, delta: int):
+        i = score - self.low + 1
+        tree, size = self.tree, self.size
+        while i <= size:
+            tree[i] += delta
+            i += i & -i
+
+    def count_at_most(self, score: int) -> int:
+        """Membros com pontos <= score."""
+        i = min(score - self.low + 1, self.size)
+        tree = self.tree
+        total = 0
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def select(self, k: int) -> int:
+        """Menor pontuação s com count_at_most(s) >= k (k >= 1)."""
+        pos = 0
+        tree = self.tree
+        bit = self.top_bit
+        while bit:
+            nxt = pos + bit
+            if nxt <= self.size and tree[nxt] < k:
+                pos = nxt
+                k -= tree[nxt]
+            bit >>= 1
+        return self.low + pos
+
+
+class Leaderboard:
+    """Classificação de uma liga: membros, pontos e ordem (mais pontos primeiro)."""
+
+    def __init__(self):
+        self.keys: List[Hashable] = []
+        self.index: Dict[Hashable, int] = {}
+        self.points: List[int] = []
+        self.buckets: Dict[int, List[int]] = {}
+        self.fenwick = Fenwick(0, [0] * MIN_CAPACITY)
+
+    @classmethod
+    def from_points(cls, keys: Sequence[Hashable], points: Sequence[int]) -> 'Leaderboard':
+        """Constrói a classificação de uma vez (ordem de entrada = ordem de keys)."""
+        board = cls()
+        board.keys = list(keys)
+        board.index = {key: i for i, key in enumerate(board.keys)}
+        board._rebuild(np.asarray(points, dtype=np.int64))
+        return board
+
+    def _rebuild(self, points: np.ndarray):
+        self.points = points.tolist()
+        self.buckets = {}
+        if len(points):
+            # Agrupar índices por pontuação (estável: mantém a ordem de entrada)
+            order = np.argsort(points, kind='stable')
+            scores, starts = np.unique(points[order], return_index=True)
+            for score, members in zip(scores.tolist(), np.split(order, starts[1:])):
+                self.buckets[score] = members.tolist()
+            low, high = int(scores[0]), int(scores[-1])
+        else:
+            low = high = 0
+        capacity = max(MIN_CAPACITY, 1 << (high - low + 1).bit_length())
+        low -= (capacity - (high - low + 1)) // 2
+        counts = np.bincount(points - low, minlength=capacity) if len(points) else np.zeros(capacity)
+        self.fenwick = Fenwick(low, counts)
+
+    def _grow(self, score: int):
+        """Aumenta a amplitude de pontos da Fenwick para incluir score."""
+        low = min(self.fenwick.low, score)
+        high = max(self.fenwick.low + self.fenwick.size - 1, score)
+        capacity = 1 << (2 * (high - low + 1) - 1).bit_length()
+        low -= (capacity - (high - low + 1)) // 2
+        counts = [0] * capacity
+        for bucket_score, members in self.buckets.items():
+            counts[bucket_score - low] = len(members)
+        self.fenwick = Fenwick(low, counts)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.index
+
+    def _insert(self, i: int, score: int):
+        if not self.fenwick.contains(score):
+            self._grow(score)
+        insort(self.buckets.setdefault(score, []), i)
+        self.fenwick.add(score, 1)
+
+    def _remove(self, i: int, score: int):
+        bucket = self.buckets[score]
+        del bucket[bisect_left(bucket, i)]
+        if not bucket:
+            del self.buckets[score]
+        self.fenwick.add(score, -1)
+
+    def add(self, key: Hashable, points: int = 0):
+        """Novo membro (fica atrás dos que já tinham os mesmos pontos)."""
+        if key in self.index:
+            raise KeyError(f"Membro repetido: {key}")
+        i = len(self.keys)
+        self.keys.append(key)
+        self.index[key] = i
+        self.points.append(points)
+        self._insert(i, points)
+
+    def update(self, key: Hashable, delta: int):
+        """Soma delta aos pontos de um membro em O(log P)."""
+        if not delta:
+            return
+        i = self.index[key]
+        old = self.points[i]
+        self._remove(i, old)
+        self.points[i] = old + delta
+        self._insert(i, old + delta)
+
+    def apply(self, deltas: Dict[Hashable, int]):
+        """
+        Aplica os pontos de uma etapa ({membro: pontos}).
+
+        Poucos membros alterados: update() a update(); muitos: reconstrução vetorizada.
+        """
+        if len(deltas) <= REBUILD_FRACTION * len(self.keys):
+            for key, delta in deltas.items():
+                self.update(key, delta)
+            return
+        points = np.asarray(self.points, dtype=np.int64)
+        idx = np.fromiter((self.index[k] for k in deltas), dtype=np.int64, count=len(deltas))
+        points[idx] += np.fromiter(deltas.values(), dtype=np.int64, count=len(deltas))
+        self._rebuild(points)
+
+    def _count_above(self, score: int) -> int:
+        return len(self.keys) - self.fenwick.count_at_most(score)
+
+    def rank(self, key: Hashable) -> int:
+        """1 + número de membros com mais pontos (empatados partilham o rank)."""
+        return self._count_above(self.points[self.index[key]]) + 1
+
+    def position(self, key: Hashable) -> int:
+        """Posição (0 = primeiro) na ordem da classificação, com desempate."""
+        i = self.index[key]
+        score = self.points[i]
+        return self._count_above(score) + bisect_left(self.buckets[score], i)
+
+    def _slice(self, start: int, stop: int) -> List[Tuple[int, Hashable, int]]:
+        """Membros nas posições [start, stop) como (rank, membro, pontos)."""
+        start = max(start, 0)
+        stop = min(stop, len(self.keys))
+        result = []
+        pos = start
+        while pos < stop:
+            # Posição pos a contar do topo = posição n - pos a contar de baixo
+            score = self.fenwick.select(len(self.keys) - pos)
+            above = self._count_above(score)
+            bucket = self.buckets[score]
+            take = bucket[pos - above:min(len(bucket), stop - above)]
+            result.extend((above + 1, self.keys[i], score) for i in take)
+            pos += len(take)
+        return result
+
+    def top(self, n: int = 10) -> List[Tuple[int, Hashable, int]]:
+        """Os n primeiros como (rank, membro, pontos)."""
+        return self._slice(0, n)
+
+    def around(self, key: Hashable, above: int = 3, below: int = 3) -> List[Tuple[int, Hashable, int]]:
+        """O membro e os que estão à sua volta (getMembersSurroundingUser)."""
+        pos = self.position(key)
+        return self._slice(pos - above, pos + below + 1)
+
+    def standings(self) -> Iterable[Tuple[int, Hashable, int]]:
+        """Toda a classificação, por ordem."""
+        for score in sorted(self.buckets, reverse=True):
+            rank = self._count_above(score) + 1
+            for i in self.buckets[score]:
+                yield rank, self.keys[i], score
+
+
+def naive_ranks(points: np.ndarray) -> np.ndarray:
+    """Rank de cada membro reordenando tudo (como na app), para comparação."""
+    ordered = np.sort(points)
+    return len(points) - np.searchsorted(ordered, points, side='right') + 1
+
+
+def benchmark(n_members: int = 1_000_000, n_queries: int = 10_000, seed: int = 42):
+    """Mede construção, etapas (parciais e completas) e consultas com n_members membros."""
+    rng = np.random.default_rng(seed)
+    keys = [f"u{i}" for i in range(n_members)]
+    points = rng.integers(0, 2_000, n_members)
+
+    t0 = time.perf_counter()
+    board = Leaderboard.from_points(keys, points)
+    t1 = time.perf_counter()
+    print(f"{n_members:,} membros")
+    print(f"  Construção:                 {t1 - t0:.2f}s")
+
+    # Etapa parcial: 1% dos membros pontua (uma liga de um dia de clássica, por exemplo)
+    changed = rng.choice(n_members, size=n_members // 100, replace=False)
+    deltas = {keys[i]: int(d) for i, d in zip(changed.tolist(), rng.integers(1, 400, len(changed)).tolist())}
+    t0 = time.perf_counter()
+    board.apply(deltas)
+    t1 = time.perf_counter()
+    points[changed] += np.array(list(deltas.values()))
+    print(f"  Etapa com {len(deltas):,} alterações:  {t1 - t0:.3f}s "
+          f"({(t1 - t0) / len(deltas) * 1e6:.1f}µs por membro)")
+
+    # Etapa completa: todos pontuam (reconstrução vetorizada)
+    full = rng.integers(0, 300, n_members)
+    t0 = time.perf_counter()
+    board.apply(dict(zip(keys, full.tolist())))
+    t1 = time.perf_counter()
+    points += full
+    print(f"  Etapa com todos os membros: {t1 - t0:.2f}s")
+
+    t0 = time.perf_counter()
+    ranks = naive_ranks(points)
+    t1 = time.perf_counter()
+    print(f"  Reordenar tudo (NumPy):     {t1 - t0:.3f}s")
+
+    sample = rng.integers(0, n_members, n_queries).tolist()
+    t0 = time.perf_counter()
+    for i in sample:
+        board.rank(keys[i])
+    t1 = time.perf_counter()
+    for i in sample:
+        board.around(keys[i])
+    t2 = time.perf_counter()
+    for _ in range(n_queries):
+        board.top(10)
+    t3 = time.perf_counter()
+    print(f"  rank():    {(t1 - t0) / n_queries * 1e6:.1f}µs")
+    print(f"  around():  {(t2 - t1) / n_queries * 1e6:.1f}µs")
+    print(f"  top(10):   {(t3 - t2) / n_queries * 1e6:.1f}µs")
+
+    # Verificação contra a reordenação completa
+    for i in sample[:1000]:
+        if board.rank(keys[i]) != ranks[i]:
+            raise AssertionError(f"{keys[i]}: rank {board.rank(keys[i])} != {ranks[i]}")
+    top = board.top(100)
+    expected = np.sort(points)[::-1][:100]
+    if [p for _, _, p in top] != expected.tolist():
+        raise AssertionError("top(100) diferente da reordenação")
+    for rank, key, score in board.around(keys[sample[0]], 50, 50):
+        if ranks[board.index[key]] != rank or points[board.index[key]] != score:
+            raise AssertionError(f"around(): {key} {rank} {score}")
+    print("  Igual à reordenação completa ✓")
+
+
+def stages_file(members_file: str) -> str:
+    return members_file + '.stages.json'
+
+
+def load_applied(members_file: str) -> set:
+    """Etapas (raceId:stageNumber) já incluídas nos points de members_file."""
+    path = stages_file(members_file)
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r', encoding='utf-8') as f:
+        return set(json.load(f))
+
+
+def save_applied(members_file: str, applied: set):
+    with open(stages_file(members_file), 'w', encoding='utf-8') as f:
+        json.dump(sorted(applied), f, indent=1)
+
+
+def stage_key(row: Dict) -> str:
+    return f"{row['raceId']}:{int(row['stageNumber'])}"
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--bench':
+        benchmark(int(args[1]) if len(args) > 1 else 1_000_000)
+        return
+
+    if len(args) < 2:
+        print("Uso: python leaderboard.py league_members.csv team_stage_results.csv [output.csv]")
+        print("     python leaderboard.py --bench [n_membros]")
+        sys.exit(1)
+
+    members_file, results_file = args[:2]
+    output_file = args[2] if len(args) > 2 else os.path.splitext(members_file)[0] + '_next.csv'
+    if os.path.abspath(output_file) == os.path.abspath(members_file):
+        print("✗ A saída tem de ser outro ficheiro (a entrada fica como estava)")
+        sys.exit(1)
+
+    members = read_rows(members_file)
+    applied = load_applied(members_file)
+    new_stages = set()
+    team_points: Dict[str, int] = {}
+    for row in read_rows(results_file):
+        key = stage_key(row)
+        if key in applied:
+            continue
+        new_stages.add(key)
+        team_points[row['teamId']] = team_points.get(row['teamId'], 0) + int(row['pointsEarned'])
+    if not new_stages:
+        print(f"Nenhuma etapa nova em {results_file} (todas já incluídas em {members_file})")
+        return
+    print(f"Etapas novas: {', '.join(sorted(new_stages))}"
+          + (f" ({len(applied)} já aplicadas)" if applied else ""))
+
+    by_league: Dict[str, List[Dict]] = {}
+    for member in members:
+        by_league.setdefault(member['leagueId'], []).append(member)
+
+    t0 = time.perf_counter()
+    for league_id, league_members in by_league.items():
+        # Ordem de entrada pela classificação anterior, para desempatar como antes
+        league_members.sort(key=lambda m: int(m.get('rank') or 0) or sys.maxsize)
+        board = Leaderboard.from_points([m['userId'] for m in league_members],
+                                        [int(m.get('points') or 0) for m in league_members])
+        previous: Dict[str, int] = {m['userId']: board.rank(m['userId']) for m in league_members}
+        board.apply({m['userId']: team_points[m['teamId']]
+                     for m in league_members if team_points.get(m['teamId'])})
+        for member in league_members:
+            member['previousRank'] = previous[member['userId']]
+            member['rank'] = board.rank(member['userId'])
+            member['points'] = board.points[board.index[member['userId']]]
+        print(f"Liga {league_id}: {len(board)} membros, líder {board.top(1)[0][1]}")
+
+    fieldnames = list(members[0].keys()) if members else ['leagueId', 'userId']
+    fieldnames += [f for f in ('points', 'rank', 'previousRank') if f not in fieldnames]
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for league_members in by_league.values():
+            writer.writerows(sorted(league_members, key=lambda m: m['rank']))
+    save_applied(output_file, applied | new_stages)
+    print(f"✓ {len(members)} membros em {len(by_league)} ligas atualizados em "
+          f"{time.perf_counter() - t0:.2f}s ({output_file})")
+
+
+if __name__ == '__main__':
+    main()
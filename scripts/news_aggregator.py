@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+"""
+Lote único de notícias, sem repetidos entre jornais.
+
+Hoje o NewsSyncWorker corre no telemóvel os scrapers Kotlin (ABolaNewsScraper,
+RecordNewsScraper, OJogoNewsScraper, JNNewsScraper, FPCBTTNewsScraper,
+TopCyclingNewsScraper) e só apaga repetidos com o mesmo contentHash (MD5 do
+URL). A mesma notícia em dois jornais fica duas vezes. Este script:
+
+- lê as mesmas páginas com os mesmos seletores, em paralelo (thread pool),
+  com GET condicional: guarda ETag/Last-Modified e o HTML na PageCache e,
+  se o site responder 304, volta a usar o HTML guardado;
+- junta as notícias quase iguais com SimHash de 64 bits (4-gramas de
+  caracteres do título e do resumo) e LSH: com a impressão em 8 blocos de
+  8 bits, duas impressões a distância de Hamming <= 6 têm pelo menos 2 blocos
+  iguais, por isso há uma tabela por cada par de blocos (28) e só se comparam
+  as notícias do mesmo balde; o resultado é igual ao da comparação de todos
+  os pares;
+- de cada grupo fica a notícia da fonte com mais prioridade (a ordem de
+  SOURCES), com a data mais antiga do grupo e a imagem/autor das outras;
+- escreve um JSON com a forma do NewsArticleEntity (id, title, summary,
+  url, imageUrl, source, publishedAt, author, contentHash, createdAt).
+
+Uso:
+    pip install requests beautifulsoup4 numpy
+    python news_aggregator.py [noticias.json] [--workers 8] [--no-cache]
+    python news_aggregator.py --bench [n_noticias]
+"""
+
+import hashlib
+import json
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import combinations
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+from zoneinfo import ZoneInfo
+
+try:
+    import numpy as np
+    import requests
+    from bs4 import BeautifulSoup
+except ImportError:
+    print("A instalar dependências...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "requests", "beautifulsoup4", "numpy"])
+    import numpy as np
+    import requests
+    from bs4 import BeautifulSoup
+
+from date_engine import date_from_url, find_date
+from page_cache import PageCache
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+}
+
+DEFAULT_WORKERS = 8
+MAX_ARTICLES = 20
+SUMMARY_LENGTH = 300
+MIN_TITLE_LENGTH = 10
+
+SHINGLE = 4
+BLOCKS = 8
+BLOCK_BITS = 64 // BLOCKS
+MAX_DISTANCE = 6
+
+NEWS_FIELDNAMES = ['id', 'title', 'summary', 'url', 'imageUrl', 'source', 'publishedAt',
+                   'author', 'contentHash', 'createdAt']
+
+Article = Dict[str, object]
+
+
+class NewsSource:
+    """Um scraper de notícias: página, seletores e filtro de URLs."""
+
+    def __init__(self, name: str, base_url: str, path: str, articles: str, title: str, summary: str,
+                 accept: Callable[[str], bool], images: str = 'img'):
+        self.name = name
+        self.base_url = base_url
+        self.url = base_url + path
+        self.articles = articles
+        self.title = title
+        self.summary = summary
+        self.accept = accept
+        self.images = images
+
+
+def contains_any(*parts: str) -> Callable[[str], bool]:
+    return lambda url: any(p in url for p in parts)
+
+
+# Fontes por ordem de prioridade (a primeira ganha nos repetidos)
+SOURCES: List[NewsSource] = [
+    NewsSource('A Bola', 'https://www.abola.pt', '/modalidades/ciclismo',
+               'article, .noticia, .news, [class*=article]',
+               'h2, h3, h4, .title, .titulo', 'p, .resume, .sumario, .texto',
+               contains_any('abola.pt')),
+    NewsSource('Record', 'https://www.record.pt', '/modalidades/ciclismo',
+               'article, .article, .news-item, [class*=noticia]',
+               'h2, h3, .title, .headline', 'p, .summary, .excerpt, .lead',
+               contains_any('record.pt')),
+    NewsSource('O Jogo', 'https://www.ojogo.pt', '/modalidades/ciclismo',
+               'article, .noticia, .news-item, [class*=article], [class*=story]',
+               'h1, h2, h3, h4, .title, .titulo, .headline', 'p, .lead, .summary, .excerpt, .description',
+               lambda url: 'ojogo.pt' in url and contains_any('/noticias/', '/ciclismo', '/modalidades/')(url)),
+    NewsSource('Jornal de Notícias', 'https://www.jn.pt', '/topico/ciclismo',
+               'article, .item, .news-item, [class*=article], [class*=story], .t-card',
+               'h1, h2, h3, h4, .title, .titulo, .t-card__title, .headline',
+               'p, .lead, .summary, .excerpt, .t-card__text, .description',
+               contains_any('jn.pt'), images='img, picture img'),
+    NewsSource('FPC BTT', 'https://www.fpciclismo.pt', '/btt',
+               'article, .noticia, .news-item, [class*=noticia], [class*=article], .row.eventos-row',
+               'h2, h3, h4, strong, b, .title', 'p, .summary, .excerpt, .descricao',
+               lambda url: not contains_any('/calendario', '/inscri')(url)),
+    NewsSource('TopCycling', 'https://www.topcycling.pt', '',
+               'article, .post, .entry, .news-item, [class*=article], [class*=post]',
+               'h2, h3, h4, .title, .entry-title, .post-title', 'p, .summary, .excerpt, .entry-content',
+               lambda url: 'topcycling.pt' in url and not contains_any('/categoria/', '/tag/')(url)),
+]
+
+DATE_SELECTORS = ('.date, .data, .time, .timestamp, [class*=date], [class*=time], '
+                  '.published, .pub-date, .post-date')
+
+LISBON = ZoneInfo('Europe/Lisbon')
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def content_hash(url: str) -> str:
+    """Igual ao generateHash dos scrapers: MD5 do URL em hexadecimal."""
+    return hashlib.md5(url.encode('utf-8')).hexdigest()
+
+
+def absolute(value: str, base_url: str) -> Optional[str]:
+    if not value:
+        return None
+    if value.startswith('//'):
+        return 'https:' + value
+    return urljoin(base_url + '/', value) if not value.startswith('http') else value
+
+
+def published_at(element, url: str) -> Optional[int]:
+    """
+    DateParser.extractDate: <time datetime>, elementos de data, texto do
+    cartão e, por fim, a data no URL. Em ms; as datas sem hora ficam ao meio-dia.
+    """
+    stamp = element.select_one('time[datetime]')
+    if stamp is not None:
+        try:
+            value = datetime.fromisoformat(stamp['datetime'].replace('Z', '+00:00'))
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=LISBON)
+            return int(value.timestamp() * 1000)
+        except ValueError:
+            pass
+    texts = [e.get_text(' ', strip=True) for e in element.select(DATE_SELECTORS)[:1]]
+    found = next((d for d in map(find_date, texts + [element.get_text(' ', strip=True)]) if d), None)
+    found = found or date_from_url(url)
+    if found is None:
+        return None
+    return int(datetime(found.year, found.month, found.day, 12, tzinfo=LISBON).timestamp() * 1000)
+
+
+def parse_articles(soup: BeautifulSoup, source: NewsSource, created_at: Optional[int] = None) -> List[Article]:
+    """As mesmas regras do scrapeNews de cada scraper."""
+    created_at = now_ms() if created_at is None else created_at
+    articles, seen = [], set()
+    for element in soup.select(source.articles)[:MAX_ARTICLES]:
+        links = element.select('a[href]')
+        link = next((a for a in links if source.accept(absolute(a['href'], source.base_url) or '')),
+                    links[0] if links else None)
+        if link is None:
+            continue
+        url = absolute(link['href'], source.base_url) or ''
+        if not url.startswith('http') or not source.accept(url) or url in seen:
+            continue
+
+        title = ' '.join(e.get_text(' ', strip=True) for e in element.select(source.title)).strip()
+        title = title or link.get_text(' ', strip=True)
+        if len(title) < MIN_TITLE_LENGTH:
+            continue
+        summary = ' '.join(e.get_text(' ', strip=True) for e in element.select(source.summary)).strip()
+
+        img = element.select_one(source.images)
+        image = None
+        if img is not None:
+            image = absolute(img.get('data-src') or img.get('data-lazy-src') or img.get('src') or '',
+                             source.base_url)
+
+        seen.add(url)
+        articles.append({
+            'id': 0,
+            'title': title,
+            'summary': (summary or title)[:SUMMARY_LENGTH],
+            'url': url,
+            'imageUrl': image,
+            'source': source.name,
+            'publishedAt': published_at(element, url) or created_at,
+            'author': None,
+            'contentHash': content_hash(url),
+            'createdAt': created_at,
+        })
+    return articles
+
+
+def fetch_conditional(url: str, cached: Optional[dict]) -> Tuple[int, dict]:
+    """
+    GET com If-None-Match / If-Modified-Since da última resposta.
+    Devolve (status, entrada) com o HTML e os validadores a guardar.
+    """
+    headers = dict(HEADERS)
+    if cached:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+    response = requests.get(url, headers=headers, timeout=15)
+    if response.status_code == 304 and cached:
+        return 304, cached
+    response.raise_for_status()
+    return response.status_code, {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'html': response.text,
+    }
+
+
+class NewsAggregator:
+    """Busca todas as fontes em paralelo e junta as notícias repetidas."""
+
+    def __init__(self, sources: List[NewsSource] = SOURCES, cache: Optional[PageCache] = None,
+                 workers: int = DEFAULT_WORKERS,
+                 fetcher: Callable[[str, Optional[dict]], Tuple[int, dict]] = fetch_conditional):
+        self.sources = sources
+        self.cache = cache
+        self.workers = workers
+        self.fetcher = fetcher
+        self.errors: Dict[str, str] = {}
+        self.counts: Dict[str, int] = {}
+        self.not_modified = 0
+
+    def _source(self, source: NewsSource) -> List[Article]:
+        key = 'news:' + source.url
+        try:
+            cached = self.cache.get(key) if self.cache is not None else None
+            status, entry = self.fetcher(source.url, cached)
+            if status == 304:
+                self.not_modified += 1
+            elif self.cache is not None and (entry.get('etag') or entry.get('last_modified')):
+                self.cache.put(key, entry)
+            articles = parse_articles(BeautifulSoup(entry['html'], 'html.parser'), source)
+        except Exception as e:
+            self.errors[source.name] = f"{e.__class__.__name__}: {e}"
+            articles = []
+        self.counts[source.name] = len(articles)
+        return articles
+
+    def scrape(self) -> List[Article]:
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(self.sources)))) as pool:
+            return [a for per_source in pool.map(self._source, self.sources) for a in per_source]
+
+    def build(self) -> List[Article]:
+        return dedupe(self.scrape())
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sem acentos nem pontuação, só ASCII."""
+    text = unicodedata.normalize('NFD', text.lower()).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.findall(r'[a-z0-9]+', text))
+
+
+def shingles(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    4-gramas de caracteres de todos os textos, sem repetidos por texto:
+    (dono, 4-grama), ordenados por dono.
+    """
+    padded = [normalize_text(text).ljust(SHINGLE) for text in texts]
+    if not padded:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.uint64)
+    # Todos os textos num só buffer; só contam as janelas que não passam para o texto seguinte
+    lengths = np.array([len(t) for t in padded])
+    ends = np.cumsum(lengths)
+    data = np.frombuffer(''.join(padded).encode('ascii'), dtype=np.uint8)
+    windows = np.lib.stride_tricks.sliding_window_view(data, SHINGLE)
+    owners = np.repeat(np.arange(len(texts), dtype=np.uint64), lengths)[:len(windows)]
+    valid = np.arange(len(windows)) + SHINGLE <= ends[owners.astype(np.intp)]
+    weights = np.uint64(1) << (np.arange(SHINGLE, dtype=np.uint64) * np.uint64(8))
+    grams = windows[valid].astype(np.uint64) @ weights
+    owners = owners[valid]
+    keys = np.sort((owners << np.uint64(32)) | grams)
+    keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+    return (keys >> np.uint64(32)).astype(np.intp), keys & np.uint64(0xFFFFFFFF)
+
+
+def mix64(values: np.ndarray) -> np.ndarray:
+    """splitmix64: espalha os bits de cada 4-grama pelos 64 bits."""
+    z = values + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def simhash(texts: List[str]) -> np.ndarray:
+    """Impressões SimHash de 64 bits (uint64), uma por texto, numa só passagem numpy."""
+    fingerprints = np.zeros(len(texts), dtype=np.uint64)
+    owners, grams = shingles(texts)
+    if not len(grams):
+        return fingerprints
+
+    # Cada bit fica a 1 se a maioria dos 4-gramas do texto o tiver a 1
+    hashes = mix64(grams)
+    starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+    present = owners[starts]
+    totals = np.diff(np.r_[starts, len(owners)])
+    columns = hashes.view(np.uint8).reshape(-1, 8)
+    for byte in range(8):
+        bits = np.unpackbits(columns[:, byte:byte + 1], axis=1, bitorder='little')
+        ones = np.add.reduceat(bits, starts, axis=0, dtype=np.int32)
+        majority = (2 * ones > totals[:, None]).astype(np.uint64)
+        fingerprints[present] |= (majority << np.arange(8 * byte, 8 * byte + 8, dtype=np.uint64)).sum(
+            axis=1, dtype=np.uint64)
+    return fingerprints
+
+
+def article_text(article: Article) -> str:
+    summary = str(article['summary'] or '')
+    title = str(article['title'] or '')
+    return title if summary == title else f"{title} {summary}"
+
+
+class UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def band_masks(max_distance: int = MAX_DISTANCE) -> List[int]:
+    """
+    Máscaras das tabelas LSH: com a impressão dividida em BLOCKS blocos, duas
+    impressões a distância <= max_distance têm pelo menos BLOCKS - max_distance
+    blocos iguais, por isso basta uma tabela por cada combinação desses blocos.
+    """
+    if not 0 <= max_distance < BLOCKS:
+        raise ValueError(f"Distância máxima entre 0 e {BLOCKS - 1}")
+    block = (1 << BLOCK_BITS) - 1
+    return [sum(block << (b * BLOCK_BITS) for b in chosen)
+            for chosen in combinations(range(BLOCKS), BLOCKS - max_distance)]
+
+
+def near_duplicate_pairs(fingerprints: np.ndarray, max_distance: int = MAX_DISTANCE) -> List[Tuple[int, int]]:
+    """
+    Pares a distância de Hamming <= max_distance, só dentro dos baldes de cada
+    tabela: ordena pela chave e compara cada impressão com as seguintes do mesmo
+    balde, um deslocamento de cada vez (todas as impressões de uma vez).
+    """
+    found = []
+    for mask in band_masks(max_distance):
+        keys = fingerprints & np.uint64(mask)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys, sorted_prints = keys[order], fingerprints[order]
+        # Posições cujo balde ainda continua "offset" lugares à frente
+        active = np.arange(len(order) - 1)
+        offset = 1
+        while len(active):
+            active = active[active + offset < len(order)]
+            active = active[sorted_keys[active + offset] == sorted_keys[active]]
+            close = np.bitwise_count(sorted_prints[active + offset] ^ sorted_prints[active]) <= max_distance
+            left = active[close]
+            found.append(np.stack([order[left], order[left + offset]], axis=1))
+            offset += 1
+    if not found:
+        return []
+    pairs = np.sort(np.concatenate(found), axis=1).astype(np.int64)
+    codes = np.unique(pairs[:, 0] * len(fingerprints) + pairs[:, 1])
+    return list(zip((codes // len(fingerprints)).tolist(), (codes % len(fingerprints)).tolist()))
+
+
+def reference_pairs(fingerprints: np.ndarray, max_distance: int = MAX_DISTANCE) -> List[Tuple[int, int]]:
+    """Comparação de todos os pares (O(n²)), para verificar o LSH."""
+    pairs = []
+    for i in range(len(fingerprints) - 1):
+        distances = np.bitwise_count(fingerprints[i + 1:] ^ fingerprints[i])
+        pairs.extend((i, i + 1 + int(j)) for j in np.flatnonzero(distances <= max_distance))
+    return pairs
+
+
+def group_articles(articles: List[Article], pairs: List[Tuple[int, int]]) -> List[List[int]]:
+    """Grupos de índices (repetidos pelo URL ou pelos pares), pela ordem da primeira notícia."""
+    groups = UnionFind(len(articles))
+    by_hash: Dict[str, int] = {}
+    for i, article in enumerate(articles):
+        first = by_hash.setdefault(str(article['contentHash']), i)
+        groups.union(first, i)
+    for i, j in pairs:
+        groups.union(i, j)
+
+    members: Dict[int, List[int]] = {}
+    for i in range(len(articles)):
+        members.setdefault(groups.find(i), []).append(i)
+    return list(members.values())
+
+
+def merge_group(articles: List[Article], indices: List[int], priority: Dict[str, int]) -> Article:
+    """Notícia da fonte com mais prioridade, com a data mais antiga e o que lhe faltar das outras."""
+    ordered = sorted(indices, key=lambda i: (priority.get(str(articles[i]['source']), len(priority)), i))
+    merged = dict(articles[ordered[0]])
+    merged['publishedAt'] = min(articles[i]['publishedAt'] for i in indices)
+    for field in ('imageUrl', 'author'):
+        if not merged[field]:
+            merged[field] = next((articles[i][field] for i in ordered if articles[i][field]), None)
+    return merged
+
+
+def dedupe(articles: List[Article], sources: List[NewsSource] = SOURCES,
+           pair_finder=near_duplicate_pairs) -> List[Article]:
+    priority = {source.name: rank for rank, source in enumerate(sources)}
+    fingerprints = simhash([article_text(a) for a in articles])
+    groups = group_articles(articles, pair_finder(fingerprints))
+    merged = [merge_group(articles, g, priority) for g in groups]
+    return sorted(merged, key=lambda a: (-a['publishedAt'], a['source'], a['url']))
+
+
+def write_batch(filename: str, articles: List[Article]):
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump([{k: a[k] for k in NEWS_FIELDNAMES} for a in articles], f, ensure_ascii=False, indent=2)
+
+
+SYLLABLES = tuple(c + v for c in 'bcdfglmnprstvz' for v in 'aeiou') + ('ção', 'ões', 'ãe', 'lh', 'nh')
+
+
+def fake_articles(n: int, seed: int = 7) -> List[Article]:
+    """Notícias sintéticas: cada história aparece em várias fontes com pequenas variações."""
+    rng = np.random.default_rng(seed)
+
+    def words(count: int) -> str:
+        return ' '.join(''.join(rng.choice(SYLLABLES, size=int(rng.integers(2, 4)))) for _ in range(count))
+
+    articles = []
+    story = 0
+    while len(articles) < n:
+        title = f"História {story}: {words(8)}"
+        summary = f"{words(30)}"
+        for source in SOURCES[:int(rng.integers(1, len(SOURCES) + 1))]:
+            # Cada jornal muda a pontuação, as maiúsculas ou acrescenta uma palavra
+            variant_title = title.upper() + '!' if rng.random() < 0.3 else title
+            variant_summary = summary + ' ' + source.name.lower() if rng.random() < 0.3 else summary
+            url = f"{source.base_url}/noticias/{story}-{source.name.replace(' ', '-').lower()}"
+            articles.append({
+                'id': 0, 'title': variant_title, 'summary': variant_summary, 'url': url,
+                'imageUrl': None if rng.random() < 0.5 else url + '.jpg', 'source': source.name,
+                'publishedAt': 1_770_000_000_000 + story * 60_000 + int(rng.integers(0, 10_000)),
+                'author': None, 'contentHash': content_hash(url), 'createdAt': 0,
+            })
+        story += 1
+    return articles[:n]
+
+
+def benchmark(n: int = 20000):
+    articles = fake_articles(n)
+    stories = len({str(a['title']).split(':')[0].lower() for a in articles})
+    print(f"{n} notícias sintéticas ({stories} histórias):")
+
+    t0 = time.perf_counter()
+    fingerprints = simhash([article_text(a) for a in articles])
+    print(f"  simhash        {(time.perf_counter() - t0) * 1000:8.0f} ms")
+
+    t0 = time.perf_counter()
+    lsh = near_duplicate_pairs(fingerprints)
+    lsh_time = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    reference = reference_pairs(fingerprints)
+    reference_time = time.perf_counter() - t0
+    print(f"  LSH (tabelas)  {lsh_time * 1000:8.0f} ms")
+    print(f"  todos os pares {reference_time * 1000:8.0f} ms  ({reference_time / max(lsh_time, 1e-9):.1f}x)")
+
+    if lsh != reference:
+        raise AssertionError(f"LSH encontrou {len(lsh)} pares, todos os pares {len(reference)}")
+    batch = dedupe(articles)
+    if batch != dedupe(articles, pair_finder=reference_pairs):
+        raise AssertionError("Lotes diferentes com LSH e com todos os pares")
+    story = [str(a['title']).split(':')[0].lower() for a in articles]
+    mixed = sum(len({story[i] for i in group}) > 1 for group in group_articles(articles, lsh))
+    if mixed:
+        raise AssertionError(f"{mixed} grupos juntam histórias diferentes")
+    print(f"  {len(lsh)} pares iguais nos dois métodos, {n} -> {len(batch)} notícias "
+          f"({len(batch) - stories} variações por juntar) ✓")
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--bench':
+        benchmark(int(args[1]) if len(args) > 1 else 20000)
+        return
+
+    workers = DEFAULT_WORKERS
+    if '--workers' in args:
+        pos = args.index('--workers')
+        workers = int(args[pos + 1])
+        del args[pos:pos + 2]
+    use_cache = '--no-cache' not in args
+    args = [a for a in args if a != '--no-cache']
+
+    if len(args) > 1 or (args and args[0].startswith('--')):
+        print("Uso: python news_aggregator.py [noticias.json] [--workers 8] [--no-cache]")
+        print("     python news_aggregator.py --bench [n_noticias]")
+        sys.exit(1)
+
+    output_file = args[0] if args else 'noticias.json'
+    aggregator = NewsAggregator(cache=PageCache() if use_cache else None, workers=workers)
+    t0 = time.perf_counter()
+    scraped = aggregator.scrape()
+    articles = dedupe(scraped)
+    elapsed = time.perf_counter() - t0
+
+    for source in aggregator.sources:
+        name = source.name
+        status = f"✗ {aggregator.errors[name]}" if name in aggregator.errors else f"{aggregator.counts.get(name, 0)} notícias"
+        print(f"  {name:<20} {status}")
+    write_batch(output_file, articles)
+    print(f"✓ {len(articles)} notícias ({len(scraped) - len(articles)} repetidas, "
+          f"{aggregator.not_modified} páginas sem alterações) em {output_file} ({elapsed:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Cache em disco das páginas já lidas (dados já interpretados, em JSON).
+
+Os scripts que vão ao procyclingstats voltam a pedir as mesmas páginas em
+cada execução. A PageCache guarda o resultado de cada página num ficheiro
+JSON por chave (URL), com validade opcional:
+
+- ttl=None: a entrada nunca expira (ex.: resultados de uma etapa fechada);
+- escrita atómica (ficheiro temporário + os.replace), por isso várias
+  threads ou processos podem partilhar a mesma pasta;
+- get_or_fetch só chama a função de busca quando não há entrada válida.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Any, Callable, Optional
+
+DEFAULT_CACHE_DIR = '.pcs_cache'
+
+
+class PageCache:
+    """Pasta com um ficheiro JSON por página."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_DIR, ttl: Optional[float] = None):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(path, exist_ok=True)
+
+    def filename(self, key: str) -> str:
+        """Nome legível (slug do URL) + hash curto para evitar colisões."""
+        slug = re.sub(r'[^a-z0-9]+', '-', key.lower()).strip('-')[-80:]
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:10]
+        return os.path.join(self.path, f"{slug}-{digest}.json")
+
+    def get(self, key: str, ttl: Optional[float] = None) -> Optional[Any]:
+        """Valor guardado, ou None se não existir ou tiver expirado."""
+        ttl = self.ttl if ttl is None else ttl
+        filename = self.filename(key)
+        try:
+            if ttl is not None and time.time() - os.path.getmtime(filename) > ttl:
+                return None
+            with open(filename, encoding='utf-8') as f:
+                return json.load(f)['value']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, value: Any):
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'value': value}, f, ensure_ascii=False, default=str)
+        os.replace(tmp, self.filename(key))
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Any], ttl: Optional[float] = None,
+                     store: Callable[[Any], bool] = lambda value: value is not None) -> Any:
+        """
+        Valor da cache ou de fetch(). O resultado só é guardado se store(valor)
+        for verdadeiro (por omissão: se não for None).
+        """
+        value = self.get(key, ttl)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = fetch()
+        if store(value):
+            self.put(key, value)
+        return value
@@ -1,46 +1,166 @@
 #!/usr/bin/env python3
 """
 Parse Wikipedia UCI WorldTeams data and extract cyclists
+
+wiki_uci.json is never decoded as a whole: the file is memory-mapped, the
+span of the parse.text.* string is located, and the still JSON-escaped HTML
+is scanned with compiled byte regexes. Only matched fragments are decoded.
+
+Re-runs are incremental: wiki_state.json keeps, per pageid, the last
+processed revision and a hash of every page section (one per team). An
+unchanged revision is skipped entirely; otherwise only the sections whose
+hash changed are re-parsed and merged with the names kept from the others.
+
+With --stream the cyclists go to stdout as an NDJSON record stream
+(rider_stream.py) instead of wiki_cyclists.csv, and progress goes to stderr.
+wiki_state.json describes wiki_cyclists.csv, so it is only updated when that
+file is written; a stream run leaves it untouched.
+
+Usage:
+    python parse_wiki.py [--full] [--stream]
 """
 
+import hashlib
 import json
+import mmap
+import os
 import re
-import csv
+import sys
+from contextlib import contextmanager
 
-def main():
-    # Load the JSON
-    with open('wiki_uci.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
+from rider_record import RiderRecord, write_csv
+from rider_stream import stream_stdio, write_stream
 
-    html = data['parse']['text']['*']
-    print(f'HTML length: {len(html)}')
+# Start of the "text": {"*": "..."} string in the MediaWiki parse API payload
+PAYLOAD_START = re.compile(rb'"text"\s*:\s*\{\s*"\*"\s*:\s*"')
 
-    # Find all table rows with rider data
-    # Pattern: row with flag + name link
+# Cyclist links typically have format: title="Name Name" or title="Name Name (cyclist)"
+# Inside the JSON string every quote is escaped as \" (and slashes may be \/),
+# so an attribute value is a run of anything except the \" escape.
+_VALUE = rb'((?:[^\\]|\\[^"])+)'
+LINK_PATTERN = re.compile(
+    rb'<a[^>]*href=\\"\\?/wiki\\?/' + _VALUE + rb'\\"[^>]*title=\\"' + _VALUE +
+    rb'\\"[^>]*>([^<]+)<\\?/a>'
+)
 
-    # First, let's find cyclist names that appear as links
-    # Cyclist links typically have format: title="Name Name" or title="Name Name (cyclist)"
+# Page-level metadata outside the HTML string; revid is only present when the
+# parse API is asked for it, so fall back to the parser cache comment
+PAGEID_PATTERN = re.compile(rb'"pageid"\s*:\s*(\d+)')
+REVID_PATTERN = re.compile(rb'"revid"\s*:\s*(\d+)')
+CACHE_REVID_PATTERN = re.compile(rb'revision id (\d+)')
 
-    pattern = r'<a[^>]*href="/wiki/([^"]+)"[^>]*title="([^"]+)"[^>]*>([^<]+)</a>'
-    matches = re.findall(pattern, html)
+# Section headings (h2 for page parts, h3 for each team), still JSON-escaped
+HEADING_PATTERN = re.compile(rb'<div class=\\"mw-heading mw-heading[23]\\"><h[23] id=\\"' + _VALUE + rb'\\"')
+
+INPUT_FILE = 'wiki_uci.json'
+OUTPUT_FILE = 'wiki_cyclists.csv'
+STATE_FILE = 'wiki_state.json'
+
+# Countries to filter out
+COUNTRIES = {'belgium', 'france', 'spain', 'germany', 'italy', 'united states', 'australia',
+             'netherlands', 'switzerland', 'denmark', 'norway', 'portugal', 'slovenia',
+             'colombia', 'ecuador', 'ireland', 'eritrea', 'great britain', 'united kingdom',
+             'austria', 'poland', 'canada', 'south africa', 'new zealand', 'kazakhstan',
+             'russia', 'ukraine', 'czech republic', 'slovakia', 'latvia', 'estonia', 'lithuania',
+             'luxembourg', 'bahrain', 'asia', 'europe', 'oceania', 'north america', 'africa'}
+
+# Terms to filter out
+SKIP_TERMS = {'team', 'cycling', 'tour', 'race', 'uci', 'world', 'edit', 'wiki',
+              'stage', 'grand', 'classification', 'jersey', 'champion', 'olympic',
+              'continental', 'pro team', 'worldteam'}
+
+
+def find_payload_span(buf) -> tuple:
+    """Return (start, end) byte offsets of the escaped parse.text.* string"""
+    match = PAYLOAD_START.search(buf)
+    if not match:
+        raise ValueError('parse.text.* not found in payload')
+    start = match.end()
+
+    # The string ends at the first quote not preceded by an odd run of backslashes
+    pos = start
+    while True:
+        pos = buf.find(b'"', pos)
+        if pos < 0:
+            raise ValueError('Unterminated parse.text.* string')
+        backslashes = 0
+        while buf[pos - 1 - backslashes] == 0x5C:
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return start, pos
+        pos += 1
+
+
+def decode_fragment(fragment: bytes) -> str:
+    """Decode a JSON-escaped fragment of the payload string"""
+    return json.loads(b'"' + fragment + b'"')
 
-    cyclists = []
-    seen = set()
 
-    # Countries to filter out
-    countries = {'belgium', 'france', 'spain', 'germany', 'italy', 'united states', 'australia',
-                 'netherlands', 'switzerland', 'denmark', 'norway', 'portugal', 'slovenia',
-                 'colombia', 'ecuador', 'ireland', 'eritrea', 'great britain', 'united kingdom',
-                 'austria', 'poland', 'canada', 'south africa', 'new zealand', 'kazakhstan',
-                 'russia', 'ukraine', 'czech republic', 'slovakia', 'latvia', 'estonia', 'lithuania',
-                 'luxembourg', 'bahrain', 'asia', 'europe', 'oceania', 'north america', 'africa'}
+@contextmanager
+def open_payload(filename: str = 'wiki_uci.json'):
+    """Memory-map a parse API dump and yield (buffer, start, end) of its HTML"""
+    with open(filename, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start, end = find_payload_span(mm)
+            yield mm, start, end
 
-    # Terms to filter out
-    skip_terms = {'team', 'cycling', 'tour', 'race', 'uci', 'world', 'edit', 'wiki',
-                  'stage', 'grand', 'classification', 'jersey', 'champion', 'olympic',
-                  'continental', 'pro team', 'worldteam'}
 
-    for href, title, text in matches:
+def iter_links(buf, start: int, end: int):
+    """Yield decoded (href, title, text) for every wiki link in the span"""
+    for match in LINK_PATTERN.finditer(buf, start, end):
+        href, title, text = match.groups()
+        yield decode_fragment(href), decode_fragment(title), decode_fragment(text)
+
+
+def page_metadata(buf, start: int, end: int) -> tuple:
+    """Return (pageid, revid) of the dump; either may be None"""
+    pageid = revid = None
+    for pattern in (PAGEID_PATTERN, REVID_PATTERN):
+        # Top-level keys live outside the HTML string
+        match = pattern.search(buf, 0, start) or pattern.search(buf, end)
+        if match:
+            if pattern is PAGEID_PATTERN:
+                pageid = int(match.group(1))
+            else:
+                revid = int(match.group(1))
+    if revid is None:
+        matches = list(CACHE_REVID_PATTERN.finditer(buf, start, end))
+        if matches:
+            revid = int(matches[-1].group(1))
+    return pageid, revid
+
+
+def split_sections(buf, start: int, end: int) -> list:
+    """Split the HTML span at each heading into (section_id, start, end)"""
+    bounds = [('', start)]
+    for match in HEADING_PATTERN.finditer(buf, start, end):
+        bounds.append((decode_fragment(match.group(1)), match.start()))
+
+    sections = []
+    seen_ids = {}
+    for i, (section_id, section_start) in enumerate(bounds):
+        section_end = bounds[i + 1][1] if i + 1 < len(bounds) else end
+        # Keep ids unique in case a heading is repeated
+        count = seen_ids.get(section_id, 0)
+        seen_ids[section_id] = count + 1
+        if count:
+            section_id = f'{section_id}#{count}'
+        sections.append((section_id, section_start, section_end))
+    return sections
+
+
+def section_hash(buf, start: int, end: int) -> str:
+    """SHA-1 of a section's raw bytes, hashed without copying the slice"""
+    with memoryview(buf) as view:
+        return hashlib.sha1(view[start:end]).hexdigest()
+
+
+def extract_names(links) -> list:
+    """Filter wiki links down to cyclist names, in page order"""
+    names = []
+    seen = set()
+
+    for href, title, text in links:
         # Clean text
         name = text.strip()
         title_lower = title.lower()
@@ -50,11 +170,11 @@ def main():
             continue
 
         # Skip countries and non-cyclist terms
-        if name.lower() in countries:
+        if name.lower() in COUNTRIES:
             continue
-        if any(term in title_lower for term in skip_terms):
+        if any(term in title_lower for term in SKIP_TERMS):
             continue
-        if any(term in name.lower() for term in skip_terms):
+        if any(term in name.lower() for term in SKIP_TERMS):
             continue
 
         # Must have at least 2 words (first + last name)
@@ -69,39 +189,109 @@ def main():
         # Likely a cyclist name
         if '(cyclist)' in title_lower or (len(words) == 2 and all(w[0].isupper() for w in words if w)):
             seen.add(name.lower())
+            names.append(name)
+            try:
+                print(f'Found: {name}')
+            except UnicodeEncodeError:
+                print(f'Found: {name.encode("ascii", "replace").decode()}')
+
+    return names
+
+
+def load_state(filename: str = STATE_FILE) -> dict:
+    if not os.path.exists(filename):
+        return {'pages': {}}
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state: dict, filename: str = STATE_FILE):
+    tmp_path = f'{filename}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, filename)
+
+
+def merge_sections(sections: list, section_names: dict):
+    """Yield per-section names in page order, keeping the first occurrence"""
+    seen = set()
+    for section_id, _start, _end in sections:
+        for name in section_names[section_id]:
+            if name.lower() in seen:
+                continue
+            seen.add(name.lower())
 
             # Try to extract nationality from nearby context
             # For now, just add the name
+            words = name.split()
             first_name = words[0]
             last_name = ' '.join(words[1:])
 
-            cyclists.append({
-                'first_name': first_name,
-                'last_name': last_name,
-                'team': '',  # Would need more parsing
-                'nationality': '',
-                'age': '',
-                'uci_ranking': '',
-                'speciality': '',
-                'price': '5.0',
-                'category': 'ROULEUR'
-            })
-            try:
-                print(f'Found: {name}')
-            except UnicodeEncodeError:
-                print(f'Found: {name.encode("ascii", "replace").decode()}')
+            # Team would need more parsing; price/category use the defaults
+            yield RiderRecord(first_name, last_name)
 
-    print(f'\nTotal cyclists found: {len(cyclists)}')
+
+def parse(full: bool = False, out=None):
+    """Parse INPUT_FILE into OUTPUT_FILE, or into a record stream on `out`"""
+    state = load_state()
+
+    with open_payload(INPUT_FILE) as (buf, start, end):
+        print(f'Payload length: {end - start} bytes')
+
+        pageid, revid = page_metadata(buf, start, end)
+        page_key = str(pageid)
+        previous = state['pages'].get(page_key, {})
+        print(f'Page {pageid}, revision {revid} (last processed: {previous.get("revid")})')
+
+        if (out is None and not full and revid is not None and previous.get('revid') == revid
+                and os.path.exists(OUTPUT_FILE)):
+            print(f'Revision unchanged, {OUTPUT_FILE} is up to date')
+            return
+
+        previous_sections = {} if full else previous.get('sections', {})
+        sections = split_sections(buf, start, end)
+        section_state = {}
+        reparsed = 0
+
+        for section_id, section_start, section_end in sections:
+            digest = section_hash(buf, section_start, section_end)
+            kept = previous_sections.get(section_id)
+            if kept and kept['hash'] == digest:
+                names = kept['names']
+            else:
+                # Find all links in the section; extract_names keeps the cyclists
+                names = extract_names(iter_links(buf, section_start, section_end))
+                reparsed += 1
+            section_state[section_id] = {'hash': digest, 'names': names}
+
+    print(f'\nSections re-parsed: {reparsed}/{len(sections)}')
+
+    cyclists = merge_sections(sections, {k: v['names'] for k, v in section_state.items()})
+    if out is not None:
+        # The state stays with OUTPUT_FILE, which a stream run does not write
+        print(f'Total cyclists streamed: {write_stream(cyclists, out)}')
+        return
+
+    cyclists = list(cyclists)
+    print(f'Total cyclists found: {len(cyclists)}')
+    if not cyclists:
+        return
 
     # Save to CSV
-    if cyclists:
-        with open('wiki_cyclists.csv', 'w', newline='', encoding='utf-8') as f:
-            fieldnames = ['first_name', 'last_name', 'team', 'nationality', 'age',
-                          'uci_ranking', 'speciality', 'price', 'category']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            for cyclist in cyclists:
-                writer.writerow(cyclist)
-        print(f'Saved to wiki_cyclists.csv')
+    write_csv(OUTPUT_FILE, cyclists, header=False)
+    print(f'Saved to {OUTPUT_FILE}')
+
+    state['pages'][page_key] = {'revid': revid, 'sections': section_state}
+    save_state(state)
+
+
+def main():
+    if '--stream' in sys.argv[1:]:
+        with stream_stdio() as (_, out):
+            parse(full='--full' in sys.argv[1:], out=out)
+    else:
+        parse(full='--full' in sys.argv[1:])
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Histórico de preços dos ciclistas em colunas, só de acrescentar.
+
+A app tem CyclistPriceHistoryEntity, mas cada execução dos scripts
+reescreve ciclistas_final.csv e o preço anterior perde-se. Este store
+guarda os pares (dia, preço) de cada ciclista entre execuções:
+
+- uma pasta com três colunas binárias (rider.i4, day.i4, price.f4) e a
+  lista de ids (riders.txt); cada execução só acrescenta ao fim dos
+  ficheiros, nunca reescreve;
+- só se grava um ponto quando o preço muda em relação ao último gravado
+  (ou o ciclista é novo);
+- ao abrir, as colunas são lidas com np.fromfile e ordenadas por
+  (ciclista, dia, ordem de escrita), com um índice de offsets por ciclista,
+  por isso a série de um ciclista é uma fatia e o preço de todos num dia é
+  um searchsorted;
+- se uma execução for interrompida a meio, as colunas são lidas até ao
+  comprimento da mais curta e, antes de acrescentar, os ficheiros são
+  truncados a esse comprimento para as colunas voltarem a ficar alinhadas.
+
+O id do ciclista é o cyclistId da app, como em CyclistPriceHistoryEntity, por
+isso o record e o import juntam-se na mesma série. O record liga cada ciclista
+ao id com a exportação de CyclistEntity (cyclists.csv, id,firstName,lastName,
+teamName[,profileUrl]) como o results_ingester.py; quem não tiver
+correspondência não é gravado.
+
+Uso:
+    pip install numpy
+    python price_history_store.py record ciclistas_final.csv [--cyclists cyclists.csv] [--store price_history] [--date 2026-03-01]
+    python price_history_store.py import price_history.csv [--store price_history]
+    python price_history_store.py chart cyclistId [--store price_history]
+    python price_history_store.py movers [--from 2026-01-01] [--to 2026-10-01] [--top 10] [--store price_history]
+    python price_history_store.py --bench [n_ciclistas]
+
+O import lê as linhas CyclistPriceHistoryEntity geradas pelo repricing.py.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("A instalar numpy...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "numpy"])
+    import numpy as np
+
+from results_ingester import CyclistIndex
+from rider_record import RiderRecord, read_csv, read_rows
+
+DEFAULT_STORE = 'price_history'
+# Exportação de CyclistEntity com os ids da app
+DEFAULT_CYCLISTS = 'cyclists.csv'
+DAY_MS = 24 * 60 * 60 * 1000
+EPOCH = date(1970, 1, 1)
+
+# Chave (ciclista, dia) num só int64
+DAY_SPAN = 1 << 20
+
+COLUMNS = (('rider', 'rider.i4', np.int32), ('day', 'day.i4', np.int32), ('price', 'price.f4', np.float32))
+RIDERS_FILE = 'riders.txt'
+
+
+def to_day(value: date) -> int:
+    """Dias desde 1970-01-01."""
+    return (value - EPOCH).days
+
+
+def from_day(day: int) -> date:
+    return date.fromordinal(EPOCH.toordinal() + int(day))
+
+
+def parse_day(text: str) -> int:
+    return to_day(date.fromisoformat(text))
+
+
+def column_rows(path: str) -> int:
+    """Linhas completas comuns às três colunas (as sobras de uma escrita interrompida não contam)."""
+    rows = []
+    for _, filename, dtype in COLUMNS:
+        filepath = os.path.join(path, filename)
+        size = os.path.getsize(filepath) if os.path.exists(filepath) else 0
+        rows.append(size // np.dtype(dtype).itemsize)
+    return min(rows)
+
+
+class PriceHistoryStore:
+    """Pasta com as colunas do histórico e o índice por ciclista."""
+
+    def __init__(self, path: str = DEFAULT_STORE):
+        self.path = path
+        self.unmatched: List[str] = []
+        self.load()
+
+    def load(self):
+        riders_path = os.path.join(self.path, RIDERS_FILE)
+        if os.path.exists(riders_path):
+            with open(riders_path, encoding='utf-8') as f:
+                self.ids = [line.rstrip('\n') for line in f if line.strip()]
+        else:
+            self.ids = []
+        self.index = {rider_id: i for i, rider_id in enumerate(self.ids)}
+
+        n = column_rows(self.path)
+        columns = {}
+        for name, filename, dtype in COLUMNS:
+            filepath = os.path.join(self.path, filename)
+            columns[name] = np.fromfile(filepath, dtype=dtype, count=n) if n else np.zeros(0, dtype)
+        rider, day, price = (columns[name] for name, _, _ in COLUMNS)
+        # Linhas de um ciclista que não chegou a riders.txt (execução interrompida)
+        known = rider < len(self.ids)
+        rider, day, price = rider[known], day[known], price[known]
+
+        # Ordem (ciclista, dia, escrita): lexsort é estável, a última escrita do dia fica no fim
+        order = np.lexsort((day, rider))
+        self.rider = rider[order]
+        self.day = day[order]
+        self.price = price[order]
+        self.keys = self.rider.astype(np.int64) * DAY_SPAN + self.day
+        self.offsets = np.searchsorted(self.rider, np.arange(len(self.ids) + 1))
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    def series(self, rider_id: str) -> Tuple[List[date], np.ndarray]:
+        """Pares (dia, preço) de um ciclista, por ordem de dia."""
+        i = self.index.get(rider_id)
+        if i is None:
+            return [], np.zeros(0, dtype=np.float32)
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return [from_day(d) for d in self.day[start:end].tolist()], self.price[start:end]
+
+    def latest(self) -> np.ndarray:
+        """Último preço gravado de cada ciclista (NaN se não tiver pontos)."""
+        last = self.offsets[1:] - 1
+        has = self.offsets[1:] > self.offsets[:-1]
+        prices = np.full(len(self.ids), np.nan, dtype=np.float32)
+        prices[has] = self.price[last[has]]
+        return prices
+
+    def prices_at(self, day: int) -> np.ndarray:
+        """Preço de todos os ciclistas no dia dado (último ponto <= dia; NaN antes do primeiro)."""
+        riders = np.arange(len(self.ids), dtype=np.int64)
+        pos = np.searchsorted(self.keys, riders * DAY_SPAN + day, side='right') - 1
+        valid = pos >= self.offsets[:-1]
+        prices = np.full(len(self.ids), np.nan, dtype=np.float32)
+        prices[valid] = self.price[pos[valid]]
+        return prices
+
+    def movers(self, start: int, end: int, top: int = 10) -> List[Tuple[str, float, float, float]]:
+        """Maiores variações (percentuais) entre start e end: (id, preço inicial, final, %)."""
+        before, after = self.prices_at(start), self.prices_at(end)
+        valid = ~np.isnan(before) & ~np.isnan(after) & (before > 0)
+        idx = np.flatnonzero(valid)
+        change = (after[idx] - before[idx]) / before[idx] * 100
+        order = np.argsort(-np.abs(change), kind='stable')[:top]
+        return [(self.ids[idx[k]], float(before[idx[k]]), float(after[idx[k]]), float(change[k]))
+                for k in order.tolist()]
+
+    def append(self, rider_ids: Sequence[str], days: Sequence[int], prices: Sequence[float]) -> int:
+        """
+        Acrescenta pontos ao store. Pontos com o mesmo preço que o último
+        gravado do ciclista são ignorados. Retorna o número de pontos gravados.
+
+        Os pontos devem vir por ordem de dia dentro de cada ciclista.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        latest = self.latest()
+        new_ids = []
+        rows, kept_days, kept_prices = [], [], []
+        for rider_id, day, price in zip(rider_ids, days, prices):
+            i = self.index.get(rider_id)
+            if i is None:
+                i = len(self.ids)
+                self.ids.append(rider_id)
+                self.index[rider_id] = i
+                new_ids.append(rider_id)
+                latest = np.append(latest, np.float32(np.nan))
+            price = np.float32(price)
+            if latest[i] == price:
+                continue
+            latest[i] = price
+            rows.append(i)
+            kept_days.append(day)
+            kept_prices.append(price)
+
+        # Primeiro os ids, depois as colunas: uma interrupção nunca deixa pontos sem id
+        if new_ids:
+            with open(os.path.join(self.path, RIDERS_FILE), 'a', encoding='utf-8') as f:
+                f.writelines(f"{rider_id}\n" for rider_id in new_ids)
+        # Uma escrita interrompida pode ter deixado uma coluna mais comprida do que
+        # as outras: trunca todas ao comprimento comum antes de acrescentar
+        n = column_rows(self.path)
+        for name, filename, dtype in COLUMNS:
+            filepath = os.path.join(self.path, filename)
+            if os.path.exists(filepath) and os.path.getsize(filepath) != n * np.dtype(dtype).itemsize:
+                os.truncate(filepath, n * np.dtype(dtype).itemsize)
+        for (name, filename, dtype), values in zip(COLUMNS, (rows, kept_days, kept_prices)):
+            with open(os.path.join(self.path, filename), 'ab') as f:
+                np.asarray(values, dtype=dtype).tofile(f)
+
+        self.load()
+        return len(rows)
+
+    def record(self, records: Iterable[RiderRecord], index: CyclistIndex,
+               day: Optional[int] = None) -> int:
+        """
+        Grava o preço atual de cada ciclista de uma execução da pipeline com o
+        cyclistId da app (index). Os nomes sem correspondência ficam em self.unmatched.
+        """
+        day = to_day(date.today()) if day is None else day
+        ids, prices = [], []
+        self.unmatched = []
+        for r in records:
+            cyclist = index.find(r.full_name, r.profile_url, r.team)
+            if cyclist is None:
+                self.unmatched.append(r.full_name)
+                continue
+            ids.append(cyclist['id'])
+            prices.append(r.price)
+        return self.append(ids, [day] * len(ids), prices)
+
+    def import_entities(self, rows: List[dict]) -> int:
+        """Acrescenta linhas CyclistPriceHistoryEntity (cyclistId, newPrice, timestamp)."""
+        rows = sorted(rows, key=lambda r: int(r['timestamp']))
+        return self.append([r['cyclistId'] for r in rows],
+                           [int(r['timestamp']) // DAY_MS for r in rows],
+                           [float(r['newPrice']) for r in rows])
+
+
+def record_run(output_file: str, records: Iterable[RiderRecord]) -> int:
+    """
+    Grava os preços de uma execução no store ao lado do CSV de saída, com os
+    ids do cyclists.csv da mesma pasta. Sem esse ficheiro não grava nada.
+    """
+    folder = os.path.dirname(output_file)
+    cyclists_file = os.path.join(folder, DEFAULT_CYCLISTS)
+    if not os.path.exists(cyclists_file):
+        print(f"  (sem {cyclists_file} com os ids da app, o histórico de preços não é gravado)")
+        return 0
+    store = PriceHistoryStore(os.path.join(folder, DEFAULT_STORE))
+    written = store.record(records, CyclistIndex.from_rows(read_rows(cyclists_file)))
+    if store.unmatched:
+        print(f"  {len(store.unmatched)} ciclistas sem id da app fora do histórico de preços")
+    return written
+
+
+def benchmark(n_riders: int = 600, n_days: int = 365, seed: int = 42):
+    """Uma época de execuções diárias, com ~30% dos preços a mudar por dia."""
+    rng = np.random.default_rng(seed)
+    ids = [f"rider-{i}" for i in range(n_riders)]
+    prices = np.round(rng.uniform(3, 15, n_riders), 1).astype(np.float32)
+    first_day = parse_day('2026-01-01')
+    history = np.empty((n_days, n_riders), dtype=np.float32)
+
+    path = tempfile.mkdtemp(prefix='price_history_')
+    try:
+        store = PriceHistoryStore(path)
+        t0 = time.perf_counter()
+        for d in range(n_days):
+            moving = rng.random(n_riders) < 0.3
+            prices = np.where(moving, np.clip(prices + rng.choice([-0.1, 0.1], n_riders), 1, 25),
+                              prices).astype(np.float32)
+            history[d] = prices
+            store.append(ids, [first_day + d] * n_riders, prices.tolist())
+        write_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        store = PriceHistoryStore(path)
+        load_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for rider_id in ids[:100]:
+            store.series(rider_id)
+        chart_time = (time.perf_counter() - t0) / 100
+
+        t0 = time.perf_counter()
+        movers = store.movers(first_day, first_day + n_days - 1)
+        movers_time = time.perf_counter() - t0
+
+        size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        print(f"{n_riders} ciclistas x {n_days} dias: {len(store):,} pontos, {size / 1024:.0f} KB")
+        print(f"  {n_days} execuções:  {write_time:8.2f} s")
+        print(f"  abrir o store:   {load_time * 1000:8.2f} ms")
+        print(f"  série (gráfico): {chart_time * 1000:8.3f} ms")
+        print(f"  maiores subidas: {movers_time * 1000:8.2f} ms")
+
+        # Verificação contra a matriz dia x ciclista
+        for d in rng.integers(0, n_days, 20).tolist():
+            if not np.array_equal(store.prices_at(first_day + d), history[d]):
+                raise AssertionError(f"Preços do dia {d} diferentes")
+        change = (history[-1] - history[0]) / history[0] * 100
+        best = np.argsort(-np.abs(change), kind='stable')[:len(movers)]
+        if [m[0] for m in movers] != [ids[i] for i in best.tolist()]:
+            raise AssertionError("Maiores variações diferentes")
+        print("  Igual à matriz dia x ciclista ✓")
+
+        # Execução interrompida: rider.i4 com duas linhas a mais e price.f4 com meia linha
+        with open(os.path.join(path, 'rider.i4'), 'ab') as f:
+            np.asarray([0, 1], dtype=np.int32).tofile(f)
+        with open(os.path.join(path, 'price.f4'), 'ab') as f:
+            f.write(b'\x00\x00')
+        store = PriceHistoryStore(path)
+        before = store.series(ids[0])
+        store.append([ids[0], 'rider-new'], [first_day + n_days] * 2, [99.0, 7.5])
+        store = PriceHistoryStore(path)
+        days, series = store.series(ids[0])
+        if (days[:-1] != before[0] or not np.array_equal(series[:-1], before[1])
+                or days[-1] != from_day(first_day + n_days) or series[-1] != 99.0
+                or store.series('rider-new')[1].tolist() != [7.5]):
+            raise AssertionError("Colunas desalinhadas depois de uma escrita interrompida")
+        print("  Escrita interrompida: colunas truncadas e séries certas depois do append ✓")
+
+        # record (pipeline) e import (app) do mesmo ciclista na mesma série
+        index = CyclistIndex.from_rows([
+            {'id': 'cyclist-tadej-pogacar-1234', 'firstName': 'Tadej', 'lastName': 'Pogačar',
+             'teamName': 'UAE Team Emirates-XRG', 'profileUrl': 'rider/tadej-pogacar'},
+        ])
+        pogacar = RiderRecord('Tadej', 'Pogačar', 'UAE Team Emirates-XRG', price=15.0,
+                              profile_url='https://www.procyclingstats.com/rider/tadej-pogacar')
+        nobody = RiderRecord('Sem', 'Correspondência', price=5.0)
+        store.record([pogacar, nobody], index, first_day + n_days + 1)
+        store.import_entities([{'cyclistId': 'cyclist-tadej-pogacar-1234', 'newPrice': '15.5',
+                                'timestamp': str((first_day + n_days + 2) * DAY_MS)}])
+        store = PriceHistoryStore(path)
+        if (store.series('cyclist-tadej-pogacar-1234')[1].tolist() != [15.0, 15.5]
+                or len(store.ids) != n_riders + 2):
+            raise AssertionError("record e import do mesmo ciclista em séries diferentes")
+        print("  record e import juntam-se no cyclistId da app ✓")
+    finally:
+        shutil.rmtree(path)
+
+
+def take_option(args: List[str], option: str, default: Optional[str] = None) -> Optional[str]:
+    if option in args:
+        pos = args.index(option)
+        value = args[pos + 1]
+        del args[pos:pos + 2]
+        return value
+    return default
+
+
+def usage():
+    print("Uso: python price_history_store.py record ciclistas_final.csv [--cyclists cyclists.csv] "
+          "[--store price_history] [--date AAAA-MM-DD]")
+    print("     python price_history_store.py import price_history.csv [--store price_history]")
+    print("     python price_history_store.py chart cyclistId [--store price_history]")
+    print("     python price_history_store.py movers [--from AAAA-MM-DD] [--to AAAA-MM-DD] [--top 10] [--store price_history]")
+    print("     python price_history_store.py --bench [n_ciclistas]")
+    sys.exit(1)
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--bench':
+        benchmark(int(args[1]) if len(args) > 1 else 600)
+        return
+    if not args:
+        usage()
+
+    command = args.pop(0)
+    store = PriceHistoryStore(take_option(args, '--store', DEFAULT_STORE))
+
+    if command == 'record' and len(args) >= 1:
+        day = take_option(args, '--date')
+        index = CyclistIndex.from_rows(read_rows(take_option(args, '--cyclists', DEFAULT_CYCLISTS)))
+        records = list(read_csv(args[0]))
+        written = store.record(records, index, parse_day(day) if day else None)
+        print(f"✓ {written} preços novos de {len(records)} ciclistas em {store.path}")
+        if store.unmatched:
+            print(f"  {len(store.unmatched)} sem id da app (não gravados): {', '.join(store.unmatched[:10])}")
+    elif command == 'import' and len(args) == 1:
+        written = store.import_entities(read_rows(args[0]))
+        print(f"✓ {written} pontos importados para {store.path}")
+    elif command == 'chart' and len(args) == 1:
+        days, prices = store.series(args[0])
+        if not days:
+            print(f"Sem histórico para {args[0]}")
+            sys.exit(1)
+        for day, price in zip(days, prices.tolist()):
+            print(f"  {day.isoformat()}  €{price:.2f}M")
+    elif command == 'movers':
+        start = take_option(args, '--from')
+        end = take_option(args, '--to')
+        top = int(take_option(args, '--top', '10'))
+        first = int(store.day.min()) if len(store) else to_day(date.today())
+        start_day = parse_day(start) if start else first
+        end_day = parse_day(end) if end else to_day(date.today())
+        print(f"Maiores variações de {from_day(start_day)} a {from_day(end_day)}:")
+        for rider_id, before, after, change in store.movers(start_day, end_day, top):
+            print(f"  {rider_id:<30} €{before:.2f}M -> €{after:.2f}M  {change:+.1f}%")
+    else:
+        usage()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Escalões de preço por ranking UCI.
+
+As duas fórmulas usadas pelos scripts de enriquecimento, sem dependências,
+para que o simulador de épocas (season_simulator.py) as possa avaliar:
+
+- pcs_price: enrich_cyclists.py (procyclingstats, com bónus de especialidade)
+- cyclingranking_price: enrich_from_cyclingranking.py
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+# Escalões de ranking (nome, último ranking do escalão; None = resto)
+RANKING_TIERS: List[Tuple[str, Optional[int]]] = [
+    ('Top 5', 5),
+    ('Top 10', 10),
+    ('Top 25', 25),
+    ('Top 50', 50),
+    ('Top 100', 100),
+    ('Top 200', 200),
+    ('Resto', None),
+]
+
+
+def tier_of(ranking: int) -> int:
+    """Índice do escalão em RANKING_TIERS."""
+    for i, (_name, last) in enumerate(RANKING_TIERS):
+        if last is None or ranking <= last:
+            return i
+    return len(RANKING_TIERS) - 1
+
+
+def pcs_price(ranking: int, speciality_points: Optional[Dict[str, int]] = None) -> float:
+    """
+    Calcula o preço do ciclista baseado no ranking e pontos de especialidade.
+
+    Fórmula:
+    - Top 10: 10-15M
+    - Top 50: 6-10M
+    - Top 100: 4-6M
+    - Resto: 3-5M
+    """
+    if ranking <= 5:
+        base_price = 14.0 - (ranking - 1) * 0.5  # 15, 14.5, 14, 13.5, 13
+    elif ranking <= 10:
+        base_price = 12.0 - (ranking - 6) * 0.4  # ~10-12
+    elif ranking <= 25:
+        base_price = 9.5 - (ranking - 11) * 0.15  # ~7.5-9.5
+    elif ranking <= 50:
+        base_price = 7.0 - (ranking - 26) * 0.08  # ~5-7
+    elif ranking <= 100:
+        base_price = 5.5 - (ranking - 51) * 0.03  # ~4-5.5
+    elif ranking <= 200:
+        base_price = 4.5 - (ranking - 101) * 0.01  # ~3.5-4.5
+    else:
+        base_price = 4.0
+
+    # Ajusta baseado em pontos de especialidade
+    total_spec_points = sum(speciality_points.values()) if speciality_points else 0
+    if total_spec_points > 2000:
+        base_price += 1.0
+    elif total_spec_points > 1000:
+        base_price += 0.5
+
+    return round(max(3.0, min(15.0, base_price)), 1)
+
+
+def cyclingranking_price(ranking: int) -> float:
+    """
+    Calcula o preço do ciclista baseado no ranking UCI.
+
+    Escala:
+    - Top 5: €13-15M
+    - Top 10: €10-12M
+    - Top 25: €7.5-10M
+    - Top 50: €5.5-7.5M
+    - Top 100: €4.5-5.5M
+    - Top 200: €4-4.5M
+    - Resto: €3.5-4M
+    """
+    if ranking <= 1:
+        return 15.0
+    elif ranking <= 3:
+        return 14.0 - (ranking - 2) * 0.5
+    elif ranking <= 5:
+        return 13.0 - (ranking - 4) * 0.5
+    elif ranking <= 10:
+        return 12.0 - (ranking - 6) * 0.4
+    elif ranking <= 25:
+        return 10.0 - (ranking - 11) * 0.15
+    elif ranking <= 50:
+        return 7.5 - (ranking - 26) * 0.08
+    elif ranking <= 100:
+        return 5.5 - (ranking - 51) * 0.02
+    elif ranking <= 200:
+        return 4.5 - (ranking - 101) * 0.005
+    else:
+        return 4.0
+
+
+# Fórmulas disponíveis para o simulador
+PRICE_FUNCTIONS = {
+    'pcs': pcs_price,
+    'cyclingranking': cyclingranking_price,
+}
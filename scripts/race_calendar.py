@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Calendário de provas construído uma vez, para os telemóveis só o descarregarem.
+
+Hoje cada telemóvel corre os scrapers Kotlin (FPCScraper, CabreiraScraper,
+BikeServiceScraper, GranFondoSerraEstrelaScraper, GravelRace114Scraper) e
+vai a uma dúzia de sites. Este script faz o mesmo uma vez:
+
+- as mesmas fontes e os mesmos seletores dos scrapers, com as páginas
+  pedidas em paralelo (thread pool) e guardadas na PageCache por 12h;
+- junta os eventos repetidos entre fontes: mesmo URL, ou mesma data de
+  início e nomes parecidos (Jaccard das palavras, sem ano nem edição);
+  fica o da fonte com mais prioridade (a ordem de SOURCES, FPC primeiro),
+  completado com a data de fim e o URL das outras;
+- só ficam eventos a partir de hoje (Europe/Lisbon), como nos scrapers;
+- escreve o CSV que o AdminSyncViewModel.importRacesFromCsv importa:
+  datainicio,datafim,ano,nome,url (datas dd/MM, ano à parte).
+
+Uso:
+    pip install requests beautifulsoup4
+    python race_calendar.py [calendario.csv] [--workers 8] [--no-cache] [--all]
+    python race_calendar.py --bench [n_fontes]
+
+--all mantém também os eventos passados.
+"""
+
+import csv
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+from zoneinfo import ZoneInfo
+
+try:
+    import requests
+    from bs4 import BeautifulSoup
+except ImportError:
+    print("A instalar dependências...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "requests", "beautifulsoup4"])
+    import requests
+    from bs4 import BeautifulSoup
+
+from date_engine import MONTH_NAMES, MONTHS
+from page_cache import PageCache
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+}
+
+LISBON = ZoneInfo('Europe/Lisbon')
+CACHE_TTL = 12 * 3600
+DEFAULT_WORKERS = 8
+SIMILAR_NAMES = 0.6
+
+CSV_HEADER = ['datainicio', 'datafim', 'ano', 'nome', 'url']
+
+# Formatos de data dos scrapers (dia, mês, ano = índices dos grupos)
+DATE_PATTERNS = [
+    (re.compile(rf"(\d{{1,2}})\s+(?:de\s+)?({MONTH_NAMES})\.?\s+(?:de\s+)?(\d{{4}})", re.I), (1, 2, 3)),
+    (re.compile(rf"({MONTH_NAMES})\s+(\d{{1,2}})(?:st|nd|rd|th)?,?\s+(\d{{4}})", re.I), (2, 1, 3)),
+    (re.compile(r"(\d{1,2})[/\-.](\d{1,2})[/\-.](\d{4})"), (1, 2, 3)),
+    (re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})"), (3, 2, 1)),
+]
+
+# Palavras que não distinguem eventos ("2026", "XV", "3ª edição", ...)
+NAME_STOPWORDS = {'de', 'da', 'do', 'das', 'dos', 'e', 'a', 'o', 'the', 'edicao', 'ed'}
+ROMAN = re.compile(r'^[ivxlc]+$')
+
+Event = Dict[str, object]
+
+
+def parse_dates(text: str, first_year: int = 2024, last_year: int = 2030) -> List[date]:
+    """Datas encontradas no texto, pela ordem em que aparecem."""
+    found = []
+    for pattern, (d, m, y) in DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            month = match.group(m)
+            month = MONTHS.get(month.lower()) if not month.isdigit() else int(month)
+            try:
+                year = int(match.group(y))
+                if month and first_year <= year <= last_year:
+                    found.append((match.start(), date(year, month, int(match.group(d)))))
+            except ValueError:
+                continue
+    return [value for _pos, value in sorted(found)]
+
+
+def name_tokens(name: str) -> frozenset:
+    """Palavras do nome sem acentos, anos, números de edição nem preposições."""
+    text = unicodedata.normalize('NFD', name.lower())
+    text = ''.join(c for c in text if unicodedata.category(c) != 'Mn')
+    words = re.findall(r'[a-z0-9]+', text)
+    return frozenset(w for w in words
+                     if w not in NAME_STOPWORDS and not w.isdigit() and not ROMAN.match(w)
+                     and not re.match(r'^\d+(a|o)$', w))
+
+
+def make_event(nome: str, inicio: date, url: str, source: str, fim: Optional[date] = None) -> Event:
+    return {'nome': ' '.join(nome.split()), 'inicio': inicio, 'fim': fim, 'url': url, 'source': source}
+
+
+def image_or_link(element, base_url: str, attribute: str = 'href') -> str:
+    value = element.get(attribute, '') if element else ''
+    return urljoin(base_url, value) if value else ''
+
+
+def parse_fpc(soup: BeautifulSoup, base_url: str) -> List[Event]:
+    """FPCScraper: linhas div.row.eventos-row, só provas com link de inscrição."""
+    events = []
+    for row in soup.select('div.row.eventos-row'):
+        cols = row.select('div[class*=col]')
+        name = row.select_one('strong, b')
+        if not cols or name is None or not name.get_text(strip=True):
+            continue
+        dates = parse_dates(cols[0].get_text(' ', strip=True))
+        url = image_or_link(row.select_one('a[href*=prova-inscrever], a[href*=inscri]'), base_url)
+        if not dates or not url.startswith('http'):
+            continue
+        end = dates[-1] if len(dates) > 1 and dates[-1] > dates[0] else None
+        events.append(make_event(name.get_text(strip=True), dates[0], url, 'FPC', end))
+    return events
+
+
+def event_name(link, url: str, marker: str) -> str:
+    """extractEventName: alt/title da imagem, texto do link ou slug do URL."""
+    img = link.select_one('img')
+    for attribute in ('alt', 'title'):
+        value = (img.get(attribute) or '').strip() if img else ''
+        if len(value) > 3 and 'logo' not in value.lower():
+            return value
+    text = link.get_text(' ', strip=True)
+    if len(text) > 5 and not re.search(r'\d{4}', text):
+        return text
+    slug = url.split(marker, 1)[-1].split('/')[0].split('?')[0]
+    return ' '.join(w.capitalize() for w in re.split(r'[-_]', slug) if w)
+
+
+def parse_event_links(soup: BeautifulSoup, base_url: str, selector: str, marker: str,
+                      source: str, limit: Optional[int] = None) -> List[Event]:
+    """CabreiraScraper / BikeServiceScraper: links de eventos com a data no cartão à volta."""
+    events, seen = [], set()
+    for link in soup.select(selector)[:limit]:
+        url = image_or_link(link, base_url)
+        if not url.startswith('http') or url in seen:
+            continue
+        seen.add(url)
+        parent = link.parent
+        grand_parent = parent.parent if parent is not None else None
+        text = ' '.join(e.get_text(' ', strip=True) for e in (link, parent, grand_parent) if e is not None)
+        dates = parse_dates(text, first_year=2026)
+        name = event_name(link, url, marker)
+        if dates and name:
+            events.append(make_event(name, dates[0], url, source))
+    return events
+
+
+def parse_single_event(name: str, url: str, source: str) -> Callable[[BeautifulSoup, str], List[Event]]:
+    """GranFondoSerraEstrelaScraper / GravelRace114Scraper: um evento por site."""
+    def parse(soup: BeautifulSoup, base_url: str) -> List[Event]:
+        body = soup.body.get_text(' ', strip=True) if soup.body else ''
+        dates = parse_dates(body)
+        return [make_event(name, dates[0], url, source)] if dates else []
+    return parse
+
+
+# Fontes por ordem de prioridade (a primeira ganha nos duplicados)
+SOURCES: List[Tuple[str, str, Callable[[BeautifulSoup, str], List[Event]]]] = [
+    ('FPC', 'https://www.fpciclismo.pt/calendario', parse_fpc),
+    ('Cabreira Solutions', 'https://cabreirasolutions.com/eventos/',
+     lambda soup, base: parse_event_links(soup, base, 'a[href*="/evento/"]', '/evento/',
+                                          'Cabreira Solutions', limit=20)),
+    ('BikeService', 'https://bikeservice.pt/pt/',
+     lambda soup, base: parse_event_links(soup, base, 'a[href*="/event/"]', '/event/', 'BikeService')),
+    ('Gran Fondo Serra da Estrela', 'https://granfondoserradaestrela.com',
+     parse_single_event('Gran Fondo Serra da Estrela', 'https://granfondoserradaestrela.com',
+                        'Gran Fondo Serra da Estrela')),
+    ('114 Gravel Race', 'https://114gravelrace.com',
+     parse_single_event('114 Gravel Race - UCI Gravel World Series', 'https://114gravelrace.com/inscricoes/',
+                        '114 Gravel Race')),
+]
+
+
+def fetch_html(url: str) -> str:
+    response = requests.get(url, headers=HEADERS, timeout=15)
+    response.raise_for_status()
+    return response.text
+
+
+class CalendarBuilder:
+    """Busca todas as fontes em paralelo e junta os eventos."""
+
+    def __init__(self, sources=SOURCES, cache: Optional[PageCache] = None,
+                 workers: int = DEFAULT_WORKERS, fetcher: Callable[[str], str] = fetch_html):
+        self.sources = sources
+        self.cache = cache
+        self.workers = workers
+        self.fetcher = fetcher
+        self.errors: Dict[str, str] = {}
+        self.counts: Dict[str, int] = {}
+
+    def _source(self, source) -> List[Event]:
+        name, url, parse = source
+        try:
+            if self.cache is not None:
+                html = self.cache.get_or_fetch(url, lambda: self.fetcher(url), ttl=CACHE_TTL)
+            else:
+                html = self.fetcher(url)
+            events = parse(BeautifulSoup(html, 'html.parser'), url)
+        except Exception as e:
+            self.errors[name] = f"{e.__class__.__name__}: {e}"
+            events = []
+        self.counts[name] = len(events)
+        return events
+
+    def scrape(self) -> List[List[Event]]:
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(self.sources)))) as pool:
+            return list(pool.map(self._source, self.sources))
+
+    def build(self, since: Optional[date] = None) -> List[Event]:
+        events = dedupe([e for per_source in self.scrape() for e in per_source])
+        if since is not None:
+            events = [e for e in events if (e['fim'] or e['inicio']) >= since]
+        return sorted(events, key=lambda e: (e['inicio'], e['nome']))
+
+
+def dedupe(events: List[Event]) -> List[Event]:
+    """
+    Junta eventos repetidos. events vem por ordem de prioridade das fontes;
+    por data de início, compara só com os eventos já aceites nesse dia.
+    """
+    kept: List[Event] = []
+    by_url: Dict[str, Event] = {}
+    by_day: Dict[date, List[Tuple[frozenset, Event]]] = {}
+
+    for event in events:
+        url = str(event['url']).rstrip('/').lower()
+        tokens = name_tokens(str(event['nome']))
+        match = by_url.get(url) if url else None
+        if match is None:
+            for other_tokens, other in by_day.get(event['inicio'], []):
+                union = tokens | other_tokens
+                if union and len(tokens & other_tokens) / len(union) >= SIMILAR_NAMES:
+                    match = other
+                    break
+        if match is not None:
+            if event['fim'] and (match['fim'] is None or event['fim'] > match['fim']):
+                match['fim'] = event['fim']
+            if not match['url']:
+                match['url'] = event['url']
+            match['sources'].append(event['source'])
+            continue
+
+        event = dict(event, sources=[event['source']])
+        kept.append(event)
+        if url:
+            by_url[url] = event
+        by_day.setdefault(event['inicio'], []).append((tokens, event))
+    return kept
+
+
+def csv_row(event: Event) -> List[str]:
+    """datainicio,datafim,ano,nome,url; datafim vazia se for no mesmo dia ou noutro ano."""
+    start, end = event['inicio'], event['fim']
+    same_year_end = end is not None and end > start and end.year == start.year
+    return [start.strftime('%d/%m'), end.strftime('%d/%m') if same_year_end else '',
+            str(start.year), event['nome'], event['url']]
+
+
+def write_calendar(filename: str, events: List[Event]):
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(csv_row(e) for e in events)
+
+
+def today_lisbon() -> date:
+    return datetime.now(LISBON).date()
+
+
+def fake_sources(n_sources: int, latency: float):
+    """Fontes sintéticas com eventos repetidos entre elas e latência simulada."""
+    base = date(2026, 3, 1)
+    pages = {}
+    sources = []
+    for s in range(n_sources):
+        url = f"https://fonte{s}.pt/eventos/"
+        rows = []
+        for k in range(40):
+            day = base + timedelta(days=k * 3)
+            # Metade dos eventos é comum a todas as fontes, com variações no nome
+            name = f"Clássica {k} de Teste" if k % 2 == 0 else f"Prova Fonte{s}"
+            if k % 2 == 0 and s % 2:
+                name = f"{['I', 'II', 'III'][s % 3]} Clássica {k} de Teste 2026"
+            rows.append(f'<a href="/evento/e{s}-{k}"><img alt="{name}"></a>'
+                        f'<span>{day.day} de {list(MONTHS)[day.month - 1]} de {day.year} Porto</span>')
+        pages[url] = '<html><body>' + ''.join(f"<div><div>{r}</div></div>" for r in rows) + '</body></html>'
+        sources.append((f"Fonte {s}", url,
+                        lambda soup, b, s=s: parse_event_links(soup, b, 'a[href*="/evento/"]', '/evento/',
+                                                               f"Fonte {s}")))
+
+    def fetcher(url: str) -> str:
+        time.sleep(latency)
+        return pages[url]
+
+    return sources, fetcher
+
+
+def benchmark(n_sources: int = 12, latency: float = 1.0):
+    import tempfile
+    sources, fetcher = fake_sources(n_sources, latency)
+    print(f"{n_sources} fontes x 40 eventos, {latency:.1f}s por página:")
+
+    results = []
+    for label, workers in (('sequencial', 1), (f"{DEFAULT_WORKERS} threads", DEFAULT_WORKERS)):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            builder = CalendarBuilder(sources, PageCache(cache_dir), workers, fetcher)
+            t0 = time.perf_counter()
+            events = builder.build()
+            elapsed = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            cached = builder.build()
+            cached_time = time.perf_counter() - t0
+        print(f"  {label:<12} {elapsed:6.2f}s  (com cache: {cached_time * 1000:.0f} ms)")
+        if [csv_row(e) for e in cached] != [csv_row(e) for e in events]:
+            raise AssertionError("Calendário da cache diferente")
+        results.append([csv_row(e) for e in events])
+
+    if results[0] != results[1]:
+        raise AssertionError("Calendários sequencial e paralelo diferentes")
+    expected = 20 + 20 * n_sources
+    if len(results[0]) != expected:
+        raise AssertionError(f"{len(results[0])} eventos depois de juntar, esperados {expected}")
+    print(f"  {n_sources * 40} eventos -> {expected} sem repetidos, iguais nos dois modos ✓")
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--bench':
+        benchmark(int(args[1]) if len(args) > 1 else 12)
+        return
+
+    workers = DEFAULT_WORKERS
+    if '--workers' in args:
+        pos = args.index('--workers')
+        workers = int(args[pos + 1])
+        del args[pos:pos + 2]
+    use_cache = '--no-cache' not in args
+    keep_past = '--all' in args
+    args = [a for a in args if a not in ('--no-cache', '--all')]
+
+    if len(args) > 1 or (args and args[0].startswith('--')):
+        print("Uso: python race_calendar.py [calendario.csv] [--workers 8] [--no-cache] [--all]")
+        print("     python race_calendar.py --bench [n_fontes]")
+        sys.exit(1)
+
+    output_file = args[0] if args else 'calendario.csv'
+    builder = CalendarBuilder(cache=PageCache() if use_cache else None, workers=workers)
+    t0 = time.perf_counter()
+    events = builder.build(since=None if keep_past else today_lisbon())
+    elapsed = time.perf_counter() - t0
+
+    for name, _url, _parse in builder.sources:
+        status = f"✗ {builder.errors[name]}" if name in builder.errors else f"{builder.counts.get(name, 0)} eventos"
+        print(f"  {name:<30} {status}")
+    write_calendar(output_file, events)
+    merged = sum(len(e['sources']) > 1 for e in events)
+    print(f"✓ {len(events)} provas ({merged} em mais de uma fonte) em {output_file} ({elapsed:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
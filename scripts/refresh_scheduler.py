@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Agendador de atualizações: quem buscar primeiro com um orçamento de pedidos.
+
+Cada execução do enrich_cyclists.py voltava a buscar todos os ciclistas com a
+mesma prioridade, mas os dados dos primeiros do ranking e dos mais escolhidos
+mudam muito mais vezes do que os de um gregário. Este script dá a cada
+ciclista uma prioridade e, com um orçamento fixo de pedidos por execução,
+escolhe os que valem mais:
+
+- importância (0 a 1): ranking UCI (1/sqrt(ranking)), ownership de hoje
+  em demand.csv (CyclistDemandEntity) e participação confirmada numa corrida
+  dos próximos RACE_WINDOW_DAYS dias (RaceParticipantEntity), mais perto da
+  partida vale mais;
+- desatualização: probabilidade de os dados já terem mudado desde a última
+  busca, 1 - exp(-idade * taxa), com uma taxa que cresce com a importância;
+- prioridade = importância x desatualização. Quem nunca foi buscado ou tem
+  mais de MAX_AGE_DAYS dias passa à frente, para os gregários também serem
+  atualizados de vez em quando;
+- as datas da última busca ficam em refresh_state.json (o enrich_cyclists.py
+  grava-as em cada busca bem sucedida).
+
+Uso:
+    pip install numpy
+    python refresh_scheduler.py --budget N input.csv [--demand demand.csv]
+        [--races races.csv --participants race_participants.csv]
+    python refresh_scheduler.py --bench [n_ciclistas]
+
+As opções são as mesmas do enrich_cyclists.py --budget, que busca os ciclistas
+escolhidos; este script só mostra a escolha.
+
+input.csv é o mesmo do enrich_cyclists.py (Nome,Equipa,Ranking,URL), com uma
+coluna cyclistId opcional para ligar o ciclista a demand.csv e às corridas.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    print("A instalar numpy...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "numpy"])
+    import numpy as np
+
+from fantasy_rules import ownership_percent
+from rider_record import as_bool, read_rows
+
+DEFAULT_STATE_FILE = 'refresh_state.json'
+
+DAY_S = 24 * 60 * 60
+DAY_MS = DAY_S * 1000
+
+# Peso de cada sinal na importância (somam 1)
+WEIGHTS = {'ranking': 0.4, 'ownership': 0.35, 'race': 0.25}
+# Um ciclista de importância 1 tem ~63% de probabilidade de ter mudado ao fim
+# de STALE_DAYS dias; MIN_RATE é o mínimo para quem não tem importância nenhuma
+STALE_DAYS = 3.0
+MIN_RATE = 0.05
+MAX_AGE_DAYS = 30
+RACE_WINDOW_DAYS = 14
+
+
+class RefreshState:
+    """Data da última busca de cada ciclista (chave: o URL do PCS, ex. rider/tadej-pogacar)."""
+
+    def __init__(self, path: str = DEFAULT_STATE_FILE):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def mark(self, key: str, when: Optional[datetime] = None):
+        """Regista uma busca bem sucedida."""
+        entry = self.entries.setdefault(key, {'fetches': 0})
+        entry['last_fetched'] = (when or datetime.now()).isoformat(timespec='seconds')
+        entry['fetches'] += 1
+
+    def ages(self, keys: Sequence[str], now: Optional[float] = None) -> np.ndarray:
+        """Dias desde a última busca de cada chave (inf se nunca foi buscado)."""
+        now = time.time() if now is None else now
+        ages = np.full(len(keys), np.inf)
+        for i, key in enumerate(keys):
+            entry = self.entries.get(key)
+            if entry:
+                ages[i] = (now - datetime.fromisoformat(entry['last_fetched']).timestamp()) / DAY_S
+        return np.maximum(ages, 0.0)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def save(self):
+        """Grava o estado de forma atómica."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def importance(ranking: np.ndarray, ownership: np.ndarray, race_days: np.ndarray) -> np.ndarray:
+    """
+    Importância de 0 a 1 a partir do ranking UCI, do ownership (%) e dos dias
+    até à próxima corrida confirmada (inf se nenhuma).
+    """
+    rank_score = 1.0 / np.sqrt(np.maximum(ranking, 1))
+    top = ownership.max() if len(ownership) else 0.0
+    own_score = ownership / top if top > 0 else np.zeros(len(ownership))
+    race_score = np.clip(1.0 - race_days / RACE_WINDOW_DAYS, 0.0, 1.0)
+    return (WEIGHTS['ranking'] * rank_score + WEIGHTS['ownership'] * own_score
+            + WEIGHTS['race'] * race_score)
+
+
+def change_probability(weight: np.ndarray, age_days: np.ndarray) -> np.ndarray:
+    """Probabilidade de os dados terem mudado desde a última busca."""
+    rate = (MIN_RATE + weight) / STALE_DAYS
+    with np.errstate(invalid='ignore'):
+        return np.where(np.isinf(age_days), 1.0, -np.expm1(-age_days * rate))
+
+
+def priorities(weight: np.ndarray, age_days: np.ndarray) -> np.ndarray:
+    """importância x desatualização, +1 para quem passou MAX_AGE_DAYS (ou nunca foi buscado)."""
+    return weight * change_probability(weight, age_days) + (age_days >= MAX_AGE_DAYS)
+
+
+def plan(priority: np.ndarray, budget: int) -> np.ndarray:
+    """Índices dos `budget` ciclistas com maior prioridade, do mais prioritário para o menos."""
+    budget = min(budget, len(priority))
+    if budget <= 0:
+        return np.zeros(0, dtype=np.intp)
+    top = np.argpartition(-priority, budget - 1)[:budget]
+    return top[np.argsort(-priority[top], kind='stable')]
+
+
+def ownership_by_cyclist(demand_rows: List[Dict]) -> Dict[str, float]:
+    """Ownership (%) de hoje (o periodStart mais recente) por cyclistId."""
+    if not demand_rows:
+        return {}
+    period_start = max(int(d['periodStart']) for d in demand_rows)
+    return {d['cyclistId']: ownership_percent(int(d['ownershipCount']), int(d['totalTeams']))
+            for d in demand_rows if int(d['periodStart']) == period_start}
+
+
+def next_race_days(races: List[Dict], participants: Iterable[Dict], now_ms: int) -> Dict[str, float]:
+    """Dias até à próxima corrida (ativa, por terminar) em que cada ciclista está confirmado."""
+    starts = {r['id']: int(r['startDate']) for r in races
+              if int(r['startDate']) >= now_ms - DAY_MS
+              and as_bool(r.get('isActive', True)) and not as_bool(r.get('isFinished', False))}
+    days: Dict[str, float] = {}
+    for p in participants:
+        start = starts.get(p['raceId'])
+        if start is None or p.get('status', 'CONFIRMED') != 'CONFIRMED':
+            continue
+        until = max(start - now_ms, 0) / DAY_MS
+        days[p['cyclistId']] = min(days.get(p['cyclistId'], math.inf), until)
+    return days
+
+
+def rider_key(url: str) -> str:
+    """Chave do estado: o path do PCS (https://www.procyclingstats.com/rider/x -> rider/x)."""
+    return url.split('procyclingstats.com/')[-1].strip('/')
+
+
+def read_input(input_file: str) -> List[Dict[str, str]]:
+    """Linhas do CSV do enrich_cyclists.py com os nomes de colunas normalizados."""
+    riders = []
+    for row in read_rows(input_file):
+        ranking = row.get('Ranking', row.get('ranking', row.get('UCI', ''))) or ''
+        riders.append({
+            'name': row.get('Nome', row.get('name', row.get('Name', ''))),
+            'team': row.get('Equipa', row.get('team', row.get('Team', ''))),
+            'ranking': int(ranking) if ranking.isdigit() else 999,
+            'url': row.get('URL', row.get('url', row.get('Link', ''))),
+            'cyclist_id': row.get('cyclistId', row.get('id', '')),
+        })
+    return riders
+
+
+def schedule(riders: List[Dict], keys: Sequence[str], budget: int, state: RefreshState,
+             ownership: Optional[Dict[str, float]] = None,
+             race_days: Optional[Dict[str, float]] = None,
+             now: Optional[float] = None) -> List[int]:
+    """Índices de `riders` (de read_input) a buscar nesta execução, por ordem de prioridade."""
+    ownership = ownership or {}
+    race_days = race_days or {}
+    weight = importance(
+        np.array([r['ranking'] for r in riders], dtype=np.float64),
+        np.array([ownership.get(r['cyclist_id'], 0.0) for r in riders], dtype=np.float64),
+        np.array([race_days.get(r['cyclist_id'], math.inf) for r in riders], dtype=np.float64),
+    )
+    return plan(priorities(weight, state.ages(keys, now)), budget).tolist()
+
+
+def simulate(weight: np.ndarray, budget: int, days: int, chooser, seed: int = 0) -> float:
+    """
+    Um pedido por ciclista escolhido, uma execução por dia; os dados mudam com
+    a taxa do modelo. Retorna a fração média da importância com dados
+    desatualizados (0 = tudo fresco).
+    """
+    rng = np.random.default_rng(seed)
+    rate = (MIN_RATE + weight) / STALE_DAYS
+    age = np.full(len(weight), np.inf)
+    stale = np.ones(len(weight), dtype=bool)
+    total = 0.0
+    for day in range(days):
+        chosen = chooser(weight, age, day)
+        age[chosen] = 0.0
+        stale[chosen] = False
+        total += weight[stale].sum() / weight.sum()
+        stale |= rng.random(len(weight)) < -np.expm1(-rate)
+        age += 1.0
+    return total / days
+
+
+def benchmark(n: int = 20000, days: int = 60):
+    rng = np.random.default_rng(7)
+    ranking = rng.permutation(n) + 1.0
+    ownership = np.where(ranking <= 200, 60.0 / np.sqrt(ranking), rng.exponential(0.5, n))
+    race_days = np.where(rng.random(n) < 0.1, rng.integers(0, 21, n), np.inf)
+    weight = importance(ranking, ownership, race_days)
+    budget = n // 10
+
+    priority = priorities(weight, rng.exponential(10, n))
+    t0 = time.perf_counter()
+    chosen = plan(priority, budget)
+    plan_time = time.perf_counter() - t0
+    expected = np.argsort(-priority, kind='stable')[:budget]
+    if set(chosen.tolist()) != set(expected.tolist()):
+        raise AssertionError("plan diferente da ordenação completa")
+    print(f"{n} ciclistas, orçamento {budget}: plano em {plan_time * 1000:.1f} ms, "
+          f"igual à ordenação completa ✓")
+
+    def scheduler(w, age, day):
+        return plan(priorities(w, age), budget)
+
+    def round_robin(w, age, day):
+        start = (day * budget) % n
+        return np.arange(start, start + budget) % n
+
+    def everyone(w, age, day):
+        return np.arange(n)
+
+    full = simulate(weight, n, days, everyone)
+    rr = simulate(weight, budget, days, round_robin)
+    sched = simulate(weight, budget, days, scheduler)
+    print(f"Importância desatualizada em média ({days} execuções):")
+    print(f"  {f'tudo ({n} pedidos)':<28} {full:6.1%}")
+    print(f"  {f'round-robin ({budget} pedidos)':<28} {rr:6.1%}")
+    print(f"  {f'agendador ({budget} pedidos)':<28} {sched:6.1%}")
+    if sched >= rr:
+        raise AssertionError("o agendador não ficou mais fresco do que o round-robin")
+    print(f"✓ Agendador {rr / sched:.1f}x menos desatualizado que o round-robin, "
+          f"com {budget / n:.0%} dos pedidos")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ciclistas a buscar nesta execução (as mesmas opções do enrich_cyclists.py --budget).")
+    parser.add_argument('--bench', type=int, nargs='?', const=20000, metavar='n_ciclistas')
+    parser.add_argument('--budget', type=int, metavar='N', help="pedidos por execução")
+    parser.add_argument('input', nargs='?', help="CSV do enrich_cyclists.py (Nome,Equipa,Ranking,URL)")
+    parser.add_argument('--demand', default='', help="demand.csv (CyclistDemandEntity)")
+    parser.add_argument('--races', default='', help="races.csv (RaceEntity)")
+    parser.add_argument('--participants', default='', help="race_participants.csv (RaceParticipantEntity)")
+    args = parser.parse_args()
+
+    if args.bench is not None:
+        benchmark(args.bench)
+        return
+    if args.budget is None or args.input is None:
+        parser.error("são precisos --budget N e input.csv")
+    if bool(args.races) != bool(args.participants):
+        parser.error("--races e --participants vão juntos")
+
+    riders = read_input(args.input)
+    budget = args.budget
+    ownership = ownership_by_cyclist(read_rows(args.demand)) if args.demand else {}
+    race_days = {}
+    if args.races:
+        race_days = next_race_days(read_rows(args.races), read_rows(args.participants),
+                                   int(time.time() * 1000))
+
+    state = RefreshState()
+    keys = [rider_key(r['url']) for r in riders]
+    chosen = schedule(riders, keys, budget, state, ownership, race_days)
+    ages = state.ages(keys)
+    print(f"{len(chosen)} de {len(riders)} ciclistas a buscar ({len(state)} já buscados antes):")
+    for i in chosen:
+        r = riders[i]
+        age = 'nunca' if math.isinf(ages[i]) else f"{ages[i]:.1f} dias"
+        print(f"  #{r['ranking']:<4} {r['name']:<30} última busca: {age}")
+
+
+if __name__ == '__main__':
+    main()
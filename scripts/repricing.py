@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Reprecificação diária em lote pela procura (NumPy).
+
+Faz o mesmo que o PriceUpdateWorker da app, mas para todos os ciclistas de
+uma vez em vez de um DynamicPriceCalculator por ciclista:
+
+1. Procura: o ownership de hoje (CyclistDemandEntity) contra o de ontem
+   (ou a popularidade do ciclista, se ontem não houver registo) dá
+   +/-0.1M por cada 5%, limitado a 5% por dia e a [1.0M, 25.0M];
+2. Pré-corrida: participantes confirmados das corridas que começam nos
+   próximos 5 dias ganham +1% por dia sobre o basePrice, também com o
+   limite diário. As corridas são processadas por ordem de startDate,
+   como na app.
+
+Tal como no worker, só muda o preço (e só se escreve histórico) quando o
+preço limitado é diferente do atual, e os preços não são arredondados.
+
+Uso:
+    pip install numpy
+    python repricing.py cyclists.csv demand.csv [races.csv race_participants.csv] [--now ms]
+    python repricing.py --bench [n_ciclistas]
+
+Ficheiros de entrada (cabeçalhos com os nomes dos campos das entidades Room):
+    cyclists.csv:           id,price,popularity,basePrice,priceBoostActive,priceBoostRaceId,...
+    demand.csv:             cyclistId,periodStart,buyCount,sellCount,ownershipCount,totalTeams,season
+    races.csv:              id,startDate[,isActive,isFinished]
+    race_participants.csv:  raceId,cyclistId,status
+
+O "hoje" é o periodStart mais recente de demand.csv e "ontem" 24h antes.
+
+Saída:
+    cyclists_next.csv   a tabela de ciclistas com price, popularity, basePrice,
+                        priceBoostActive, priceBoostRaceId e lastPriceUpdate atualizados
+    price_history.csv   linhas CyclistPriceHistoryEntity (DEMAND / PRE_RACE_BOOST)
+"""
+
+import csv
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    print("A instalar numpy...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "numpy"])
+    import numpy as np
+
+from fantasy_rules import (
+    MAX_DAILY_CHANGE_PERCENT, MAX_PRICE, MIN_PRICE, OWNERSHIP_THRESHOLD,
+    PRE_RACE_BOOST_DAYS, PRE_RACE_BOOST_PER_DAY, PRICE_CHANGE_PER_THRESHOLD,
+    apply_daily_limit, demand_price_change, ownership_percent, pre_race_boost,
+)
+from rider_record import as_bool, read_rows
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+PRICE_FIELDNAMES = ['price', 'popularity', 'basePrice', 'priceBoostActive', 'priceBoostRaceId',
+                    'lastPriceUpdate']
+
+HISTORY_FIELDNAMES = ['id', 'cyclistId', 'oldPrice', 'newPrice', 'reason',
+                      'raceId', 'timestamp', 'season']
+
+
+def _as_float(value, default: float = 0.0) -> float:
+    if value is None or value == '':
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def daily_limit(current: np.ndarray, calculated: np.ndarray) -> np.ndarray:
+    """applyDailyLimit para vetores."""
+    max_increase = current * (1 + MAX_DAILY_CHANGE_PERCENT)
+    max_decrease = current * (1 - MAX_DAILY_CHANGE_PERCENT)
+    return np.clip(np.clip(calculated, max_decrease, max_increase), MIN_PRICE, MAX_PRICE)
+
+
+def demand_prices(price: np.ndarray, previous: np.ndarray, current: np.ndarray) -> np.ndarray:
+    """calculateDemandPriceChange para vetores (trunc como o toInt do Kotlin)."""
+    thresholds = np.trunc((current - previous) / OWNERSHIP_THRESHOLD)
+    return np.clip(price + thresholds * PRICE_CHANGE_PER_THRESHOLD, MIN_PRICE, MAX_PRICE)
+
+
+def boosted_prices(base: np.ndarray, days_until_race: int) -> np.ndarray:
+    """calculatePreRaceBoost para vetores (mesmos dias para todos)."""
+    if days_until_race < 0 or days_until_race > PRE_RACE_BOOST_DAYS:
+        return base
+    boost_days = PRE_RACE_BOOST_DAYS - days_until_race
+    return np.clip(base * (1 + boost_days * PRE_RACE_BOOST_PER_DAY), MIN_PRICE, MAX_PRICE)
+
+
+class PriceTable:
+    """Colunas de preço de CyclistEntity, uma posição por ciclista."""
+
+    def __init__(self, ids: Sequence[str], price, popularity, base_price,
+                 boost_active, boost_race, rows: Optional[List[Dict]] = None):
+        self.ids = list(ids)
+        self.index = {cyclist_id: i for i, cyclist_id in enumerate(self.ids)}
+        self.price = np.asarray(price, dtype=np.float64).copy()
+        self.popularity = np.asarray(popularity, dtype=np.float64).copy()
+        self.base_price = np.asarray(base_price, dtype=np.float64).copy()
+        self.boost_active = np.asarray(boost_active, dtype=bool).copy()
+        self.boost_race = np.array(boost_race, dtype=object)
+        self.last_update = np.full(len(self.ids), -1, dtype=np.int64)
+        self.rows = rows
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict]) -> 'PriceTable':
+        return cls(
+            [r['id'] for r in rows],
+            [_as_float(r.get('price')) for r in rows],
+            [_as_float(r.get('popularity')) for r in rows],
+            [_as_float(r.get('basePrice')) for r in rows],
+            [as_bool(r.get('priceBoostActive', False)) for r in rows],
+            [r.get('priceBoostRaceId') or None for r in rows],
+            rows,
+        )
+
+    def lookup(self, cyclist_ids: Sequence[str]) -> np.ndarray:
+        """Posição de cada id na tabela (-1 se não existir)."""
+        return np.array([self.index.get(c, -1) for c in cyclist_ids], dtype=np.int64)
+
+    def to_rows(self) -> List[Dict]:
+        """Linhas originais com as colunas de preço atualizadas."""
+        rows = []
+        for i, cyclist_id in enumerate(self.ids):
+            row = dict(self.rows[i]) if self.rows else {'id': cyclist_id}
+            row['price'] = float(self.price[i])
+            row['popularity'] = float(self.popularity[i])
+            row['basePrice'] = float(self.base_price[i])
+            row['priceBoostActive'] = str(bool(self.boost_active[i])).lower()
+            row['priceBoostRaceId'] = self.boost_race[i] or ''
+            if self.last_update[i] >= 0:
+                row['lastPriceUpdate'] = int(self.last_update[i])
+            rows.append(row)
+        return rows
+
+    def fieldnames(self) -> List[str]:
+        """Cabeçalho da entrada + colunas de preço (lastPriceUpdate mesmo que só algumas linhas o tenham)."""
+        fieldnames = list(self.rows[0].keys()) if self.rows else ['id']
+        return fieldnames + [f for f in PRICE_FIELDNAMES if f not in fieldnames]
+
+    def write(self, filename: str):
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=self.fieldnames(), restval='')
+            writer.writeheader()
+            writer.writerows(self.to_rows())
+
+
+class PriceHistory:
+    """Linhas de CyclistPriceHistoryEntity acumuladas em colunas."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def add(self, cyclist_ids: List[str], old_price: np.ndarray, new_price: np.ndarray,
+            reason: str, race_id: Optional[str], timestamp: int, season: int):
+        if len(cyclist_ids):
+            self.chunks.append((cyclist_ids, old_price, new_price, reason, race_id, timestamp, season))
+
+    def __len__(self) -> int:
+        return sum(len(chunk[0]) for chunk in self.chunks)
+
+    def write(self, filename: str) -> int:
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(HISTORY_FIELDNAMES)
+            for cyclist_ids, old_price, new_price, reason, race_id, timestamp, season in self.chunks:
+                for cyclist_id, old, new in zip(cyclist_ids, old_price.tolist(), new_price.tolist()):
+                    writer.writerow([str(uuid.uuid4()), cyclist_id, old, new, reason,
+                                     race_id or '', timestamp, season])
+        return len(self)
+
+
+def update_ownership(table: PriceTable, today: List[Dict]) -> np.ndarray:
+    """
+    Passo 1 do worker: popularity = ownership de hoje.
+
+    Retorna, por linha de today, a posição do ciclista na tabela (-1 se não existir).
+    """
+    idx = table.lookup([d['cyclistId'] for d in today])
+    current = np.array([ownership_percent(int(d.get('ownershipCount') or 0),
+                                          int(d.get('totalTeams') or 0)) for d in today])
+    known = idx >= 0
+    table.popularity[idx[known]] = current[known]
+    return idx
+
+
+def apply_demand(table: PriceTable, today: List[Dict], yesterday: Dict[str, Dict],
+                 history: PriceHistory, now: int, season: int) -> int:
+    """Passo 2 do worker (applyDemandPriceChanges) para todos os ciclistas de hoje."""
+    idx = update_ownership(table, today)
+    known = idx >= 0
+    idx = idx[known]
+    today = [d for d, k in zip(today, known.tolist()) if k]
+    if not today:
+        return 0
+
+    current = table.popularity[idx]
+    # Sem registo de ontem usa a popularidade do ciclista (já atualizada no passo 1)
+    previous = current.copy()
+    for j, demand in enumerate(today):
+        previous_demand = yesterday.get(demand['cyclistId'])
+        if previous_demand is not None:
+            previous[j] = ownership_percent(int(previous_demand.get('ownershipCount') or 0),
+                                            int(previous_demand.get('totalTeams') or 0))
+
+    old_price = table.price[idx]
+    limited = daily_limit(old_price, demand_prices(old_price, previous, current))
+    changed = limited != old_price
+
+    rows = idx[changed]
+    history.add([table.ids[i] for i in rows.tolist()], old_price[changed], limited[changed],
+                'DEMAND', None, now, season)
+    table.price[rows] = limited[changed]
+    table.last_update[rows] = now
+    return len(rows)
+
+
+def apply_pre_race_boosts(table: PriceTable, races: List[Dict], participants: Dict[str, List[str]],
+                          history: PriceHistory, now: int, season: int) -> int:
+    """Passo 3 do worker (applyPreRaceBoosts), corrida a corrida por ordem de startDate."""
+    boosts_applied = 0
+    upcoming = [r for r in races
+                if now <= int(r['startDate']) <= now + PRE_RACE_BOOST_DAYS * DAY_MS
+                and as_bool(r.get('isActive', True)) and not as_bool(r.get('isFinished', False))]
+    upcoming.sort(key=lambda r: int(r['startDate']))
+
+    for race in upcoming:
+        race_id = race['id']
+        # TimeUnit.MILLISECONDS.toDays trunca
+        days_until_race = (int(race['startDate']) - now) // DAY_MS
+        idx = table.lookup(participants.get(race_id, []))
+        idx = idx[idx >= 0]
+        # Já tem boost desta corrida
+        idx = idx[~(table.boost_active[idx] & (table.boost_race[idx] == race_id))]
+        if not len(idx):
+            continue
+
+        old_price = table.price[idx]
+        base = np.where(table.base_price[idx] > 0, table.base_price[idx], old_price)
+        limited = daily_limit(old_price, boosted_prices(base, days_until_race))
+        changed = limited != old_price
+
+        rows = idx[changed]
+        history.add([table.ids[i] for i in rows.tolist()], old_price[changed], limited[changed],
+                    'PRE_RACE_BOOST', race_id, now, season)
+        table.price[rows] = limited[changed]
+        table.boost_active[rows] = True
+        table.boost_race[rows] = race_id
+        table.last_update[rows] = now
+        # Se não tinha basePrice, guarda o preço original
+        no_base = table.base_price[rows] <= 0
+        table.base_price[rows[no_base]] = old_price[changed][no_base]
+        boosts_applied += len(rows)
+
+    return boosts_applied
+
+
+def split_demand(demand_rows: List[Dict]):
+    """Separa os registos de procura em (hoje, ontem por cyclistId, periodStart de hoje)."""
+    if not demand_rows:
+        return [], {}, None
+    period_start = max(int(d['periodStart']) for d in demand_rows)
+    today = [d for d in demand_rows if int(d['periodStart']) == period_start]
+    yesterday = {d['cyclistId']: d for d in demand_rows
+                 if int(d['periodStart']) == period_start - DAY_MS}
+    return today, yesterday, period_start
+
+
+def reference_price(price: float, popularity: float, base_price: float,
+                    previous: Optional[float], current: float,
+                    days_until_race: Optional[int]) -> float:
+    """Um ciclista, uma corrida, com as funções escalares (para verificação)."""
+    # Passo 2: procura (popularidade já é a de hoje)
+    previous_ownership = current if previous is None else previous
+    new_price = apply_daily_limit(price, demand_price_change(price, previous_ownership, current))
+    if days_until_race is None:
+        return new_price
+    # Passo 3: boost sobre o basePrice (ou preço antes do boost)
+    base = base_price if base_price > 0 else new_price
+    return apply_daily_limit(new_price, pre_race_boost(base, days_until_race))
+
+
+def benchmark(n_riders: int = 100_000, seed: int = 42):
+    """Mede o tempo de reprecificar n_riders ciclistas e verifica uma amostra."""
+    rng = np.random.default_rng(seed)
+    now = 1_767_225_600_000
+    period_start = now - now % DAY_MS
+    total_teams = 50_000
+    season = 2026
+
+    ids = [f"c{i}" for i in range(n_riders)]
+    price = np.round(rng.uniform(MIN_PRICE, 15.0, n_riders), 1)
+    base_price = np.where(rng.random(n_riders) < 0.5, price, 0.0)
+    owners_yesterday = rng.integers(0, total_teams // 2, n_riders)
+    owners_today = np.clip(owners_yesterday + rng.integers(-5_000, 5_000, n_riders), 0, total_teams)
+    has_yesterday = rng.random(n_riders) < 0.9
+
+    today = [{'cyclistId': ids[i], 'periodStart': period_start, 'ownershipCount': int(owners_today[i]),
+              'totalTeams': total_teams} for i in range(n_riders)]
+    yesterday = {ids[i]: {'cyclistId': ids[i], 'ownershipCount': int(owners_yesterday[i]),
+                          'totalTeams': total_teams} for i in range(n_riders) if has_yesterday[i]}
+
+    # Cada ciclista em no máximo uma corrida, a 0..6 dias
+    n_races = 7
+    race_of = rng.integers(-1, n_races, n_riders)
+    races = [{'id': f"r{d}", 'startDate': now + d * DAY_MS + 3_600_000} for d in range(n_races)]
+    participants = {race['id']: [ids[i] for i in np.flatnonzero(race_of == d).tolist()]
+                    for d, race in enumerate(races)}
+
+    table = PriceTable(ids, price, np.zeros(n_riders), base_price,
+                       np.zeros(n_riders, dtype=bool), [None] * n_riders)
+    history = PriceHistory()
+
+    t0 = time.perf_counter()
+    demand_changed = apply_demand(table, today, yesterday, history, now, season)
+    t1 = time.perf_counter()
+    boosts = apply_pre_race_boosts(table, races, participants, history, now, season)
+    t2 = time.perf_counter()
+
+    print(f"{n_riders:,} ciclistas, {n_races} corridas")
+    print(f"  Procura:      {t1 - t0:.3f}s ({demand_changed:,} preços alterados)")
+    print(f"  Pré-corrida:  {t2 - t1:.3f}s ({boosts:,} boosts)")
+    print(f"  Histórico:    {len(history):,} linhas")
+
+    # Verificação contra o DynamicPriceCalculator escalar numa amostra
+    for i in rng.choice(n_riders, size=min(2_000, n_riders), replace=False).tolist():
+        previous = (ownership_percent(int(owners_yesterday[i]), total_teams)
+                    if has_yesterday[i] else None)
+        current = ownership_percent(int(owners_today[i]), total_teams)
+        # Só as corridas a <= 5 dias (startDate + 1h) entram no boost
+        days = int(race_of[i]) if 0 <= race_of[i] < PRE_RACE_BOOST_DAYS else None
+        expected = reference_price(float(price[i]), 0.0, float(base_price[i]), previous, current, days)
+        if expected != table.price[i]:
+            raise AssertionError(f"Ciclista {ids[i]}: {table.price[i]} != {expected}")
+    print("  Amostra de 2000 ciclistas igual ao cálculo da app ✓")
+
+    # CSV sem lastPriceUpdate em que só uma linha depois da primeira muda de preço
+    import os
+    import tempfile
+    small = PriceTable.from_rows([
+        {'id': 'a', 'name': 'A', 'price': '5.0', 'popularity': '0', 'basePrice': '0'},
+        {'id': 'b', 'name': 'B', 'price': '5.0', 'popularity': '0', 'basePrice': '0'},
+    ])
+    small_today = [{'cyclistId': c, 'periodStart': period_start, 'ownershipCount': n, 'totalTeams': 100}
+                   for c, n in (('a', 10), ('b', 60))]
+    small_yesterday = {r['cyclistId']: dict(r, ownershipCount=10) for r in small_today}
+    if apply_demand(small, small_today, small_yesterday, PriceHistory(), now, season) != 1:
+        raise AssertionError("Esperado um só preço alterado")
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, 'cyclists_next.csv')
+        small.write(filename)
+        written = read_rows(filename)
+    if [r['lastPriceUpdate'] for r in written] != ['', str(now)] or written[1]['name'] != 'B':
+        raise AssertionError(f"cyclists_next.csv errado: {written}")
+    print("  Tabela escrita com lastPriceUpdate só nas linhas alteradas ✓")
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--bench':
+        benchmark(int(args[1]) if len(args) > 1 else 100_000)
+        return
+
+    now = int(time.time() * 1000)
+    if '--now' in args:
+        pos = args.index('--now')
+        now = int(args[pos + 1])
+        del args[pos:pos + 2]
+
+    if len(args) not in (2, 4):
+        print("Uso: python repricing.py cyclists.csv demand.csv [races.csv race_participants.csv] [--now ms]")
+        print("     python repricing.py --bench [n_ciclistas]")
+        sys.exit(1)
+
+    cyclists_file, demand_file = args[:2]
+    t0 = time.perf_counter()
+    table = PriceTable.from_rows(read_rows(cyclists_file))
+    today, yesterday, period_start = split_demand(read_rows(demand_file))
+    season = int(today[0].get('season') or 0) if today else 0
+    history = PriceHistory()
+
+    demand_changed = apply_demand(table, today, yesterday, history, now, season)
+    print(f"Procura de {period_start}: {demand_changed} preços alterados")
+
+    if len(args) == 4:
+        races = read_rows(args[2])
+        participants: Dict[str, List[str]] = {}
+        for p in read_rows(args[3]):
+            if p.get('status', 'CONFIRMED') == 'CONFIRMED':
+                participants.setdefault(p['raceId'], []).append(p['cyclistId'])
+        boosts = apply_pre_race_boosts(table, races, participants, history, now, season)
+        print(f"Boosts pré-corrida: {boosts}")
+
+    table.write('cyclists_next.csv')
+    count = history.write('price_history.csv')
+
+    print(f"{len(table.ids)} ciclistas reprecificados em {time.perf_counter() - t0:.2f}s")
+    print("✓ Preços de amanhã guardados em cyclists_next.csv")
+    print(f"✓ {count} linhas de histórico guardadas em price_history.csv")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Importador de resultados de etapas do ProCyclingStats.
+
+Hoje os resultados entram à mão no RaceResultsAdminScreen (colar texto,
+uma etapa de cada vez). Este script carrega uma corrida inteira:
+
+- lê a lista de etapas da corrida (Race) e os resultados de cada etapa
+  (Stage) com a biblioteca procyclingstats, em paralelo (thread pool);
+- cada página fica na PageCache (page_cache.py); etapas sem resultados
+  voltam a ser pedidas na execução seguinte, e os resultados ainda
+  provisórios (desclassificações, despromoções) expiram ao fim de
+  PROVISIONAL_TTL até ter passado o dia seguinte à etapa (ou ao fim da
+  corrida, se a página não tiver data); só então ficam na cache para sempre;
+- o tipo da etapa sai do stage_type / perfil do PCS (ITT, TTT, prólogo,
+  p1 = FLAT, p2-p3 = HILLY, p4-p5 = MOUNTAIN);
+- cada ciclista é ligado ao id da app como no findCyclistByName do
+  AdminSyncViewModel (nome completo, apelido + nome, nome e apelido
+  contidos, só apelido se for único), mais o slug do profileUrl e a equipa
+  canónica (team_index) para desempatar apelidos repetidos;
+- os camisolas são o 1.º de cada classificação (gc, points, kom, youth)
+  depois da etapa; pontos e jerseyBonus como no applyStageResults;
+- escreve todas as linhas StageResultEntity de uma vez.
+
+Uso:
+    pip install procyclingstats
+    python results_ingester.py race/tour-de-france/2026 raceId cyclists.csv [stage_results.csv] [--workers 8] [--season 2026]
+    python results_ingester.py --bench [n_etapas]
+
+cyclists.csv: exportação de CyclistEntity (id,firstName,lastName,teamName[,profileUrl]);
+também aceita o esquema dos scripts (first_name,last_name,team,profile_url), com o
+id gerado a partir do nome.
+
+Saída (cabeçalho com os campos de StageResultEntity, lida pelo scoring_engine.py):
+    id,raceId,stageNumber,stageType,cyclistId,position,points,jerseyBonus,isGcLeader,
+    isMountainsLeader,isPointsLeader,isYoungLeader,time,status,timestamp,season
+"""
+
+import csv
+import os
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fantasy_rules import jersey_bonus, stage_points
+from page_cache import PageCache
+from rider_record import read_rows
+from team_index import resolve_team
+
+SEASON = 2026
+DEFAULT_WORKERS = 8
+
+STAGE_RESULT_FIELDNAMES = [
+    'id', 'raceId', 'stageNumber', 'stageType', 'cyclistId', 'position', 'points', 'jerseyBonus',
+    'isGcLeader', 'isMountainsLeader', 'isPointsLeader', 'isYoungLeader', 'time', 'status',
+    'timestamp', 'season',
+]
+
+# Perfil do PCS (p0 = desconhecido) -> StageType
+PROFILE_STAGE_TYPES = {
+    'p1': 'FLAT',
+    'p2': 'HILLY',
+    'p3': 'HILLY',
+    'p4': 'MOUNTAIN',
+    'p5': 'MOUNTAIN',
+}
+
+# Classificação do PCS -> coluna de camisola
+JERSEY_CLASSIFICATIONS = {
+    'gc': 'isGcLeader',
+    'points': 'isPointsLeader',
+    'kom': 'isMountainsLeader',
+    'youth': 'isYoungLeader',
+}
+
+FINISHED = 'DF'
+
+# Resultados provisórios voltam a ser pedidos ao fim de 6 horas...
+PROVISIONAL_TTL = 6 * 3600
+# ...até passar o dia seguinte ao da etapa (a contar da meia-noite do dia da etapa)
+FINAL_AFTER = 2 * 24 * 3600
+
+
+def normalize_for_matching(text: str) -> str:
+    """normalizeForMatching da app: sem acentos, minúsculas, espaços -> '-'."""
+    text = unicodedata.normalize('NFD', text or '')
+    text = ''.join(c for c in text if unicodedata.category(c) != 'Mn')
+    return text.lower().replace(' ', '-').replace('_', '-').strip()
+
+
+def rider_slug(url: str) -> str:
+    """https://www.procyclingstats.com/rider/tadej-pogacar -> tadej-pogacar"""
+    url = (url or '').rstrip('/')
+    return url.rsplit('/', 1)[-1] if 'rider/' in url else ''
+
+
+class CyclistIndex:
+    """Índices por nome, apelido e slug para ligar ciclistas do PCS aos ids da app."""
+
+    def __init__(self, cyclists: List[Dict[str, str]]):
+        self.cyclists = cyclists
+        self.by_full_name: Dict[str, Dict] = {}
+        self.by_last_first: Dict[str, Dict] = {}
+        self.by_slug: Dict[str, Dict] = {}
+        self.by_last_name: Dict[str, List[Dict]] = {}
+        for c in cyclists:
+            first, last = normalize_for_matching(c['firstName']), normalize_for_matching(c['lastName'])
+            self.by_full_name.setdefault(f"{first}-{last}", c)
+            self.by_last_first.setdefault(f"{last}-{first}", c)
+            if c.get('profileUrl'):
+                self.by_slug.setdefault(rider_slug(c['profileUrl']), c)
+            if len(last) > 3:
+                self.by_last_name.setdefault(last, []).append(c)
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, str]]) -> 'CyclistIndex':
+        """Aceita CyclistEntity (id, firstName, ...) ou o esquema dos scripts (first_name, ...)."""
+        cyclists = []
+        for row in rows:
+            first = row.get('firstName', row.get('first_name', ''))
+            last = row.get('lastName', row.get('last_name', ''))
+            cyclists.append({
+                'id': row.get('id') or normalize_for_matching(f"{first} {last}"),
+                'firstName': first,
+                'lastName': last,
+                'teamName': row.get('teamName', row.get('team', '')),
+                'profileUrl': row.get('profileUrl', row.get('profile_url', '')),
+            })
+        return cls(cyclists)
+
+    def find(self, rider_name: str, rider_url: str = '', team_name: str = '') -> Optional[Dict]:
+        slug = rider_slug(rider_url)
+        if slug in self.by_slug:
+            return self.by_slug[slug]
+
+        name = normalize_for_matching(rider_name)
+        match = self.by_full_name.get(name) or self.by_last_first.get(name)
+        if match:
+            return match
+
+        for c in self.cyclists:
+            first, last = normalize_for_matching(c['firstName']), normalize_for_matching(c['lastName'])
+            if len(first) > 2 and len(last) > 2 and first in name and last in name:
+                return c
+
+        candidates = [c for last, group in self.by_last_name.items() if last in name for c in group]
+        if len(candidates) > 1 and team_name:
+            team = resolve_team(team_name)
+            candidates = [c for c in candidates if team and resolve_team(c['teamName']) == team]
+        return candidates[0] if len(candidates) == 1 else None
+
+
+def stage_number(stage_url: str) -> int:
+    """race/tour-de-france/2026/stage-3 -> 3; prólogo -> 0; corrida de um dia -> 1."""
+    match = re.search(r'stage-(\d+)', stage_url)
+    if match:
+        return int(match.group(1))
+    return 0 if 'prologue' in stage_url else 1
+
+
+def stage_type(stage: Dict[str, Any]) -> str:
+    """StageType da etapa a partir do stage_type e do perfil do PCS."""
+    pcs_type = (stage.get('stage_type') or '').upper()
+    if pcs_type in ('ITT', 'TTT'):
+        return pcs_type
+    if 'prologue' in (stage.get('stage_url') or '') or 'prologue' in (stage.get('stage_name') or '').lower():
+        return 'PROLOGUE'
+    return PROFILE_STAGE_TYPES.get(stage.get('profile_icon') or '', 'FLAT')
+
+
+def stage_final(stage: Optional[Dict[str, Any]], race_end: str = '',
+                now: Optional[float] = None) -> bool:
+    """
+    Os resultados da etapa já não mudam? Só quando já passou o dia seguinte
+    à data da etapa (ou ao fim da corrida, se a página não tiver data).
+    """
+    if not stage or not stage.get('results'):
+        return False
+    day = str(stage.get('date') or race_end or '')[:10]
+    try:
+        start = datetime.strptime(day, '%Y-%m-%d').timestamp()
+    except ValueError:
+        return False
+    return (time.time() if now is None else now) >= start + FINAL_AFTER
+
+
+def fetch_race(race_url: str) -> Dict[str, Any]:
+    from procyclingstats import Race
+    return Race(race_url).parse()
+
+
+def fetch_stage(stage_url: str) -> Dict[str, Any]:
+    from procyclingstats import Stage
+    data = Stage(stage_url).parse()
+    data['stage_url'] = stage_url
+    return data
+
+
+def stage_urls(race: Dict[str, Any], race_url: str) -> List[str]:
+    """URLs das etapas; corrida de um dia -> a página de resultados da corrida."""
+    stages = race.get('stages') or []
+    urls = [s['stage_url'] for s in stages if s.get('stage_url')]
+    return urls or [f"{race_url.rstrip('/')}/result"]
+
+
+def leaders(stage: Dict[str, Any]) -> Dict[str, str]:
+    """rider_url do 1.º de cada classificação -> coluna de camisola (só um por camisola)."""
+    holders = {}
+    for classification, column in JERSEY_CLASSIFICATIONS.items():
+        table = stage.get(classification) or []
+        first = next((r for r in table if str(r.get('rank')) == '1'), None)
+        if first:
+            holders.setdefault(first.get('rider_url') or first.get('rider_name'), []).append(column)
+    return holders
+
+
+def stage_rows(stage: Dict[str, Any], race_id: str, index: CyclistIndex, season: int,
+               timestamp: int) -> Tuple[List[Dict], List[str]]:
+    """Linhas StageResultEntity de uma etapa e os nomes que não foi possível ligar."""
+    number = stage_number(stage['stage_url'])
+    kind = stage_type(stage)
+    holders = leaders(stage)
+    rows, unmatched, seen = [], [], set()
+
+    for result in stage.get('results') or []:
+        cyclist = index.find(result.get('rider_name', ''), result.get('rider_url', ''),
+                             result.get('team_name', ''))
+        if cyclist is None:
+            unmatched.append(result.get('rider_name', ''))
+            continue
+        if cyclist['id'] in seen:
+            continue
+        seen.add(cyclist['id'])
+
+        status = (result.get('status') or FINISHED).upper()
+        rank = result.get('rank')
+        position = int(rank) if status == FINISHED and str(rank or '').isdigit() else None
+        jerseys = set(holders.get(result.get('rider_url') or result.get('rider_name'), []))
+        flags = {column: column in jerseys for column in JERSEY_CLASSIFICATIONS.values()}
+
+        rows.append({
+            'id': f"{race_id}_stage{number}_{cyclist['id']}",
+            'raceId': race_id,
+            'stageNumber': number,
+            'stageType': kind,
+            'cyclistId': cyclist['id'],
+            'position': position if position is not None else '',
+            'points': stage_points(position, kind) if position is not None else 0,
+            'jerseyBonus': jersey_bonus(flags['isGcLeader'], flags['isPointsLeader'],
+                                        flags['isMountainsLeader'], flags['isYoungLeader']),
+            **{column: str(value).lower() for column, value in flags.items()},
+            'time': result.get('time') or '',
+            'status': '' if status == FINISHED else status,
+            'timestamp': timestamp,
+            'season': season,
+        })
+    return rows, unmatched
+
+
+class ResultsIngester:
+    """Busca (com cache) e converte todas as etapas de uma corrida."""
+
+    def __init__(self, cache: Optional[PageCache] = None, workers: int = DEFAULT_WORKERS,
+                 race_fetcher: Callable[[str], Dict] = fetch_race,
+                 stage_fetcher: Callable[[str], Dict] = fetch_stage):
+        self.cache = cache if cache is not None else PageCache()
+        self.workers = workers
+        self.race_fetcher = race_fetcher
+        self.stage_fetcher = stage_fetcher
+        self.errors: Dict[str, str] = {}
+
+    def _stage(self, url: str, race_end: str = '') -> Optional[Dict]:
+        # Fechada: fica para sempre; provisória: volta a ser pedida passado PROVISIONAL_TTL
+        ttl = None if stage_final(self.cache.get(url), race_end) else PROVISIONAL_TTL
+        try:
+            return self.cache.get_or_fetch(url, lambda: self.stage_fetcher(url), ttl=ttl,
+                                           store=lambda stage: bool(stage and stage.get('results')))
+        except Exception as e:
+            self.errors[url] = f"{e.__class__.__name__}: {e}"
+            return None
+
+    def stages(self, race_url: str) -> List[Dict]:
+        # A lista de etapas pode mudar até à partida: só fica na cache por 1 dia
+        race = self.cache.get_or_fetch(race_url, lambda: self.race_fetcher(race_url), ttl=24 * 3600)
+        urls = stage_urls(race or {}, race_url)
+        fetch = partial(self._stage, race_end=(race or {}).get('enddate') or '')
+        if self.workers <= 1:
+            pages = [fetch(url) for url in urls]
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                pages = list(pool.map(fetch, urls))
+        return [page for page in pages if page]
+
+    def ingest(self, race_url: str, race_id: str, index: CyclistIndex,
+               season: int = SEASON) -> Tuple[List[Dict], List[str]]:
+        timestamp = int(time.time() * 1000)
+        rows, unmatched = [], []
+        for stage in self.stages(race_url):
+            stage_result, missing = stage_rows(stage, race_id, index, season, timestamp)
+            rows.extend(stage_result)
+            unmatched.extend(missing)
+        rows.sort(key=lambda r: (r['stageNumber'], r['position'] == '', r['position'] or 0))
+        return rows, unmatched
+
+
+def write_stage_results(filename: str, rows: List[Dict]):
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=STAGE_RESULT_FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def fake_race(n_stages: int, n_riders: int, latency: float):
+    """
+    Páginas sintéticas de uma grande volta a decorrer (a última etapa é a de
+    hoje, as outras uma por dia antes), com latência de rede simulada.
+    """
+    profiles = ['p1', 'p2', 'p3', 'p4', 'p5']
+    riders = [{'rider_name': f"RIDER{i:03d} Test", 'rider_url': f"rider/test-rider{i:03d}",
+               'team_name': 'UAE Team Emirates'} for i in range(n_riders)]
+
+    def race_fetcher(race_url):
+        time.sleep(latency)
+        return {'stages': [{'stage_url': f"{race_url}/stage-{s}"} for s in range(1, n_stages + 1)]}
+
+    def stage_fetcher(stage_url):
+        time.sleep(latency)
+        s = stage_number(stage_url)
+        date = time.strftime('%Y-%m-%d', time.localtime(time.time() - (n_stages - s) * 24 * 3600))
+        order = riders[s % n_riders:] + riders[:s % n_riders]
+        results = [dict(r, rank=k + 1, status='DF', time='4:01:02') for k, r in enumerate(order)]
+        results[-1].update(rank='DNF', status='DNF')
+        classification = [dict(r, rank=k + 1) for k, r in enumerate(order[:3])]
+        return {'stage_url': stage_url, 'date': date, 'stage_type': 'ITT' if s in (7, 21) else 'RR',
+                'profile_icon': profiles[s % 5], 'results': results,
+                'gc': classification, 'points': classification[1:], 'kom': classification,
+                'youth': classification[2:]}
+
+    return riders, race_fetcher, stage_fetcher
+
+
+def benchmark(n_stages: int = 21, n_riders: int = 176, latency: float = 0.5):
+    import tempfile
+    riders, race_fetcher, stage_fetcher = fake_race(n_stages, n_riders, latency)
+    index = CyclistIndex.from_rows([{'id': f"c{i}", 'firstName': 'Test', 'lastName': f"Rider{i:03d}",
+                                     'teamName': 'UAE Team Emirates'} for i in range(n_riders)])
+    race_url = 'race/grande-volta/2026'
+    print(f"{n_stages} etapas x {n_riders} ciclistas, {latency:.1f}s por página:")
+
+    results = {}
+    for label, workers in (('sequencial', 1), (f"{DEFAULT_WORKERS} threads", DEFAULT_WORKERS)):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            ingester = ResultsIngester(PageCache(cache_dir), workers, race_fetcher, stage_fetcher)
+            t0 = time.perf_counter()
+            rows, unmatched = ingester.ingest(race_url, 'race1', index)
+            elapsed = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            cached, _ = ingester.ingest(race_url, 'race1', index)
+            cached_time = time.perf_counter() - t0
+        print(f"  {label:<12} {elapsed:6.2f}s  (com cache: {cached_time * 1000:.0f} ms)")
+        results[label] = [{k: v for k, v in r.items() if k != 'timestamp'} for r in rows]
+        if unmatched or len(rows) != n_stages * n_riders:
+            raise AssertionError(f"{len(rows)} linhas, {len(unmatched)} sem ligação")
+        if [{k: v for k, v in r.items() if k != 'timestamp'} for r in cached] != results[label]:
+            raise AssertionError("Resultados da cache diferentes")
+
+    first, second = results.values()
+    if first != second:
+        raise AssertionError("Resultados sequenciais e paralelos diferentes")
+    print(f"  {len(first)} linhas iguais nos dois modos ✓")
+
+    # Passado PROVISIONAL_TTL só voltam a ser pedidas as etapas de hoje e de ontem
+    with tempfile.TemporaryDirectory() as cache_dir:
+        ingester = ResultsIngester(PageCache(cache_dir), DEFAULT_WORKERS, race_fetcher, stage_fetcher)
+        ingester.ingest(race_url, 'race1', index)
+        aged = time.time() - PROVISIONAL_TTL - 60
+        for name in os.listdir(cache_dir):
+            os.utime(os.path.join(cache_dir, name), (aged, aged))
+        misses = ingester.cache.misses
+        ingester.ingest(race_url, 'race1', index)
+        refetched = ingester.cache.misses - misses
+        if refetched != min(2, n_stages):
+            raise AssertionError(f"{refetched} etapas pedidas outra vez (esperadas {min(2, n_stages)})")
+    print(f"  Resultados provisórios voltam a ser pedidos ({refetched} etapas), os fechados não ✓")
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--bench':
+        benchmark(int(args[1]) if len(args) > 1 else 21)
+        return
+
+    options = {'--workers': DEFAULT_WORKERS, '--season': SEASON}
+    for option in options:
+        if option in args:
+            pos = args.index(option)
+            options[option] = int(args[pos + 1])
+            del args[pos:pos + 2]
+
+    if len(args) not in (3, 4):
+        print("Uso: python results_ingester.py race/tour-de-france/2026 raceId cyclists.csv "
+              "[stage_results.csv] [--workers 8] [--season 2026]")
+        print("     python results_ingester.py --bench [n_etapas]")
+        sys.exit(1)
+
+    race_url, race_id, cyclists_file = args[:3]
+    output_file = args[3] if len(args) > 3 else 'stage_results.csv'
+
+    index = CyclistIndex.from_rows(read_rows(cyclists_file))
+    ingester = ResultsIngester(workers=options['--workers'])
+    t0 = time.perf_counter()
+    rows, unmatched = ingester.ingest(race_url, race_id, index, options['--season'])
+    elapsed = time.perf_counter() - t0
+
+    write_stage_results(output_file, rows)
+    stages = len({r['stageNumber'] for r in rows})
+    print(f"✓ {len(rows)} resultados de {stages} etapas em {output_file} ({elapsed:.1f}s, "
+          f"cache: {ingester.cache.hits} páginas, PCS: {ingester.cache.misses})")
+    for url, error in ingester.errors.items():
+        print(f"  ✗ {url}: {error}")
+    if unmatched:
+        names = sorted(set(unmatched))
+        print(f"\n{len(names)} ciclistas sem correspondência na app:")
+        for name in names[:20]:
+            print(f"  - {name}")
+
+
+if __name__ == '__main__':
+    main()
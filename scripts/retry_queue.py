@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Fila de falhas (dead-letter queue) para ciclistas que não foi possível buscar.
+
+Quando `fetch_rider_data` ou `extract_rider` falham, o ciclista é registado
+em failed_riders.json com a classe do erro. O modo `--retry-failed` dos
+scripts volta a buscar apenas essas entradas e corrige o CSV de saída
+existente, em vez de correr o plantel todo outra vez.
+
+Formato de cada entrada:
+    {
+        "source": "enrich_cyclists",
+        "key": "rider/tadej-pogacar",
+        "output": "cyclists_enriched.csv",
+        "error_class": "ConnectionError",
+        "error": "...",
+        "attempts": 2,
+        "first_failed": "2026-02-04T10:00:00",
+        "last_failed": "2026-02-04T11:00:00",
+        "context": {"name": "...", "team": "...", "ranking": 1}
+    }
+"""
+
+import csv
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_QUEUE_FILE = 'failed_riders.json'
+
+
+class RetryQueue:
+    """Fila persistente de ciclistas falhados, indexada por (source, key)."""
+
+    def __init__(self, path: str = DEFAULT_QUEUE_FILE):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for entry in json.load(f):
+                    self.entries[self._id(entry['source'], entry['key'])] = entry
+
+    @staticmethod
+    def _id(source: str, key: str) -> str:
+        return f"{source}:{key}"
+
+    def add(self, source: str, key: str, error: BaseException,
+            output: str = '', **context: Any):
+        """Regista (ou atualiza) uma falha com a classe do erro."""
+        now = datetime.now().isoformat(timespec='seconds')
+        entry_id = self._id(source, key)
+        entry = self.entries.get(entry_id)
+        if entry is None:
+            entry = {
+                'source': source,
+                'key': key,
+                'output': output,
+                'attempts': 0,
+                'first_failed': now,
+                'context': {},
+            }
+            self.entries[entry_id] = entry
+        if output:
+            entry['output'] = output
+        entry['error_class'] = type(error).__name__
+        entry['error'] = str(error)
+        entry['attempts'] += 1
+        entry['last_failed'] = now
+        entry['context'].update(context)
+
+    def resolve(self, source: str, key: str):
+        """Remove uma entrada depois de uma nova tentativa bem sucedida."""
+        self.entries.pop(self._id(source, key), None)
+
+    def pending(self, source: str, output: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Entradas por resolver de um script (e opcionalmente de um ficheiro de saída)."""
+        return [
+            e for e in self.entries.values()
+            if e['source'] == source and (output is None or e['output'] == output)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def save(self):
+        """Grava a fila de forma atómica (ou apaga o ficheiro se ficar vazia)."""
+        if not self.entries:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(list(self.entries.values()), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def patch_csv(filename: str, fieldnames: List[str], rows: Iterable[Dict[str, Any]],
+              key_fields: Iterable[str] = ('first_name', 'last_name'),
+              header: bool = True) -> int:
+    """
+    Corrige linhas de um CSV existente sem reprocessar o resto.
+
+    Linhas com a mesma chave (por omissão first_name + last_name) são
+    substituídas no mesmo sítio; as restantes são acrescentadas no fim.
+    Retorna o número de linhas corrigidas ou acrescentadas.
+    """
+    key_fields = tuple(key_fields)
+    existing: List[Dict[str, Any]] = []
+    if os.path.exists(filename):
+        with open(filename, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f, fieldnames=None if header else fieldnames)
+            existing = list(reader)
+
+    def row_key(row: Dict[str, Any]) -> tuple:
+        return tuple(str(row.get(k) or '').strip().lower() for k in key_fields)
+
+    positions = {row_key(row): i for i, row in enumerate(existing)}
+    patched = 0
+    for row in rows:
+        key = row_key(row)
+        if key in positions:
+            existing[positions[key]].update(row)
+        else:
+            positions[key] = len(existing)
+            existing.append(dict(row))
+        patched += 1
+
+    tmp_path = f"{filename}.tmp"
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+        if header:
+            writer.writeheader()
+        for row in existing:
+            writer.writerow(row)
+    os.replace(tmp_path, filename)
+    return patched
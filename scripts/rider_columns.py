@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Exportação em colunas (Parquet ou Arrow IPC) dos CSV de ciclistas.
+
+Para análises carregamos os CSV de nove colunas (worldtour_2026_complete.csv,
+ciclistas_final.csv) linha a linha com csv.DictReader. Este script escreve
+o mesmo esquema em colunas tipadas:
+
+- age int16, uci_ranking int32 (nulos onde o CSV está vazio), price float64;
+- team, nationality, speciality e category com dictionary encoding (cada
+  nome de equipa é guardado uma vez, as linhas só têm o índice);
+- aceita CSV com ou sem cabeçalho (como o clean_wiki_data.py escreve o
+  worldtour_2026_complete.csv); sem cabeçalho, a primeira linha tem de ter
+  nove colunas (ou dez, com profile_url);
+- .parquet (comprimido, para guardar/partilhar) ou .arrow (Arrow IPC sem
+  compressão, que o load abre com memory map sem copiar os dados);
+- load(caminho, columns=[...]) lê só as colunas pedidas; read_records dá
+  RiderRecord para os outros passos do pipeline.
+
+Uso:
+    pip install pyarrow
+    python rider_columns.py worldtour_2026_complete.csv [saida.parquet|saida.arrow]
+    python rider_columns.py --bench [n_linhas]
+"""
+
+import csv
+import os
+import sys
+import time
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    print("A instalar dependências...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "pyarrow"])
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+
+from rider_record import FIELDNAMES, FIELDNAMES_WITH_URL, RiderRecord, read_csv, write_csv
+from rider_stream import has_header
+
+DICTIONARY = pa.dictionary(pa.int16(), pa.string())
+
+# Esquema de nove colunas (+ profile_url), com tipos
+COLUMN_TYPES = {
+    'first_name': pa.string(),
+    'last_name': pa.string(),
+    'team': DICTIONARY,
+    'nationality': DICTIONARY,
+    'age': pa.int16(),
+    'uci_ranking': pa.int32(),
+    'speciality': DICTIONARY,
+    'price': pa.float64(),
+    'category': DICTIONARY,
+    'profile_url': pa.string(),
+}
+
+FORMATS = ('.parquet', '.arrow')
+
+
+def schema_for(fieldnames: Sequence[str] = FIELDNAMES) -> pa.Schema:
+    return pa.schema([pa.field(name, COLUMN_TYPES[name]) for name in fieldnames])
+
+
+def columns_path(csv_file: str, ext: str = '.parquet') -> str:
+    """cyclists.csv -> cyclists.parquet"""
+    return os.path.splitext(csv_file)[0] + ext
+
+
+def to_table(records: Iterable[RiderRecord], fieldnames: Sequence[str] = FIELDNAMES) -> pa.Table:
+    """Tabela Arrow a partir de RiderRecord (uma lista por coluna)."""
+    columns = {name: [] for name in fieldnames}
+    for record in records:
+        for name, values in columns.items():
+            values.append(getattr(record, name))
+    arrays = []
+    for name in fieldnames:
+        kind = COLUMN_TYPES[name]
+        if pa.types.is_dictionary(kind):
+            arrays.append(pa.array(columns[name], pa.string()).dictionary_encode().cast(kind))
+        else:
+            arrays.append(pa.array(columns[name], kind))
+    return pa.Table.from_arrays(arrays, schema=schema_for(fieldnames))
+
+
+def write_table(path: str, table: pa.Table):
+    """Escreve .parquet (zstd, dicionários) ou .arrow (IPC sem compressão, para memory map)."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.parquet':
+        pq.write_table(table, path, compression='zstd', use_dictionary=True)
+    elif ext == '.arrow':
+        with pa.OSFile(path, 'wb') as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise ValueError(f"Formato desconhecido '{ext}' (usar {' ou '.join(FORMATS)})")
+
+
+def csv_layout(csv_file: str) -> tuple:
+    """
+    (tem cabeçalho, colunas) de um CSV de ciclistas. Sem cabeçalho, o número
+    de colunas da primeira linha decide se há profile_url; outro número é erro.
+    """
+    with open(csv_file, encoding='utf-8', newline='') as f:
+        first = next(csv.reader(f), [])
+    if has_header(csv_file):
+        return True, FIELDNAMES_WITH_URL if 'profile_url' in first else FIELDNAMES
+    for fieldnames in (FIELDNAMES, FIELDNAMES_WITH_URL):
+        if len(first) == len(fieldnames):
+            return False, fieldnames
+    raise ValueError(f"{csv_file}: sem cabeçalho e a primeira linha tem {len(first)} colunas "
+                     f"(esperadas {len(FIELDNAMES)} ou {len(FIELDNAMES_WITH_URL)})")
+
+
+def export_csv(csv_file: str, path: Optional[str] = None) -> str:
+    """Converte um CSV de ciclistas (com ou sem cabeçalho/profile_url). Retorna o caminho escrito."""
+    header, fieldnames = csv_layout(csv_file)
+    path = path or columns_path(csv_file)
+    write_table(path, to_table(read_csv(csv_file, header=header, fieldnames=fieldnames), fieldnames))
+    return path
+
+
+def load(path: str, columns: Optional[List[str]] = None) -> pa.Table:
+    """
+    Lê só as colunas pedidas. O .arrow é aberto com memory map (as colunas
+    não pedidas nem chegam a ser lidas do disco); o .parquet lê só os seus
+    column chunks.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.parquet':
+        return pq.read_table(path, columns=columns, memory_map=True)
+    if ext == '.arrow':
+        table = ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        return table.select(columns) if columns else table
+    raise ValueError(f"Formato desconhecido '{ext}' (usar {' ou '.join(FORMATS)})")
+
+
+def read_records(path: str) -> Iterator[RiderRecord]:
+    """RiderRecord a partir do ficheiro em colunas (o mesmo que rider_record.read_csv)."""
+    table = load(path)
+    for row in table.to_pylist():
+        yield RiderRecord(**{k: v for k, v in row.items() if v is not None})
+
+
+def mean_price_by_team(table: pa.Table) -> dict:
+    """Exemplo de análise: preço médio por equipa, só com as colunas team e price."""
+    grouped = table.group_by('team').aggregate([('price', 'mean')])
+    return dict(zip(grouped['team'].to_pylist(), grouped['price_mean'].to_pylist()))
+
+
+def bench_csv(rows: int, folder: str) -> str:
+    """CSV grande a partir do worldtour_2026_complete.csv repetido."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    source = list(read_csv(os.path.join(here, 'worldtour_2026_complete.csv')))
+    path = os.path.join(folder, 'riders.csv')
+    write_csv(path, (source[i % len(source)] for i in range(rows)))
+    return path
+
+
+def benchmark(rows: int = 200000):
+    import tempfile
+    with tempfile.TemporaryDirectory() as folder:
+        csv_file = bench_csv(rows, folder)
+        print(f"{rows} ciclistas ({os.path.getsize(csv_file) / 1e6:.1f} MB em CSV):")
+
+        t0 = time.perf_counter()
+        totals = {}
+        with open(csv_file, encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                total, count = totals.get(row['team'], (0.0, 0))
+                totals[row['team']] = (total + float(row['price']), count + 1)
+        expected = {team: total / count for team, (total, count) in totals.items()}
+        csv_time = time.perf_counter() - t0
+
+        for ext in FORMATS:
+            t0 = time.perf_counter()
+            path = export_csv(csv_file, os.path.join(folder, 'riders' + ext))
+            export_time = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            means = mean_price_by_team(load(path, ['team', 'price']))
+            load_time = time.perf_counter() - t0
+            if means.keys() != expected.keys() or any(abs(means[t] - expected[t]) > 1e-9 for t in means):
+                raise AssertionError(f"{ext}: preço médio por equipa diferente do CSV")
+            print(f"  {ext:<8} {os.path.getsize(path) / 1e6:5.1f} MB  exportar {export_time:5.2f}s  "
+                  f"team+price {load_time * 1000:6.1f} ms  (DictReader {csv_time * 1000:.0f} ms, "
+                  f"{csv_time / load_time:.0f}x) ✓")
+
+        sample = list(read_csv(csv_file))[:500]
+        if list(read_records(os.path.join(folder, 'riders.arrow')))[:500] != sample:
+            raise AssertionError("read_records diferente de read_csv")
+        print("  read_records igual ao read_csv ✓")
+
+        # CSV sem cabeçalho, como o worldtour_2026_complete.csv do clean_wiki_data.py
+        headerless = os.path.join(folder, 'headerless.csv')
+        write_csv(headerless, sample, header=False)
+        path = export_csv(headerless, os.path.join(folder, 'headerless.arrow'))
+        if list(read_records(path)) != sample:
+            raise AssertionError("CSV sem cabeçalho exportado com colunas erradas")
+        with open(headerless, 'w', encoding='utf-8') as f:
+            f.write("Tadej,Pogačar,UAE\n")
+        try:
+            export_csv(headerless, path)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Primeira linha com 3 colunas aceite")
+        print("  CSV sem cabeçalho exportado igual, colunas a mais/menos recusadas ✓")
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--bench':
+        benchmark(int(args[1]) if len(args) > 1 else 200000)
+        return
+    if not args or len(args) > 2 or args[0].startswith('--'):
+        print("Uso: python rider_columns.py ciclistas.csv [saida.parquet|saida.arrow]")
+        print("     python rider_columns.py --bench [n_linhas]")
+        sys.exit(1)
+
+    try:
+        path = export_csv(args[0], args[1] if len(args) > 1 else None)
+    except ValueError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+    table = load(path)
+    print(f"✓ {table.num_rows} ciclistas em {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+    for field in table.schema:
+        print(f"  {field.name:<12} {field.type}")
+
+
+if __name__ == '__main__':
+    main()
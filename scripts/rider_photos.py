@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Fotos dos ciclistas: descarregar, reduzir e publicar só o que mudou.
+
+Hoje o CyclistPhotoStorageService.uploadCyclistPhoto envia as fotos uma a
+uma a partir do telemóvel do admin, no tamanho em que chegam. Este script:
+
+- lê a lista de fotos escrita pelo enrich_cyclists.py ao lado do CSV
+  (<saida>_photos.csv: rider, photo_id, url) e descarrega-as em paralelo
+  (thread pool);
+- identifica cada foto pelo SHA-256 do conteúdo: fotos iguais (ex: a
+  silhueta do PCS para quem não tem foto) só são processadas uma vez, e uma
+  foto que não mudou desde a última execução não é processada nem enviada;
+- gera miniaturas WebP em tamanhos fixos (SIZES, recorte quadrado centrado
+  na cara) num process pool, com nome pelo hash (<hash>_<tamanho>.webp);
+- escreve o manifest.json na pasta de saída (ciclista -> hash e ficheiros)
+  e em upload.txt os ficheiros ainda por enviar para cyclists/photos no
+  Storage; depois de os enviar, --mark-uploaded regista-os no manifest
+  (até lá continuam na lista, execução após execução);
+- uma foto que não se consegue abrir (ex: página de erro HTML servida com
+  200, JPEG cortado) fica nos erros como um download falhado e o ciclista
+  mantém a foto anterior.
+
+Uso:
+    pip install requests pillow
+    python rider_photos.py cyclists_photos.csv [pasta_fotos] [--workers 8]
+    python rider_photos.py --mark-uploaded [pasta_fotos]
+    python rider_photos.py --bench [n_fotos]
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urljoin
+
+try:
+    import requests
+    from PIL import Image, ImageOps
+except ImportError:
+    print("A instalar dependências...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "requests", "pillow"])
+    import requests
+    from PIL import Image, ImageOps
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+}
+
+PCS_BASE = 'https://www.procyclingstats.com/'
+DEFAULT_DIR = 'rider_photos'
+MANIFEST = 'manifest.json'
+UPLOAD_LIST = 'upload.txt'
+DEFAULT_WORKERS = 8
+
+# Lado (px) de cada miniatura: lista da equipa e ficha do ciclista
+SIZES = (96, 320)
+WEBP_QUALITY = 80
+# Recorte quadrado um pouco acima do centro, onde fica a cara nos retratos
+CROP_CENTER = (0.5, 0.3)
+
+PHOTO_FIELDNAMES = ['rider', 'photo_id', 'url']
+
+
+def photo_id(name: str) -> str:
+    """'Tadej Pogačar' -> 'tadej-pogacar' (o identificador do uploadPhotosInBatch)."""
+    text = unicodedata.normalize('NFD', name or '')
+    text = ''.join(c for c in text if unicodedata.category(c) != 'Mn')
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+def photos_path(output_file: str) -> str:
+    """cyclists.csv -> cyclists_photos.csv"""
+    base, ext = os.path.splitext(output_file)
+    return f"{base}_photos{ext or '.csv'}"
+
+
+def write_photo_list(output_file: str, riders: Sequence[Tuple[str, str]]) -> str:
+    """Escreve a lista (nome, URL da foto) ao lado do CSV de ciclistas. Retorna o caminho."""
+    path = photos_path(output_file)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=PHOTO_FIELDNAMES)
+        writer.writeheader()
+        for name, url in riders:
+            if url:
+                writer.writerow({'rider': name, 'photo_id': photo_id(name), 'url': urljoin(PCS_BASE, url)})
+    return path
+
+
+def read_photo_list(filename: str) -> List[Dict[str, str]]:
+    with open(filename, encoding='utf-8') as f:
+        return [row for row in csv.DictReader(f) if row.get('url')]
+
+
+def fetch_bytes(url: str) -> bytes:
+    response = requests.get(url, headers=HEADERS, timeout=20)
+    response.raise_for_status()
+    return response.content
+
+
+def thumbnails(data: bytes, digest: str, folder: str, sizes: Sequence[int] = SIZES) -> Dict[str, str]:
+    """
+    Miniaturas WebP de uma foto (corre nos processos do pool).
+    Retorna {tamanho: nome do ficheiro}; ficheiros que já existem não são refeitos.
+    """
+    names = {str(size): f"{digest[:16]}_{size}.webp" for size in sizes}
+    if all(os.path.exists(os.path.join(folder, n)) for n in names.values()):
+        return names
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        for size in sizes:
+            thumb = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS, centering=CROP_CENTER)
+            tmp = os.path.join(folder, names[str(size)] + '.tmp')
+            thumb.save(tmp, 'WEBP', quality=WEBP_QUALITY, method=4)
+            os.replace(tmp, os.path.join(folder, names[str(size)]))
+    return names
+
+
+def _thumbnails_job(args: Tuple[bytes, str, str, Tuple[int, ...]]) -> Tuple[str, Dict[str, str], str]:
+    """(hash, ficheiros, erro): uma foto que não abre não pode parar o pool inteiro."""
+    data, digest, folder, sizes = args
+    try:
+        return digest, thumbnails(data, digest, folder, sizes), ''
+    except Exception as e:
+        return digest, {}, f"{e.__class__.__name__}: {e}"
+
+
+def load_manifest(folder: str) -> Dict:
+    try:
+        with open(os.path.join(folder, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'sizes': list(SIZES), 'riders': {}, 'uploaded': []}
+
+
+def save_manifest(folder: str, manifest: Dict):
+    tmp = os.path.join(folder, MANIFEST + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(folder, MANIFEST))
+
+
+def write_upload_list(folder: str, files: Sequence[str]):
+    """upload.txt: um ficheiro por linha, ainda por enviar para cyclists/photos."""
+    with open(os.path.join(folder, UPLOAD_LIST), 'w', encoding='utf-8') as f:
+        f.writelines(f"{name}\n" for name in files)
+
+
+class PhotoPipeline:
+    """Descarrega (threads), reduz (processos) e compara com o manifest anterior."""
+
+    def __init__(self, folder: str = DEFAULT_DIR, workers: int = DEFAULT_WORKERS,
+                 processes: Optional[int] = None, fetcher: Callable[[str], bytes] = fetch_bytes,
+                 sizes: Sequence[int] = SIZES):
+        self.folder = folder
+        self.workers = workers
+        self.processes = processes
+        self.fetcher = fetcher
+        self.sizes = tuple(sizes)
+        self.errors: Dict[str, str] = {}
+        os.makedirs(folder, exist_ok=True)
+
+    def _download(self, row: Dict[str, str]) -> Optional[bytes]:
+        try:
+            return self.fetcher(row['url'])
+        except Exception as e:
+            self.errors[row['photo_id']] = f"{e.__class__.__name__}: {e}"
+            return None
+
+    def download(self, rows: List[Dict[str, str]]) -> List[Optional[bytes]]:
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(rows)))) as pool:
+            return list(pool.map(self._download, rows))
+
+    def render(self, photos: Dict[str, bytes]) -> Tuple[Dict[str, Dict[str, str]], Dict[str, str]]:
+        """
+        Miniaturas de cada conteúdo distinto ({hash: bytes}), em paralelo por processos.
+        Retorna ({hash: ficheiros}, {hash: erro} das fotos que não se conseguiram abrir).
+        """
+        jobs = [(data, digest, self.folder, self.sizes) for digest, data in photos.items()]
+        if self.processes == 1 or len(jobs) < 2:
+            results = list(map(_thumbnails_job, jobs))
+        else:
+            with ProcessPoolExecutor(max_workers=self.processes) as pool:
+                results = list(pool.map(_thumbnails_job, jobs, chunksize=max(1, len(jobs) // 32)))
+        rendered = {digest: names for digest, names, error in results if not error}
+        failed = {digest: error for digest, _, error in results if error}
+        return rendered, failed
+
+    def mark_uploaded(self) -> int:
+        """Regista no manifest que os ficheiros do upload.txt já foram enviados. Retorna quantos."""
+        manifest = load_manifest(self.folder)
+        files = {name for entry in manifest['riders'].values() for name in entry['files'].values()}
+        uploaded = set(manifest.get('uploaded', []))
+        marked = len(files - uploaded)
+        manifest['uploaded'] = sorted(uploaded | files)
+        save_manifest(self.folder, manifest)
+        write_upload_list(self.folder, [])
+        return marked
+
+    def run(self, rows: List[Dict[str, str]]) -> Dict[str, object]:
+        previous = load_manifest(self.folder)
+        same_sizes = previous.get('sizes') == list(self.sizes)
+        old_riders: Dict[str, Dict] = previous.get('riders', {}) if same_sizes else {}
+        # Só conta como enviado o que foi marcado com --mark-uploaded
+        uploaded = set(previous.get('uploaded', [])) if same_sizes else set()
+
+        contents = self.download(rows)
+        riders: Dict[str, Dict] = {}
+        pending: Dict[str, bytes] = {}
+        unchanged = 0
+        for row, data in zip(rows, contents):
+            key = row['photo_id']
+            if data is None:
+                # Falhou o download: mantém a foto anterior, se houver
+                if key in old_riders:
+                    riders[key] = old_riders[key]
+                continue
+            digest = hashlib.sha256(data).hexdigest()
+            old = old_riders.get(key)
+            if old is not None and old['sha256'] == digest:
+                riders[key] = dict(old, url=row['url'])
+                unchanged += 1
+                continue
+            riders[key] = {'rider': row['rider'], 'url': row['url'], 'sha256': digest, 'files': {}}
+            pending.setdefault(digest, data)
+
+        rendered, failed = self.render(pending)
+        for key, entry in list(riders.items()):
+            if entry['files']:
+                continue
+            if entry['sha256'] in failed:
+                # Não abriu: conta como falha e mantém a foto anterior, se houver
+                self.errors[key] = failed[entry['sha256']]
+                if key in old_riders:
+                    riders[key] = old_riders[key]
+                else:
+                    del riders[key]
+                continue
+            entry['files'] = rendered.get(entry['sha256'], {})
+        riders = {k: v for k, v in riders.items() if v['files']}
+
+        files = sorted({name for entry in riders.values() for name in entry['files'].values()})
+        new_files = [name for name in files if name not in uploaded]
+        save_manifest(self.folder, {'sizes': list(self.sizes), 'riders': riders,
+                                    'uploaded': sorted(uploaded)})
+        write_upload_list(self.folder, new_files)
+        return {
+            'riders': len(riders), 'unchanged': unchanged, 'distinct': len(pending) - len(failed),
+            'duplicates': sum(1 for d in contents if d is not None) - unchanged - len(pending),
+            'files': files, 'upload': new_files,
+        }
+
+
+def fake_photos(n: int, distinct: int, seed: int = 11) -> Tuple[List[Dict[str, str]], Dict[str, bytes]]:
+    """Retratos JPEG sintéticos (600x800) com fotos repetidas entre ciclistas."""
+    import random
+    rng = random.Random(seed)
+    images = {}
+    for k in range(distinct):
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        image = Image.new('RGB', (600, 800), color)
+        image.paste((255 - color[0], color[1], 255 - color[2]), (200, 150, 400, 400))
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=90)
+        images[f"https://fotos.pt/{k}.jpg"] = buffer.getvalue()
+    urls = list(images)
+    rows = [{'rider': f"Ciclista {i}", 'photo_id': photo_id(f"Ciclista {i}"), 'url': urls[i % distinct]}
+            for i in range(n)]
+    return rows, images
+
+
+def benchmark(n: int = 200, latency: float = 0.05):
+    import tempfile
+    rows, images = fake_photos(n, max(1, n // 4))
+
+    def fetcher(url: str) -> bytes:
+        time.sleep(latency)
+        return images[url]
+
+    print(f"{n} ciclistas, {len(images)} fotos diferentes, {latency * 1000:.0f} ms por download:")
+    outputs = []
+    for label, workers, processes in (('sequencial', 1, 1), ('paralelo', DEFAULT_WORKERS, None)):
+        with tempfile.TemporaryDirectory() as folder:
+            pipeline = PhotoPipeline(folder, workers, processes, fetcher)
+            t0 = time.perf_counter()
+            first = pipeline.run(rows)
+            elapsed = time.perf_counter() - t0
+            again = pipeline.run(rows)
+            pipeline.mark_uploaded()
+            second = pipeline.run(rows)
+            sizes = sum(os.path.getsize(os.path.join(folder, name)) for name in first['files'])
+            with open(os.path.join(folder, MANIFEST), encoding='utf-8') as f:
+                outputs.append(json.load(f))
+        print(f"  {label:<11} {elapsed:6.2f}s  {len(first['upload'])} ficheiros a enviar "
+              f"({sizes / 1024:.0f} KB vs {sum(map(len, images.values())) / 1024:.0f} KB originais)")
+        if first['distinct'] != len(images) or first['duplicates'] != n - len(images):
+            raise AssertionError(f"Repetidos mal contados: {first}")
+        if again['upload'] != first['upload']:
+            raise AssertionError("Sem --mark-uploaded os ficheiros deviam continuar por enviar")
+        if second['upload'] or second['unchanged'] != n:
+            raise AssertionError(f"Depois de marcar devia estar tudo igual: {second['upload'][:3]}")
+    if outputs[0] != outputs[1]:
+        raise AssertionError("Manifests sequencial e paralelo diferentes")
+    print("  manifests iguais, nada para enviar só depois de --mark-uploaded ✓")
+
+    # Uma foto que não abre (página HTML servida com 200) não pode parar a execução
+    broken = dict(images)
+    broken[rows[0]['url']] = b'<html><body>Erro</body></html>'
+    with tempfile.TemporaryDirectory() as folder:
+        PhotoPipeline(folder, fetcher=images.__getitem__).run(rows[:8])
+        before = load_manifest(folder)['riders']
+        pipeline = PhotoPipeline(folder, fetcher=broken.__getitem__)
+        rows_new = rows[:8] + [dict(rows[0], rider='Novo', photo_id='novo')]
+        result = pipeline.run(rows_new)
+        after = load_manifest(folder)['riders']
+    if (result['riders'] != 8 or sorted(pipeline.errors) != [rows[0]['photo_id'], 'novo']
+            or after != before):
+        raise AssertionError(f"Foto inválida mal tratada: {pipeline.errors}")
+    print("  foto inválida registada como erro, foto anterior mantida ✓")
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--bench':
+        benchmark(int(args[1]) if len(args) > 1 else 200)
+        return
+
+    workers = DEFAULT_WORKERS
+    if '--workers' in args:
+        pos = args.index('--workers')
+        workers = int(args[pos + 1])
+        del args[pos:pos + 2]
+
+    if args and args[0] == '--mark-uploaded' and len(args) <= 2:
+        pipeline = PhotoPipeline(args[1] if len(args) > 1 else DEFAULT_DIR)
+        print(f"✓ {pipeline.mark_uploaded()} ficheiros marcados como enviados")
+        return
+
+    if not args or len(args) > 2 or args[0].startswith('--'):
+        print("Uso: python rider_photos.py cyclists_photos.csv [pasta_fotos] [--workers 8]")
+        print("     python rider_photos.py --mark-uploaded [pasta_fotos]")
+        print("     python rider_photos.py --bench [n_fotos]")
+        sys.exit(1)
+
+    rows = read_photo_list(args[0])
+    pipeline = PhotoPipeline(args[1] if len(args) > 1 else DEFAULT_DIR, workers)
+    t0 = time.perf_counter()
+    result = pipeline.run(rows)
+    elapsed = time.perf_counter() - t0
+
+    for key, error in sorted(pipeline.errors.items()):
+        print(f"  ✗ {key}: {error}")
+    print(f"✓ {result['riders']} ciclistas com foto: {result['unchanged']} sem alterações, "
+          f"{result['distinct']} fotos novas, {result['duplicates']} repetidas ({elapsed:.1f}s)")
+    print(f"  {len(result['upload'])} ficheiros por enviar para cyclists/photos em "
+          f"{os.path.join(pipeline.folder, UPLOAD_LIST)}; manifest em {os.path.join(pipeline.folder, MANIFEST)}")
+    if result['upload']:
+        print(f"  Depois de enviar: python rider_photos.py --mark-uploaded {pipeline.folder}")
+
+
+if __name__ == '__main__':
+    main()
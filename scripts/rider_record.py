@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Registo compacto de ciclista partilhado por todos os scripts.
+
+Substitui os dicionários soltos com o esquema de nove colunas
+(first_name, last_name, team, nationality, age, uci_ranking, speciality,
+price, category) por uma classe com __slots__:
+
+- team é resolvida para o nome canónico (team_index) e, tal como
+  nationality, speciality e category, internada (sys.intern), por isso
+  100k ciclistas partilham umas dezenas de strings;
+- age e uci_ranking são int (ou None), price é float.
+
+Ver bench_rider_memory.py para a comparação de memória com os dicionários.
+
+read_rows e as_bool leem os outros CSV exportados da app (demand, races,
+...) sem precisar das dependências do scoring_engine.py.
+"""
+
+import csv
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from team_index import canonical_team
+
+# Esquema de nove colunas que a app importa (Admin Sync > Importar CSV)
+FIELDNAMES = ['first_name', 'last_name', 'team', 'nationality', 'age',
+              'uci_ranking', 'speciality', 'price', 'category']
+
+# Variante com o link do perfil (ex: ciclistas_final.csv)
+FIELDNAMES_WITH_URL = FIELDNAMES + ['profile_url']
+
+DEFAULT_PRICE = 5.0
+DEFAULT_CATEGORY = 'ROULEUR'
+
+_INTERNED = ('nationality', 'speciality', 'category')
+
+
+def _to_int(value: Any) -> Optional[int]:
+    """Converte '12', 12, '12.0' para int; vazio ou inválido dá None."""
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return None
+
+
+def _to_float(value: Any, default: float = DEFAULT_PRICE) -> float:
+    if value is None or value == '':
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _to_str(value: Any) -> str:
+    return '' if value is None else str(value).strip()
+
+
+class RiderRecord:
+    """Um ciclista no esquema de nove colunas (+ profile_url opcional)."""
+
+    __slots__ = ('first_name', 'last_name', 'team', 'nationality', 'age',
+                 'uci_ranking', 'speciality', 'price', 'category', 'profile_url')
+
+    def __init__(self, first_name: str = '', last_name: str = '', team: str = '',
+                 nationality: str = '', age: Any = None, uci_ranking: Any = None,
+                 speciality: str = '', price: Any = DEFAULT_PRICE,
+                 category: str = DEFAULT_CATEGORY, profile_url: str = ''):
+        self.first_name = _to_str(first_name)
+        self.last_name = _to_str(last_name)
+        self.age = None
+        self.uci_ranking = None
+        self.profile_url = _to_str(profile_url)
+        self.update(team=team, nationality=nationality, age=age, uci_ranking=uci_ranking,
+                    speciality=speciality, price=price, category=category)
+
+    @classmethod
+    def from_name(cls, name: str, **fields: Any) -> 'RiderRecord':
+        """Cria um registo a partir do nome completo ("Primeiro Resto do nome")."""
+        name_parts = _to_str(name).split(' ', 1)
+        first_name = name_parts[0] if name_parts else ''
+        last_name = name_parts[1] if len(name_parts) > 1 else ''
+        return cls(first_name, last_name, **fields)
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> 'RiderRecord':
+        """Cria um registo a partir de uma linha de csv.DictReader."""
+        return cls(**{k: v for k, v in row.items() if k in cls.__slots__ and v is not None})
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.first_name} {self.last_name}".strip()
+
+    def update(self, **fields: Any):
+        """Atualiza campos, convertendo tipos e internando as strings repetidas."""
+        for key, value in fields.items():
+            if key == 'age':
+                self.age = _to_int(value)
+            elif key == 'uci_ranking':
+                self.uci_ranking = _to_int(value)
+            elif key == 'price':
+                self.price = _to_float(value)
+            elif key == 'team':
+                self.team = sys.intern(canonical_team(_to_str(value)))
+            elif key in _INTERNED:
+                setattr(self, key, sys.intern(_to_str(value)))
+            elif key in self.__slots__:
+                setattr(self, key, _to_str(value))
+            else:
+                raise AttributeError(f"RiderRecord não tem o campo '{key}'")
+
+    def to_row(self, fieldnames: Iterable[str] = FIELDNAMES) -> Dict[str, Any]:
+        """Linha para csv.DictWriter (None passa a string vazia)."""
+        row = {}
+        for field in fieldnames:
+            value = getattr(self, field)
+            row[field] = '' if value is None else value
+        return row
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RiderRecord):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    # Sem hash de propósito: update() muda os campos que o __eq__ compara, e um
+    # hash a partir deles deixaria o ciclista perdido num set/dict depois de
+    # atualizado. Para sets ou chaves de dict usar um id (full_name, profile_url).
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (f"RiderRecord({self.full_name!r}, team={self.team!r}, "
+                f"category={self.category!r}, price={self.price!r})")
+
+
+def read_rows(filename: str) -> List[Dict[str, str]]:
+    """Todas as linhas de um CSV com cabeçalho, como dicts."""
+    with open(filename, 'r', encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def as_bool(value) -> bool:
+    """Booleanos vindos de CSV/JSON ('true', '1', True...)."""
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('true', '1', 'yes', 'sim')
+
+
+def read_csv(filename: str, header: bool = True,
+             fieldnames: List[str] = FIELDNAMES) -> Iterator[RiderRecord]:
+    """Lê ciclistas de um CSV (com ou sem cabeçalho) um de cada vez."""
+    with open(filename, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f, fieldnames=None if header else fieldnames)
+        for row in reader:
+            yield RiderRecord.from_row(row)
+
+
+def write_csv(filename: str, records: Iterable[RiderRecord], header: bool = True,
+              fieldnames: List[str] = FIELDNAMES) -> int:
+    """Escreve ciclistas num CSV. Retorna o número de linhas escritas."""
+    count = 0
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        if header:
+            writer.writeheader()
+        for record in records:
+            writer.writerow(record.to_row(fieldnames))
+            count += 1
+    return count
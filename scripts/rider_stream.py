@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Protocolo de streaming entre scripts: NDJSON no stdin/stdout com um cabeçalho.
+
+Cada script escrevia um CSV com nome fixo que o seguinte voltava a ler do
+disco, uns com cabeçalho e outros sem. Com --stream os scripts passam
+ciclistas uns aos outros por pipes, registo a registo, sem ficheiros
+temporários nem listas com o plantel inteiro:
+
+    python parse_wiki.py --stream | python clean_wiki_data.py --stream \\
+        | python enrich_cyclists.py --stream | python rider_stream.py export cyclists.csv
+
+- a primeira linha é o cabeçalho {"schema": "rider", "version": 1,
+  "fields": [...], "types": {...}}; quem lê recusa um stream sem cabeçalho
+  ou de outra versão em vez de adivinhar as colunas;
+- cada linha seguinte é um ciclista (um objeto JSON com os campos do
+  cabeçalho; age e uci_ranking int ou null, price número);
+- cada registo é escrito e enviado (flush) logo que está pronto, por isso
+  o passo seguinte começa a trabalhar antes de o anterior acabar;
+- as mensagens de progresso vão para o stderr, o stdout é só o stream;
+- import lê um CSV de nove colunas com ou sem cabeçalho (deteta sozinho) e
+  export escreve o CSV no fim do pipe.
+
+Uso:
+    python rider_stream.py import ciclistas.csv | ...
+    ... | python rider_stream.py export saida.csv [--no-header]
+    python rider_stream.py --bench [n_ciclistas]
+"""
+
+import itertools
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import IO, Iterable, Iterator, List, Optional
+
+from rider_record import FIELDNAMES, FIELDNAMES_WITH_URL, RiderRecord, read_csv, write_csv
+
+SCHEMA = 'rider'
+VERSION = 1
+
+FIELD_TYPES = {
+    'first_name': 'string', 'last_name': 'string', 'team': 'string',
+    'nationality': 'string', 'age': 'int', 'uci_ranking': 'int',
+    'speciality': 'string', 'price': 'number', 'category': 'string',
+    'profile_url': 'string',
+}
+
+
+class StreamError(ValueError):
+    """Stream sem cabeçalho, de outro esquema/versão ou com uma linha inválida."""
+
+
+def header(fieldnames: List[str] = FIELDNAMES_WITH_URL) -> dict:
+    return {'schema': SCHEMA, 'version': VERSION, 'fields': list(fieldnames),
+            'types': {name: FIELD_TYPES[name] for name in fieldnames}}
+
+
+def write_stream(records: Iterable[RiderRecord], out: Optional[IO[str]] = None,
+                 fieldnames: List[str] = FIELDNAMES_WITH_URL) -> int:
+    """
+    Escreve o cabeçalho e depois cada ciclista assim que chega (com flush).
+    Se quem lê fechar o pipe (ex: | head), pára sem erro. Retorna quantos escreveu.
+    """
+    out = out or sys.stdout
+    count = 0
+    try:
+        out.write(json.dumps(header(fieldnames), ensure_ascii=False) + '\n')
+        out.flush()
+        for record in records:
+            out.write(json.dumps({name: getattr(record, name) for name in fieldnames},
+                                 ensure_ascii=False) + '\n')
+            out.flush()
+            count += 1
+    except BrokenPipeError:
+        # O resto do output vai para /dev/null para o Python não avisar à saída
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, out.fileno())
+    return count
+
+
+def read_stream(inp: Optional[IO[str]] = None) -> Iterator[RiderRecord]:
+    """Lê ciclistas de um stream NDJSON, um de cada vez, à medida que chegam."""
+    inp = inp or sys.stdin
+    first = inp.readline()
+    try:
+        head = json.loads(first) if first.strip() else None
+    except json.JSONDecodeError:
+        head = None
+    if not isinstance(head, dict) or head.get('schema') != SCHEMA:
+        raise StreamError("Stream sem cabeçalho de ciclistas (usar --stream no passo anterior "
+                          "ou rider_stream.py import ficheiro.csv)")
+    if head.get('version') != VERSION:
+        raise StreamError(f"Versão {head.get('version')} do stream não suportada (esperada {VERSION})")
+    fields = set(head['fields']) & set(RiderRecord.__slots__)
+
+    for number, line in enumerate(inp, 2):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise StreamError(f"Linha {number} inválida: {e}") from None
+        yield RiderRecord(**{k: v for k, v in row.items() if k in fields and v is not None})
+
+
+@contextmanager
+def stream_stdio():
+    """
+    stdin/stdout em UTF-8 para o stream e todos os print() para o stderr.
+    Retorna (entrada, saída) para read_stream/write_stream.
+    """
+    sys.stdin.reconfigure(encoding='utf-8')
+    sys.stdout.reconfigure(encoding='utf-8', newline='\n')
+    out = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        yield sys.stdin, out
+    finally:
+        sys.stdout = out
+
+
+def has_header(csv_file: str) -> bool:
+    """O CSV começa com o cabeçalho (first_name,...) ou já com dados?"""
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        return f.readline().strip().split(',')[:2] == FIELDNAMES[:2]
+
+
+def import_csv(csv_file: str) -> Iterator[RiderRecord]:
+    """Ciclistas de um CSV de nove colunas (+ profile_url), com ou sem cabeçalho."""
+    if has_header(csv_file):
+        return read_csv(csv_file)
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        columns = len(f.readline().split(','))
+    return read_csv(csv_file, header=False,
+                    fieldnames=FIELDNAMES_WITH_URL if columns > len(FIELDNAMES) else FIELDNAMES)
+
+
+def run_files(records: List[RiderRecord], folder: str) -> tuple:
+    """Dois passos por ficheiro: o segundo só começa depois de o CSV intermédio existir."""
+    t0 = time.perf_counter()
+    middle = os.path.join(folder, 'middle.csv')
+    write_csv(middle, iter(records))
+    first = time.perf_counter() - t0
+    write_csv(os.path.join(folder, 'files.csv'), list(read_csv(middle)))
+    return first, time.perf_counter() - t0
+
+
+def run_pipe(records: List[RiderRecord], folder: str) -> tuple:
+    """Os mesmos dois passos ligados por um pipe (o primeiro numa thread)."""
+    import threading
+    read_fd, write_fd = os.pipe()
+    inp = os.fdopen(read_fd, 'r', encoding='utf-8')
+    out = os.fdopen(write_fd, 'w', encoding='utf-8', newline='\n')
+    first = None
+
+    def produce():
+        with out:
+            write_stream(iter(records), out)
+
+    def consume():
+        nonlocal first
+        for record in read_stream(inp):
+            if first is None:
+                first = time.perf_counter() - t0
+            yield record
+
+    t0 = time.perf_counter()
+    producer = threading.Thread(target=produce)
+    producer.start()
+    with inp:
+        write_csv(os.path.join(folder, 'stream.csv'), consume())
+    producer.join()
+    return first, time.perf_counter() - t0
+
+
+def benchmark(n: int = 100000):
+    import tempfile
+    import tracemalloc
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    source = list(read_csv(os.path.join(here, 'worldtour_2026_complete.csv')))
+    records = [source[i % len(source)] for i in range(n)]
+
+    print(f"{n} ciclistas, dois passos:")
+    with tempfile.TemporaryDirectory() as folder:
+        for label, run in (('ficheiro intermédio', run_files), ('pipe NDJSON', run_pipe)):
+            first, total = run(records, folder)
+            tracemalloc.start()
+            run(records, folder)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  {label:<20} {total:5.2f}s  primeiro ciclista no 2º passo aos "
+                  f"{first * 1000:7.1f} ms  pico {peak / 1e6:6.1f} MB")
+
+        with open(os.path.join(folder, 'files.csv'), 'rb') as a, \
+                open(os.path.join(folder, 'stream.csv'), 'rb') as b:
+            if a.read() != b.read():
+                raise AssertionError("CSV do pipe diferente do CSV por ficheiros")
+    print("✓ Mesmo CSV no fim, sem ficheiro intermédio nem o plantel todo em memória")
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--bench':
+        benchmark(int(args[1]) if len(args) > 1 else 100000)
+        return
+    if len(args) == 2 and args[0] == 'import':
+        with stream_stdio() as (_, out):
+            count = write_stream(import_csv(args[1]), out)
+        print(f"✓ {count} ciclistas enviados de {args[1]}", file=sys.stderr)
+        return
+    if len(args) in (2, 3) and args[0] == 'export' and args[2:] in ([], ['--no-header']):
+        with stream_stdio() as (inp, _):
+            records = read_stream(inp)
+            try:
+                # O cabeçalho é validado antes de criar o ficheiro
+                first = next(records, None)
+            except StreamError as e:
+                print(f"✗ {e}", file=sys.stderr)
+                sys.exit(1)
+            rows = records if first is None else itertools.chain([first], records)
+            count = write_csv(args[1], rows, header=len(args) == 2)
+        print(f"✓ {count} ciclistas guardados em {args[1]}", file=sys.stderr)
+        return
+
+    print("Uso: python rider_stream.py import ciclistas.csv | ...")
+    print("     ... | python rider_stream.py export saida.csv [--no-header]")
+    print("     python rider_stream.py --bench [n_ciclistas]")
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Validação dos CSV de ciclistas antes de chegarem à app, com quarentena.
+
+Linhas más só eram descobertas na importação (Admin Sync): equipas lidas
+como ciclistas no wiki_cyclists.csv ("Alpecin–Premier,Tech"), nacionalidade
+vazia, preços fora de 3–15, nomes repetidos... Este passo lê o lote todo uma
+vez para colunas numpy e verifica coluna a coluna:
+
+- esquema: nome e apelido preenchidos, age/uci_ranking inteiros e price
+  número (ou vazios onde é permitido);
+- enums: category nas categorias do jogo/CSV, nacionalidade preenchida;
+- intervalos: price entre 3 e 15, age entre 16 e 45, uci_ranking >= 1;
+- unicidade: nome completo (sem acentos nem maiúsculas) só uma vez; fica a
+  primeira ocorrência;
+- referências ao team_index: a equipa tem de ser conhecida e o "ciclista"
+  não pode ser o nome de uma equipa.
+
+As linhas válidas seguem para <saida>.csv; as outras vão para
+<saida>_quarantine.csv com a linha original e os motivos.
+
+Uso:
+    pip install numpy
+    python rider_validation.py ciclistas.csv [validos.csv]
+    python rider_validation.py --bench [n_linhas]
+"""
+
+import csv
+import os
+import re
+import sys
+import time
+import unicodedata
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("A instalar dependências...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "numpy"])
+    import numpy as np
+
+from fantasy_rules import CATEGORY_REQUIREMENTS
+from rider_record import FIELDNAMES, FIELDNAMES_WITH_URL
+from speciality_classifier import DEFAULT_CATEGORY, SPECIALITY_CATEGORY
+from team_index import TEAM_INDEX, team_key
+
+PRICE_RANGE = (3.0, 15.0)
+AGE_RANGE = (16, 45)
+
+# Categorias dos CSV (SPECIALITY_CATEGORY + ROULEUR) e as do CyclistCategory da app
+CATEGORIES = sorted(set(SPECIALITY_CATEGORY.values()) | {DEFAULT_CATEGORY} | set(CATEGORY_REQUIREMENTS))
+
+QUARANTINE_FIELDS = ['line', 'reasons']
+
+_INT = re.compile(r'^\d+(\.0+)?$')
+_NUMBER = re.compile(r'^\d+(\.\d+)?$')
+
+
+def quarantine_path(output_file: str) -> str:
+    """validos.csv -> validos_quarantine.csv"""
+    base, ext = os.path.splitext(output_file)
+    return f"{base}_quarantine{ext or '.csv'}"
+
+
+def read_batch(filename: str) -> Tuple[List[str], List[List[str]], bool]:
+    """
+    Lê o CSV (com ou sem cabeçalho, como o wiki_cyclists.csv).
+    Retorna (nomes das colunas, linhas, tinha cabeçalho).
+    """
+    with open(filename, encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f))
+    header = bool(rows) and rows[0][:1] == ['first_name']
+    fieldnames = rows[0] if header else (FIELDNAMES_WITH_URL if rows and len(rows[0]) > len(FIELDNAMES)
+                                         else FIELDNAMES)
+    return fieldnames, rows[1:] if header else rows, header
+
+
+def to_columns(fieldnames: Sequence[str], body: List[List[str]]) -> Dict[str, np.ndarray]:
+    """Linhas -> uma coluna numpy de strings por campo (+ '_width', o número de campos de cada linha)."""
+    width = len(fieldnames)
+    # Linhas curtas ou compridas: completa/corta para a largura do esquema (a falta é detetada à parte)
+    lengths = np.array([len(r) for r in body], dtype=np.int32)
+    padded = [r + [''] * (width - len(r)) if len(r) < width else r[:width] for r in body]
+    table = np.array(padded, dtype=object).reshape(len(body), width)
+    columns = {name: np.char.strip(table[:, i].astype(str)) for i, name in enumerate(fieldnames)}
+    columns['_width'] = lengths
+    return columns
+
+
+# Acentos (marcas combinantes depois do NFD) removidos com str.translate
+_COMBINING = dict.fromkeys(range(0x300, 0x370))
+
+# Palavras que aparecem nos nomes de equipas do team_index
+_TEAM_TOKENS = {token for key in TEAM_INDEX for token in key.split()}
+
+
+def per_value(column: np.ndarray, fn, dtype=bool) -> np.ndarray:
+    """fn aplicada uma vez por valor distinto da coluna e espalhada pelas linhas."""
+    values, index = np.unique(column, return_inverse=True)
+    return np.array([fn(v) for v in values], dtype=dtype)[index]
+
+
+def name_keys(first: np.ndarray, last: np.ndarray) -> np.ndarray:
+    """Nome completo sem acentos nem maiúsculas, para detetar repetidos."""
+    return np.array([' '.join(unicodedata.normalize('NFD', f"{a} {b}".lower()).translate(_COMBINING).split())
+                     for a, b in zip(first, last)], dtype=object)
+
+
+def team_names(first: np.ndarray, last: np.ndarray) -> np.ndarray:
+    """
+    Linhas cujo nome completo é uma equipa ("Alpecin–Premier", "Tech").
+    Só se calcula a chave completa quando o primeiro nome é feito de
+    palavras de equipas, o que exclui quase todos os ciclistas.
+    """
+    candidate = per_value(first, lambda name: set(team_key(name).split()) <= _TEAM_TOKENS)
+    result = np.zeros(len(first), dtype=bool)
+    rows = np.flatnonzero(candidate)
+    result[rows] = [team_key(f"{first[i]} {last[i]}") in TEAM_INDEX for i in rows]
+    return result
+
+
+def matches(column: np.ndarray, pattern: re.Pattern) -> np.ndarray:
+    return per_value(column, lambda value: bool(pattern.match(value)))
+
+
+def as_numbers(column: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Valores numéricos (NaN onde não é número)."""
+    values = np.full(len(column), np.nan)
+    values[valid] = column[valid].astype(np.float64)
+    return values
+
+
+def validate_columns(columns: Dict[str, np.ndarray], fieldnames: Sequence[str]) -> Dict[str, np.ndarray]:
+    """
+    Máscara de falha (True = linha inválida) para cada regra, calculada sobre
+    as colunas inteiras.
+    """
+    first, last = columns['first_name'], columns['last_name']
+    team, nationality = columns['team'], columns['nationality']
+    age, ranking, price = columns['age'], columns['uci_ranking'], columns['price']
+    category = np.char.upper(columns['category'])
+
+    checks: Dict[str, np.ndarray] = {}
+    checks[f"esperadas {len(fieldnames)} colunas"] = columns['_width'] != len(fieldnames)
+    checks['nome ou apelido vazio'] = (first == '') | (last == '')
+
+    age_ok = matches(age, _INT)
+    ranking_ok = matches(ranking, _INT)
+    price_ok = matches(price, _NUMBER)
+    checks['age não é inteiro'] = (age != '') & ~age_ok
+    checks['uci_ranking não é inteiro'] = (ranking != '') & ~ranking_ok
+    checks['price não é número'] = ~price_ok
+
+    ages, prices = as_numbers(age, age_ok), as_numbers(price, price_ok)
+    checks[f"age fora de {AGE_RANGE[0]}–{AGE_RANGE[1]}"] = age_ok & ((ages < AGE_RANGE[0]) | (ages > AGE_RANGE[1]))
+    checks['uci_ranking < 1'] = ranking_ok & (as_numbers(ranking, ranking_ok) < 1)
+    checks[f"price fora de {PRICE_RANGE[0]:g}–{PRICE_RANGE[1]:g}"] = price_ok & (
+        (prices < PRICE_RANGE[0]) | (prices > PRICE_RANGE[1]))
+
+    checks['category desconhecida'] = ~np.isin(category, CATEGORIES)
+    checks['nacionalidade vazia'] = nationality == ''
+
+    # Referências ao team_index: uma chave por valor distinto, não por linha
+    checks['equipa vazia'] = team == ''
+    checks['equipa desconhecida'] = (team != '') & ~per_value(team, lambda t: team_key(t) in TEAM_INDEX)
+    checks['nome é uma equipa'] = team_names(first, last)
+
+    keys = name_keys(first, last)
+    _unique, first_seen = np.unique(keys, return_index=True)
+    repeated = np.ones(len(keys), dtype=bool)
+    repeated[first_seen] = False
+    checks['nome repetido'] = repeated & (keys != '')
+    return checks
+
+
+def reasons_for(checks: Dict[str, np.ndarray], n: int) -> Tuple[np.ndarray, List[str]]:
+    """(máscara das linhas válidas, motivos de cada linha rejeitada)."""
+    failed = np.zeros(n, dtype=bool)
+    for mask in checks.values():
+        failed |= mask
+    rejected = np.flatnonzero(failed)
+    reasons = ['; '.join(name for name, mask in checks.items() if mask[i]) for i in rejected]
+    return ~failed, reasons
+
+
+def validate_file(input_file: str, output_file: Optional[str] = None) -> Dict[str, object]:
+    """Valida um CSV de ciclistas; escreve as linhas boas e a quarentena. Retorna um resumo."""
+    fieldnames, rows, header = read_batch(input_file)
+    t0 = time.perf_counter()
+    checks = validate_columns(to_columns(fieldnames, rows), fieldnames)
+    valid, reasons = reasons_for(checks, len(rows))
+    elapsed = time.perf_counter() - t0
+
+    output_file = output_file or f"{os.path.splitext(input_file)[0]}_valid.csv"
+    with open(output_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        if header:
+            writer.writerow(fieldnames)
+        writer.writerows(row for row, ok in zip(rows, valid) if ok)
+
+    quarantine_file = quarantine_path(output_file)
+    with open(quarantine_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(QUARANTINE_FIELDS + list(fieldnames))
+        line_offset = 2 if header else 1
+        for i, reason in zip(np.flatnonzero(~valid), reasons):
+            writer.writerow([int(i) + line_offset, reason] + rows[i])
+
+    return {
+        'rows': len(rows), 'valid': int(valid.sum()), 'rejected': len(reasons), 'seconds': elapsed,
+        'by_reason': {name: int(mask.sum()) for name, mask in checks.items() if mask.any()},
+        'output': output_file, 'quarantine': quarantine_file,
+    }
+
+
+def reference_reasons(row: Dict[str, str], seen: set, width_ok: bool = True) -> List[str]:
+    """As mesmas regras linha a linha (referência para o benchmark)."""
+    def is_int(v):
+        return bool(_INT.match(v))
+    reasons = []
+    if not width_ok:
+        reasons.append(f"esperadas {len(FIELDNAMES)} colunas")
+    if not row['first_name'] or not row['last_name']:
+        reasons.append('nome ou apelido vazio')
+    age, ranking, price = row['age'], row['uci_ranking'], row['price']
+    if age and not is_int(age):
+        reasons.append('age não é inteiro')
+    if ranking and not is_int(ranking):
+        reasons.append('uci_ranking não é inteiro')
+    if not _NUMBER.match(price):
+        reasons.append('price não é número')
+    if is_int(age) and not AGE_RANGE[0] <= float(age) <= AGE_RANGE[1]:
+        reasons.append(f"age fora de {AGE_RANGE[0]}–{AGE_RANGE[1]}")
+    if is_int(ranking) and float(ranking) < 1:
+        reasons.append('uci_ranking < 1')
+    if _NUMBER.match(price) and not PRICE_RANGE[0] <= float(price) <= PRICE_RANGE[1]:
+        reasons.append(f"price fora de {PRICE_RANGE[0]:g}–{PRICE_RANGE[1]:g}")
+    if row['category'].upper() not in CATEGORIES:
+        reasons.append('category desconhecida')
+    if not row['nationality']:
+        reasons.append('nacionalidade vazia')
+    if not row['team']:
+        reasons.append('equipa vazia')
+    elif team_key(row['team']) not in TEAM_INDEX:
+        reasons.append('equipa desconhecida')
+    if team_key(f"{row['first_name']} {row['last_name']}") in TEAM_INDEX:
+        reasons.append('nome é uma equipa')
+    key = name_keys(np.array([row['first_name']]), np.array([row['last_name']]))[0]
+    if key and key in seen:
+        reasons.append('nome repetido')
+    seen.add(key)
+    return reasons
+
+
+def fake_csv(path: str, n: int, seed: int = 5):
+    """CSV de n linhas a partir do worldtour_2026_complete.csv com erros injetados."""
+    rng = np.random.default_rng(seed)
+    here = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(here, 'worldtour_2026_complete.csv'), encoding='utf-8', newline='') as f:
+        source = list(csv.reader(f))[1:]
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDNAMES)
+        for i in range(n):
+            row = list(source[i % len(source)])
+            row[1] = f"{row[1]} {i}"
+            kind = rng.integers(0, 40)
+            if kind == 0:
+                row[:2] = ['Alpecin–Premier', 'Tech']
+            elif kind == 1:
+                row[3] = ''
+            elif kind == 2:
+                row[7] = str(rng.choice(['2.5', '19.0', 'abc']))
+            elif kind == 3:
+                row[1] = source[i % len(source)][1]
+            elif kind == 4:
+                row[2] = 'Equipa Inventada'
+            elif kind == 5:
+                row[8] = 'DOMESTIQUE'
+            elif kind == 6:
+                row = row[:5]
+            writer.writerow(row)
+
+
+def benchmark(n: int = 100000):
+    import tempfile
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'riders.csv')
+        fake_csv(path, n)
+        result = validate_file(path, os.path.join(folder, 'valid.csv'))
+
+        t0 = time.perf_counter()
+        with open(path, encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            next(reader)
+            seen, expected = set(), []
+            for line, raw in enumerate(reader, 2):
+                row = dict(zip(FIELDNAMES, [v.strip() for v in raw] + [''] * (len(FIELDNAMES) - len(raw))))
+                reasons = reference_reasons(row, seen, len(raw) == len(FIELDNAMES))
+                if reasons:
+                    expected.append([str(line), '; '.join(reasons)])
+        reference_time = time.perf_counter() - t0
+
+        with open(result['quarantine'], encoding='utf-8', newline='') as f:
+            got = [row[:2] for row in list(csv.reader(f))[1:]]
+
+    print(f"{n} linhas: {result['valid']} válidas, {result['rejected']} em quarentena")
+    for reason, count in sorted(result['by_reason'].items(), key=lambda kv: -kv[1]):
+        print(f"  {count:6d}  {reason}")
+    print(f"  colunas {result['seconds']:.2f}s  linha a linha {reference_time:.2f}s "
+          f"({reference_time / result['seconds']:.1f}x)")
+    if got != expected:
+        raise AssertionError(f"Quarentena diferente da validação linha a linha ({len(got)} vs {len(expected)})")
+    print("  quarentena igual à validação linha a linha ✓")
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--bench':
+        benchmark(int(args[1]) if len(args) > 1 else 100000)
+        return
+    if not args or len(args) > 2 or args[0].startswith('--'):
+        print("Uso: python rider_validation.py ciclistas.csv [validos.csv]")
+        print("     python rider_validation.py --bench [n_linhas]")
+        sys.exit(1)
+
+    result = validate_file(args[0], args[1] if len(args) > 1 else None)
+    for reason, count in sorted(result['by_reason'].items(), key=lambda kv: -kv[1]):
+        print(f"  {count:6d}  {reason}")
+    print(f"✓ {result['valid']}/{result['rows']} linhas válidas em {result['output']}")
+    if result['rejected']:
+        print(f"  {result['rejected']} em quarentena: {result['quarantine']}")
+
+
+if __name__ == '__main__':
+    main()
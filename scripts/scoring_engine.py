@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Motor de pontuação fantasy em lote (NumPy + matriz esparsa).
+
+Faz o mesmo que CalculateStageFantasyPointsUseCase.processStage na app,
+mas para todas as equipas e etapas de uma vez:
+
+    pontos_equipas (equipas x etapas) = W (equipas x ciclistas) @ P (ciclistas x etapas)
+
+- P: pontos de cada ciclista em cada etapa (StagePointsTable x multiplicador
+  do StageType + JerseyBonusPoints), calculados a partir de linhas com o
+  formato de StageResultEntity;
+- W: matriz esparsa de posse, com o peso de cada ciclista na equipa
+  (1, 2 se capitão, 3 se capitão com Triple Captain; só conta se estiver
+  ativo ou com Bench Boost).
+
+Uso:
+    pip install numpy scipy
+    python scoring_engine.py stage_results.csv team_cyclists.csv fantasy_teams.csv [output.csv]
+    python scoring_engine.py --bench [n_equipas]
+
+Ficheiros de entrada (cabeçalhos com os nomes dos campos das entidades Room):
+    stage_results.csv:  raceId,stageNumber,stageType,cyclistId,position,
+                        isGcLeader,isMountainsLeader,isPointsLeader,isYoungLeader,status
+    team_cyclists.csv:  teamId,cyclistId,isActive,isCaptain
+    fantasy_teams.csv:  id,benchBoostActive,tripleCaptainActive
+
+Saída (uma linha por equipa e etapa com pontos, como TeamStageResultData):
+    teamId,raceId,stageNumber,pointsEarned,wasTripleCaptainActive,wasBenchBoostActive
+"""
+
+import csv
+import sys
+import time
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    print("A instalar numpy e scipy...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "numpy", "scipy"])
+    import numpy as np
+    from scipy import sparse
+
+from fantasy_rules import (
+    CAPTAIN_MULTIPLIER, JERSEY_GC_LEADER, JERSEY_MOUNTAINS_LEADER, JERSEY_POINTS_LEADER,
+    JERSEY_YOUNG_LEADER, STAGE_BASE_POINTS, STAGE_TYPES, TRIPLE_CAPTAIN_MULTIPLIER,
+    jersey_bonus, stage_points, stage_type_from_string,
+)
+from rider_record import as_bool, read_rows
+
+MAX_POSITION = max(STAGE_BASE_POINTS)
+
+# POINTS_TABLE[tipo, posição]; posição 0 (sem posição) e > 20 valem 0
+POINTS_TABLE = np.array(
+    [[stage_points(pos, stage_type) for pos in range(MAX_POSITION + 1)]
+     for stage_type in STAGE_TYPES],
+    dtype=np.int64,
+)
+
+# Ordem das colunas de camisolas: GC, montanha, pontos, jovem
+JERSEY_COLUMNS = ['isGcLeader', 'isMountainsLeader', 'isPointsLeader', 'isYoungLeader']
+JERSEY_VALUES = np.array([JERSEY_GC_LEADER, JERSEY_MOUNTAINS_LEADER,
+                          JERSEY_POINTS_LEADER, JERSEY_YOUNG_LEADER], dtype=np.int64)
+
+OUTPUT_FIELDNAMES = ['teamId', 'raceId', 'stageNumber', 'pointsEarned',
+                     'wasTripleCaptainActive', 'wasBenchBoostActive']
+
+
+def as_position(value) -> int:
+    """position ?: 0, como na app."""
+    if value is None or value == '':
+        return 0
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+class Ownership:
+    """Matriz esparsa W (equipas x ciclistas) com o peso de cada ciclista."""
+
+    def __init__(self, team_ids: np.ndarray, rider_ids: np.ndarray, matrix,
+                 triple_captain: np.ndarray, bench_boost: np.ndarray):
+        self.team_ids = team_ids
+        self.rider_ids = rider_ids
+        self.rider_index = {rider_id: i for i, rider_id in enumerate(rider_ids.tolist())}
+        self.matrix = matrix
+        self.triple_captain = triple_captain
+        self.bench_boost = bench_boost
+
+    @classmethod
+    def from_rows(cls, teams: Iterable[Dict], team_cyclists: Iterable[Dict]) -> 'Ownership':
+        teams = list(teams)
+        team_cyclists = list(team_cyclists)
+
+        team_ids = np.array([t['id'] for t in teams])
+        bench_boost = np.array([as_bool(t.get('benchBoostActive', False)) for t in teams])
+        triple_captain = np.array([as_bool(t.get('tripleCaptainActive', False)) for t in teams])
+
+        tc_team = np.array([tc['teamId'] for tc in team_cyclists])
+        tc_rider = np.array([tc['cyclistId'] for tc in team_cyclists])
+        is_active = np.array([as_bool(tc.get('isActive', False)) for tc in team_cyclists], dtype=bool)
+        is_captain = np.array([as_bool(tc.get('isCaptain', False)) for tc in team_cyclists], dtype=bool)
+        return cls.from_arrays(team_ids, bench_boost, triple_captain,
+                               tc_team, tc_rider, is_active, is_captain)
+
+    @classmethod
+    def from_arrays(cls, team_ids, bench_boost, triple_captain,
+                    tc_team, tc_rider, is_active, is_captain) -> 'Ownership':
+        """Constrói W a partir de colunas (uma entrada por TeamCyclistEntity)."""
+        team_ids = np.asarray(team_ids)
+        order = np.argsort(team_ids, kind='stable')
+        sorted_ids = team_ids[order]
+
+        # Linha de cada ciclista de equipa = posição da sua equipa em team_ids
+        pos = np.searchsorted(sorted_ids, tc_team)
+        pos = np.clip(pos, 0, len(sorted_ids) - 1)
+        known = sorted_ids[pos] == tc_team
+        rows = order[pos[known]]
+
+        rider_ids, cols = np.unique(np.asarray(tc_rider)[known], return_inverse=True)
+        is_active = np.asarray(is_active, dtype=bool)[known]
+        is_captain = np.asarray(is_captain, dtype=bool)[known]
+
+        bench_boost = np.asarray(bench_boost, dtype=bool)
+        triple_captain = np.asarray(triple_captain, dtype=bool)
+
+        # Conta se estiver ativo ou com Bench Boost; capitão x2, ou x3 com Triple Captain
+        counted = is_active | bench_boost[rows]
+        weights = np.where(is_captain,
+                           np.where(triple_captain[rows], TRIPLE_CAPTAIN_MULTIPLIER, CAPTAIN_MULTIPLIER),
+                           1) * counted
+
+        matrix = sparse.csr_matrix(
+            (weights.astype(np.int64), (rows, cols)),
+            shape=(len(team_ids), len(rider_ids)),
+        )
+        matrix.eliminate_zeros()
+        return cls(team_ids, rider_ids, matrix, triple_captain, bench_boost)
+
+
+def stage_points_matrix(stage_results: Iterable[Dict], rider_index: Dict[str, int]
+                        ) -> Tuple[List[Tuple[str, int]], np.ndarray]:
+    """
+    Pontos de cada ciclista em cada etapa.
+
+    Retorna (etapas, P) com etapas = [(raceId, stageNumber), ...] e
+    P de forma (n_ciclistas, n_etapas). Tal como stageResults.find na app,
+    se um ciclista aparecer duas vezes na mesma etapa conta a primeira linha.
+    Ciclistas que nenhuma equipa tem são ignorados.
+    """
+    stage_results = list(stage_results)
+    stage_keys = [(r['raceId'], int(r['stageNumber'])) for r in stage_results]
+    stages = sorted(set(stage_keys))
+    stage_col = {key: i for i, key in enumerate(stages)}
+
+    points = np.zeros((len(rider_index), len(stages)), dtype=np.int64)
+    if not stage_results:
+        return stages, points
+
+    rider_col = np.array([rider_index.get(r['cyclistId'], -1) for r in stage_results])
+    col = np.array([stage_col[key] for key in stage_keys])
+    type_idx = np.array([STAGE_TYPES.index(stage_type_from_string(r.get('stageType', '')))
+                         for r in stage_results])
+    position = np.array([as_position(r.get('position')) for r in stage_results])
+    jerseys = np.array([[as_bool(r.get(c, False)) for c in JERSEY_COLUMNS] for r in stage_results],
+                       dtype=np.int64)
+
+    # Posições fora da tabela (0, > 20) valem 0
+    position = np.where((position >= 0) & (position <= MAX_POSITION), position, 0)
+    row_points = POINTS_TABLE[type_idx, position] + jerseys @ JERSEY_VALUES
+
+    # Primeira linha de cada (ciclista, etapa), só para ciclistas conhecidos
+    owned = rider_col >= 0
+    flat_key = rider_col[owned] * len(stages) + col[owned]
+    _, first = np.unique(flat_key, return_index=True)
+    idx = np.flatnonzero(owned)[first]
+    points[rider_col[idx], col[idx]] = row_points[idx]
+    return stages, points
+
+
+def score(ownership: Ownership, points: np.ndarray) -> np.ndarray:
+    """Pontos de cada equipa em cada etapa: W @ P (equipas x etapas)."""
+    return np.asarray(ownership.matrix @ points)
+
+
+def reference_team_points(team: Dict, team_cyclists: Sequence[Dict],
+                          stage_results: Sequence[Dict], stage_type: str) -> int:
+    """
+    Cálculo objeto a objeto, linha a linha como na app (para verificação).
+    """
+    bench_boost = as_bool(team.get('benchBoostActive', False))
+    triple_captain = as_bool(team.get('tripleCaptainActive', False))
+    stage_type = stage_type_from_string(stage_type)
+    total = 0
+    for tc in team_cyclists:
+        if not (as_bool(tc.get('isActive', False)) or bench_boost):
+            continue
+        result = next((r for r in stage_results if r['cyclistId'] == tc['cyclistId']), None)
+        if result is None:
+            continue
+        points = stage_points(as_position(result.get('position')), stage_type)
+        points += jersey_bonus(as_bool(result.get('isGcLeader', False)),
+                               as_bool(result.get('isPointsLeader', False)),
+                               as_bool(result.get('isMountainsLeader', False)),
+                               as_bool(result.get('isYoungLeader', False)))
+        if as_bool(tc.get('isCaptain', False)):
+            points *= TRIPLE_CAPTAIN_MULTIPLIER if triple_captain else CAPTAIN_MULTIPLIER
+        total += points
+    return total
+
+
+def write_results(filename: str, ownership: Ownership, stages: List[Tuple[str, int]],
+                  team_points: np.ndarray) -> int:
+    """Escreve as linhas com pontos > 0 (a app não guarda etapas a zero)."""
+    team_rows, stage_cols = np.nonzero(team_points > 0)
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(OUTPUT_FIELDNAMES)
+        for row, col in zip(team_rows.tolist(), stage_cols.tolist()):
+            race_id, stage_number = stages[col]
+            writer.writerow([
+                ownership.team_ids[row], race_id, stage_number, int(team_points[row, col]),
+                str(bool(ownership.triple_captain[row])).lower(),
+                str(bool(ownership.bench_boost[row])).lower(),
+            ])
+    return len(team_rows)
+
+
+def benchmark(n_teams: int = 100_000, n_riders: int = 600, n_stages: int = 21,
+              squad_size: int = 15, active: int = 8, seed: int = 42):
+    """Mede o tempo de pontuar n_teams equipas em n_stages etapas e verifica uma amostra."""
+    rng = np.random.default_rng(seed)
+    rider_ids = np.array([f"c{i}" for i in range(n_riders)])
+    team_ids = np.array([f"t{i}" for i in range(n_teams)])
+
+    # Plantéis aleatórios sem repetidos: volta a sortear só as linhas com repetidos
+    squads = rng.integers(0, n_riders, size=(n_teams, squad_size))
+    while True:
+        repeated = (np.diff(np.sort(squads, axis=1), axis=1) == 0).any(axis=1)
+        if not repeated.any():
+            break
+        squads[repeated] = rng.integers(0, n_riders, size=(int(repeated.sum()), squad_size))
+    tc_team = np.repeat(team_ids, squad_size)
+    tc_rider = rider_ids[squads.ravel()]
+    slot = np.tile(np.arange(squad_size), n_teams)
+    is_active = slot < active
+    is_captain = slot == 0
+    bench_boost = rng.random(n_teams) < 0.05
+    triple_captain = rng.random(n_teams) < 0.05
+
+    stage_results = []
+    for stage in range(1, n_stages + 1):
+        stage_type = STAGE_TYPES[rng.integers(len(STAGE_TYPES))]
+        order = rng.permutation(n_riders)
+        for position, rider in enumerate(order[:150], 1):
+            stage_results.append({
+                'raceId': 'bench', 'stageNumber': stage, 'stageType': stage_type,
+                'cyclistId': rider_ids[rider], 'position': position,
+                'isGcLeader': position == 1, 'isPointsLeader': position == 2,
+                'isMountainsLeader': position == 3, 'isYoungLeader': position == 4,
+            })
+
+    t0 = time.perf_counter()
+    ownership = Ownership.from_arrays(team_ids, bench_boost, triple_captain,
+                                      tc_team, tc_rider, is_active, is_captain)
+    t1 = time.perf_counter()
+    stages, points = stage_points_matrix(stage_results, ownership.rider_index)
+    t2 = time.perf_counter()
+    team_points = score(ownership, points)
+    t3 = time.perf_counter()
+
+    print(f"{n_teams:,} equipas x {n_stages} etapas ({n_riders} ciclistas)")
+    print(f"  Matriz de posse:   {t1 - t0:.3f}s")
+    print(f"  Pontos por etapa:  {t2 - t1:.3f}s")
+    print(f"  W @ P:             {t3 - t2:.3f}s")
+
+    # Verificação contra o cálculo objeto a objeto numa amostra
+    for row in rng.choice(n_teams, size=min(200, n_teams), replace=False):
+        team = {'id': team_ids[row], 'benchBoostActive': bench_boost[row],
+                'tripleCaptainActive': triple_captain[row]}
+        members = [{'cyclistId': tc_rider[row * squad_size + s], 'isActive': is_active[s],
+                    'isCaptain': is_captain[s]} for s in range(squad_size)]
+        for col, (race_id, stage_number) in enumerate(stages):
+            results = [r for r in stage_results if r['stageNumber'] == stage_number]
+            expected = reference_team_points(team, members, results, results[0]['stageType'])
+            if expected != team_points[row, col]:
+                raise AssertionError(f"Equipa {team['id']} etapa {stage_number}: "
+                                     f"{team_points[row, col]} != {expected}")
+    print("  Amostra de 200 equipas igual ao cálculo da app ✓")
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == '--bench':
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 100_000)
+        return
+
+    if len(sys.argv) < 4:
+        print("Uso: python scoring_engine.py stage_results.csv team_cyclists.csv fantasy_teams.csv [output.csv]")
+        print("     python scoring_engine.py --bench [n_equipas]")
+        sys.exit(1)
+
+    stage_file, team_cyclists_file, teams_file = sys.argv[1:4]
+    output_file = sys.argv[4] if len(sys.argv) > 4 else 'team_stage_results.csv'
+
+    t0 = time.perf_counter()
+    ownership = Ownership.from_rows(read_rows(teams_file), read_rows(team_cyclists_file))
+    stages, points = stage_points_matrix(read_rows(stage_file), ownership.rider_index)
+    team_points = score(ownership, points)
+    count = write_results(output_file, ownership, stages, team_points)
+
+    print(f"{len(ownership.team_ids)} equipas x {len(stages)} etapas em {time.perf_counter() - t0:.2f}s")
+    print(f"Pontos atribuídos: {int(team_points.sum())}")
+    print(f"✓ {count} resultados guardados em {output_file}")
+
+
+if __name__ == '__main__':
+    main()
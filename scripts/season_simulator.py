@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Simulador Monte Carlo de épocas para calibrar os escalões de preço.
+
+Os escalões ranking -> preço de price_tiers.py ("Top 10: 10-15M") foram
+afinados à mão. Este script simula milhares de épocas e mede quantos pontos
+fantasy cada escalão dá por milhão gasto, para os escalões assentarem em
+dados:
+
+- cada ciclista tem uma força por tipo de corrida: ranking^-ALPHA vezes a
+  afinidade da sua categoria (GC, CLIMBER, SPRINT, TT, HILLS, ONEDAY) com o
+  tipo de etapa ou com as clássicas;
+- em cada corrida alinha cada ciclista com probabilidade START_PROBABILITY e
+  a ordem de chegada é sorteada por Plackett-Luce (chave log(u) / força,
+  vetorizada para um bloco de épocas de uma vez);
+- os pontos são os da app: StagePointsTable x multiplicador do StageType
+  nas etapas e calculateOneDayPoints nas clássicas (sem camisolas nem
+  bónus de classificação geral);
+- os blocos de épocas correm num process pool, um por core.
+
+Uso:
+    pip install numpy
+    python season_simulator.py ciclistas.csv [--seasons 10000] [--workers n] [--seed 42]
+    python season_simulator.py --bench [n_epocas]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    print("A instalar numpy...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "numpy"])
+    import numpy as np
+
+from fantasy_rules import ONE_DAY_POINTS, STAGE_BASE_POINTS, STAGE_TYPES, game_category, stage_points
+from price_tiers import PRICE_FUNCTIONS, RANKING_TIERS, tier_of
+from rider_record import read_csv
+
+ONE_DAY = 'ONE_DAY'
+RACE_TYPES = STAGE_TYPES + [ONE_DAY]
+
+# Uma época: etapas de três grandes voltas + clássicas
+SEASON_CALENDAR: Dict[str, int] = {
+    'PROLOGUE': 1,
+    'FLAT': 24,
+    'HILLY': 14,
+    'MOUNTAIN': 18,
+    'ITT': 5,
+    'TTT': 1,
+    ONE_DAY: 25,
+}
+
+# Afinidade de cada categoria com cada tipo de corrida (ordem de RACE_TYPES)
+CATEGORY_AFFINITY: Dict[Optional[str], List[float]] = {
+    #          PROL  FLAT  HILLY MOUNT ITT   TTT   1-DAY
+    'GC':      [1.5, 0.3, 1.2, 3.0, 2.0, 1.0, 0.8],
+    'CLIMBER': [0.5, 0.2, 1.0, 3.5, 0.6, 1.0, 0.6],
+    'SPRINT':  [1.0, 4.0, 1.0, 0.1, 0.5, 1.0, 1.5],
+    'TT':      [3.0, 0.8, 0.7, 0.5, 4.0, 1.0, 0.8],
+    'HILLS':   [1.0, 0.6, 3.0, 1.0, 0.8, 1.0, 2.5],
+    'ONEDAY':  [1.0, 1.2, 2.0, 0.4, 0.8, 1.0, 3.5],
+    None:      [1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0],
+}
+
+ALPHA = 1.0
+START_PROBABILITY = 0.3
+UNRANKED = 400
+CHUNK_SEASONS = 500
+
+# Pontos por posição para cada tipo de corrida (índice 0 = 1.º lugar)
+RACE_POINTS = [np.array([stage_points(p, t) for p in sorted(STAGE_BASE_POINTS)], dtype=np.int32)
+               for t in STAGE_TYPES]
+RACE_POINTS.append(np.array([ONE_DAY_POINTS[p] for p in sorted(ONE_DAY_POINTS)], dtype=np.int32))
+
+
+def inverse_strength(rankings: np.ndarray, categories: Sequence[Optional[str]]) -> np.ndarray:
+    """1 / força de cada ciclista em cada tipo de corrida (tipos x ciclistas)."""
+    affinity = np.array([CATEGORY_AFFINITY[c] for c in categories], dtype=np.float64).T
+    strength = affinity * np.asarray(rankings, dtype=np.float64) ** -ALPHA
+    return (1 / strength).astype(np.float32)
+
+
+def simulate_chunk(inv_strength: np.ndarray, tiers: np.ndarray, n_seasons: int, seed) -> Dict:
+    """
+    Simula n_seasons épocas. Retorna somas por ciclista e pontos por escalão e época.
+
+    Corre num processo do pool, por isso só recebe e devolve arrays.
+    """
+    rng = np.random.default_rng(seed)
+    n_riders = inv_strength.shape[1]
+    points = np.zeros((n_seasons, n_riders), dtype=np.int32)
+    rows = np.arange(n_seasons)[:, None]
+    log_start = np.float32(np.log(START_PROBABILITY))
+
+    for t, race_type in enumerate(RACE_TYPES):
+        table = RACE_POINTS[t]
+        scored = min(len(table), n_riders)
+        for _ in range(SEASON_CALENDAR.get(race_type, 0)):
+            # u < p decide quem alinha; u / p continua uniforme e ordena a chegada
+            u = 1 - rng.random((n_seasons, n_riders), dtype=np.float32)  # (0, 1], sem log(0)
+            keys = (np.log(u) - log_start) * inv_strength[t]
+            keys[u >= START_PROBABILITY] = -np.inf
+            top = np.argpartition(-keys, scored - 1, axis=1)[:, :scored]
+            order = np.argsort(-np.take_along_axis(keys, top, axis=1), axis=1)
+            finishers = np.take_along_axis(top, order, axis=1)
+            started = np.isfinite(np.take_along_axis(keys, finishers, axis=1))
+            points[rows, finishers] += table[:scored] * started
+
+    tier_points = np.stack([points[:, tiers == k].sum(axis=1) for k in range(len(RANKING_TIERS))], axis=1)
+    as_float = points.astype(np.float64)
+    return {
+        'sum': as_float.sum(axis=0),
+        'sum_sq': (as_float ** 2).sum(axis=0),
+        'tier_points': tier_points,
+    }
+
+
+def simulate(rankings: Sequence[int], categories: Sequence[Optional[str]], n_seasons: int = 10_000,
+             workers: Optional[int] = None, seed: int = 42) -> Dict:
+    """Simula n_seasons épocas em blocos de CHUNK_SEASONS espalhados pelo process pool."""
+    rankings = np.asarray(rankings, dtype=np.int64)
+    inv_strength = inverse_strength(rankings, categories)
+    tiers = np.array([tier_of(r) for r in rankings.tolist()])
+
+    chunks = [min(CHUNK_SEASONS, n_seasons - start) for start in range(0, n_seasons, CHUNK_SEASONS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        results = [simulate_chunk(inv_strength, tiers, n, s) for n, s in zip(chunks, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(simulate_chunk, [inv_strength] * len(chunks),
+                                    [tiers] * len(chunks), chunks, seeds))
+
+    total = sum(r['sum'] for r in results)
+    total_sq = sum(r['sum_sq'] for r in results)
+    mean = total / n_seasons
+    return {
+        'rankings': rankings,
+        'tiers': tiers,
+        'mean': mean,
+        'std': np.sqrt(np.maximum(total_sq / n_seasons - mean ** 2, 0)),
+        'tier_points': np.concatenate([r['tier_points'] for r in results]),
+    }
+
+
+def tier_report(result: Dict, prices: np.ndarray, label: str):
+    """Pontos por milhão de cada escalão (média e intervalo p10-p90 entre épocas)."""
+    print(f"\nPreços {label}:")
+    print(f"  {'Escalão':<9} {'Ciclistas':>9} {'Preço médio':>12} {'Pontos/época':>13} "
+          f"{'Pontos/M':>9} {'p10-p90':>15}")
+    for k, (name, _last) in enumerate(RANKING_TIERS):
+        members = result['tiers'] == k
+        if not members.any():
+            continue
+        price_total = prices[members].sum()
+        per_million = result['tier_points'][:, k] / price_total
+        p10, p90 = np.percentile(per_million, [10, 90])
+        print(f"  {name:<9} {int(members.sum()):>9} {prices[members].mean():>11.1f}M "
+              f"{result['mean'][members].mean():>13.1f} {per_million.mean():>9.2f} "
+              f"{p10:>7.2f}-{p90:.2f}")
+
+
+def report(result: Dict):
+    for name, price_function in PRICE_FUNCTIONS.items():
+        prices = np.array([price_function(r) for r in result['rankings'].tolist()])
+        tier_report(result, prices, name)
+
+
+def benchmark(n_seasons: int = 10_000, n_riders: int = 600, seed: int = 42):
+    """Simula n_seasons épocas com n_riders ciclistas de ranking 1..n_riders."""
+    rng = np.random.default_rng(seed)
+    categories = [['GC', 'CLIMBER', 'SPRINT', 'TT', 'HILLS', 'ONEDAY'][i]
+                  for i in rng.integers(0, 6, n_riders).tolist()]
+    t0 = time.perf_counter()
+    result = simulate(np.arange(1, n_riders + 1), categories, n_seasons, seed=seed)
+    elapsed = time.perf_counter() - t0
+    races = sum(SEASON_CALENDAR.values())
+    print(f"{n_seasons:,} épocas x {races} corridas x {n_riders} ciclistas em {elapsed:.1f}s "
+          f"({os.cpu_count()} cores)")
+    report(result)
+
+    # Verificação: cada corrida distribui exatamente os pontos da tabela aos que alinham
+    check = simulate_chunk(inverse_strength(np.arange(1, n_riders + 1), categories),
+                           np.zeros(n_riders, dtype=np.int64), 50, 7)
+    expected = sum(SEASON_CALENDAR.get(t, 0) * int(RACE_POINTS[i].sum())
+                   for i, t in enumerate(RACE_TYPES))
+    if not np.all(check['tier_points'][:, 0] == expected):
+        raise AssertionError(f"Pontos por época {check['tier_points'][:3, 0]} != {expected}")
+    print(f"\n  Cada época distribui {expected} pontos ✓")
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--bench':
+        benchmark(int(args[1]) if len(args) > 1 else 10_000)
+        return
+
+    options = {'--seasons': 10_000, '--workers': 0, '--seed': 42}
+    for option in options:
+        if option in args:
+            pos = args.index(option)
+            options[option] = int(args[pos + 1])
+            del args[pos:pos + 2]
+
+    if len(args) != 1:
+        print("Uso: python season_simulator.py ciclistas.csv [--seasons 10000] [--workers n] [--seed 42]")
+        print("     python season_simulator.py --bench [n_epocas]")
+        sys.exit(1)
+
+    records = list(read_csv(args[0]))
+    rankings = [r.uci_ranking if r.uci_ranking and r.uci_ranking > 0 else UNRANKED for r in records]
+    categories = [game_category(r.category) or game_category(r.speciality) for r in records]
+    print(f"{len(records)} ciclistas ({sum(c is None for c in categories)} sem categoria da app)")
+
+    t0 = time.perf_counter()
+    result = simulate(rankings, categories, options['--seasons'],
+                      options['--workers'] or None, options['--seed'])
+    print(f"{options['--seasons']:,} épocas simuladas em {time.perf_counter() - t0:.1f}s")
+    report(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Tabela de ciclistas semelhantes por faixa de preço.
+
+Para as sugestões "ciclistas como X no teu orçamento" sem percorrer todos
+os ciclistas em cada pedido:
+
+- cada ciclista é um vetor com os pontos por especialidade do PCS
+  (points_per_speciality, ver fetch_rider_data em enrich_cyclists.py),
+  normalizado para norma 1;
+- a semelhança de cosseno é calculada por blocos de ciclistas com um
+  produto de matrizes, e para cada faixa de PRICE_BANDS ficam os TOP_K
+  vizinhos (argpartition), sem o próprio ciclista;
+- ciclistas sem pontos por especialidade não entram na tabela, e vizinhos
+  com semelhança <= 0 (nenhuma especialidade em comum) também não;
+- a tabela é exportada ao lado do CSV de ciclistas (cyclists_similar.csv).
+
+Uso:
+    pip install numpy
+    python similar_riders.py --bench [n_ciclistas]
+
+A tabela é gerada pelo enrich_cyclists.py no fim de cada execução.
+"""
+
+import csv
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("A instalar numpy...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "numpy"])
+    import numpy as np
+
+from rider_record import RiderRecord
+from speciality_classifier import points_matrix, speciality_points
+
+# Faixas de preço (nome, preço máximo; None = sem limite)
+PRICE_BANDS: List[Tuple[str, Optional[float]]] = [
+    ('Até 5M', 5.0),
+    ('5-8M', 8.0),
+    ('8-11M', 11.0),
+    ('Mais de 11M', None),
+]
+
+TOP_K = 5
+BLOCK_SIZE = 1024
+
+NEIGHBOUR_FIELDNAMES = ['rider', 'team', 'price_band', 'rank', 'similar_rider',
+                        'similar_team', 'similar_price', 'similarity']
+
+
+def band_of(prices: np.ndarray) -> np.ndarray:
+    """Índice em PRICE_BANDS de cada preço."""
+    limits = np.array([last for _name, last in PRICE_BANDS[:-1]])
+    return np.searchsorted(limits, np.asarray(prices, dtype=np.float64), side='left')
+
+
+def unit_vectors(matrix: np.ndarray) -> np.ndarray:
+    """Normaliza cada linha para norma 1 (linhas a zero ficam a zero)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def neighbour_table(vectors: np.ndarray, prices: Sequence[float], k: int = TOP_K,
+                    block_size: int = BLOCK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k vizinhos de cada ciclista em cada faixa de preço.
+
+    Retorna (índices, semelhanças), ambos ciclistas x faixas x k, por ordem
+    decrescente de semelhança. Posições sem vizinho (ou só com semelhança
+    <= 0) têm índice -1.
+    """
+    n = len(vectors)
+    bands = band_of(prices)
+    has_points = np.any(vectors != 0, axis=1)
+    indices = np.full((n, len(PRICE_BANDS), k), -1, dtype=np.int64)
+    similarity = np.zeros((n, len(PRICE_BANDS), k), dtype=np.float32)
+
+    for b in range(len(PRICE_BANDS)):
+        members = np.flatnonzero((bands == b) & has_points)
+        if len(members) == 0:
+            continue
+        band_vectors = vectors[members]
+        kk = min(k, len(members))
+
+        for start in range(0, n, block_size):
+            rows = np.arange(start, min(start + block_size, n))
+            scores = vectors[rows] @ band_vectors.T
+            # O próprio ciclista não conta como vizinho
+            own = np.flatnonzero(bands[rows] == b)
+            if len(own):
+                scores[own, np.searchsorted(members, rows[own])] = -np.inf
+            top = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+            found = np.isfinite(top_scores) & (top_scores > 0)
+            indices[rows, b, :kk] = np.where(found, members[top], -1)
+            similarity[rows, b, :kk] = np.where(found, top_scores, 0)
+
+    indices[~has_points] = -1
+    similarity[~has_points] = 0
+    return indices, similarity
+
+
+def similar_riders(cyclists: Sequence[RiderRecord], points: Sequence[Optional[Dict[str, int]]],
+                   k: int = TOP_K) -> List[Dict]:
+    """Linhas da tabela de vizinhos (NEIGHBOUR_FIELDNAMES) para os ciclistas dados."""
+    vectors = unit_vectors(points_matrix(points))
+    indices, similarity = neighbour_table(vectors, [c.price for c in cyclists], k)
+
+    rows = []
+    for i, cyclist in enumerate(cyclists):
+        for b, (band_name, _last) in enumerate(PRICE_BANDS):
+            for rank, j in enumerate(indices[i, b].tolist(), 1):
+                if j < 0:
+                    break
+                other = cyclists[j]
+                rows.append({
+                    'rider': cyclist.full_name,
+                    'team': cyclist.team,
+                    'price_band': band_name,
+                    'rank': rank,
+                    'similar_rider': other.full_name,
+                    'similar_team': other.team,
+                    'similar_price': other.price,
+                    'similarity': round(float(similarity[i, b, rank - 1]), 4),
+                })
+    return rows
+
+
+def neighbours_path(output_file: str) -> str:
+    """cyclists.csv -> cyclists_similar.csv"""
+    base, ext = os.path.splitext(output_file)
+    return f"{base}_similar{ext or '.csv'}"
+
+
+def write_neighbours(output_file: str, cyclists: Sequence[RiderRecord],
+                     points: Sequence[Optional[Dict[str, int]]], k: int = TOP_K) -> str:
+    """Escreve a tabela de vizinhos ao lado do CSV de ciclistas. Retorna o caminho."""
+    path = neighbours_path(output_file)
+    rows = similar_riders(cyclists, points, k)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=NEIGHBOUR_FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+def naive_neighbours(vectors: np.ndarray, prices: Sequence[float], i: int, band: int,
+                     k: int = TOP_K) -> List[int]:
+    """Varrimento de todos os ciclistas para um pedido (referência)."""
+    bands = band_of(prices)
+    candidates = []
+    for j in range(len(vectors)):
+        score = float(np.dot(vectors[i], vectors[j]))
+        if j != i and bands[j] == band and score > 0:
+            candidates.append((-score, j))
+    candidates.sort()
+    return [j for _score, j in candidates[:k]]
+
+
+def benchmark(n_riders: int = 20_000, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    raw = rng.gamma(0.6, 500, (n_riders, 6))
+    raw[rng.random(raw.shape) < 0.2] = 0
+    prices = np.round(rng.uniform(3, 15, n_riders), 1)
+    vectors = unit_vectors(raw)
+
+    t0 = time.perf_counter()
+    indices, similarity = neighbour_table(vectors, prices)
+    elapsed = time.perf_counter() - t0
+    print(f"{n_riders:,} ciclistas x {len(PRICE_BANDS)} faixas x top {TOP_K}: {elapsed:.2f}s")
+
+    sample = rng.choice(n_riders, 20, replace=False)
+    t0 = time.perf_counter()
+    for i in sample.tolist():
+        for b in range(len(PRICE_BANDS)):
+            expected = naive_neighbours(vectors, prices, i, b)
+            got = indices[i, b, :len(expected)].tolist()
+            # Empates podem trocar a ordem; compara as semelhanças
+            got_scores = np.round(vectors[got] @ vectors[i], 5).tolist()
+            expected_scores = np.round(vectors[expected] @ vectors[i], 5).tolist()
+            if got_scores != expected_scores:
+                raise AssertionError(f"Ciclista {i}, faixa {b}: {got} != {expected}")
+    per_request = (time.perf_counter() - t0) / (len(sample) * len(PRICE_BANDS))
+    print(f"  Varrimento por pedido: {per_request * 1000:.1f} ms")
+    print(f"  {len(sample)} ciclistas iguais ao varrimento ✓")
+
+    # Dicts com a forma de Rider(...).parse() do procyclingstats
+    parsed = [
+        {'name': 'POGAČAR Tadej', 'nationality': 'SI', 'birthdate': '1998-9-21',
+         'points_per_speciality': {'one_day_races': 3600, 'gc': 5200, 'time_trial': 1300,
+                                   'sprint': 600, 'climber': 4700, 'hills': 2100}},
+        {'name': 'VINGEGAARD Jonas', 'nationality': 'DK', 'birthdate': '1996-12-10',
+         'points_per_speciality': {'one_day_races': 400, 'gc': 3500, 'time_trial': 900,
+                                   'sprint': 100, 'climber': 3300, 'hills': 500}},
+        {'name': 'PHILIPSEN Jasper', 'nationality': 'BE', 'birthdate': '1998-3-2',
+         'points_per_speciality': {'one_day_races': 0, 'gc': 0, 'time_trial': 0,
+                                   'sprint': 4100, 'climber': 0, 'hills': 0}},
+        {'name': 'BUITRAGO Santiago', 'nationality': 'CO', 'birthdate': '1999-9-26',
+         'points_per_speciality': {'one_day_races': 0, 'gc': 0, 'time_trial': 0,
+                                   'sprint': 0, 'climber': 2400, 'hills': 0}},
+    ]
+    riders = [RiderRecord(d['name'].split()[1], d['name'].split()[0], price=12.0) for d in parsed]
+    rows = similar_riders(riders, [speciality_points(d) for d in parsed])
+    pairs = {(r['rider'], r['similar_rider']) for r in rows}
+    if not rows or any(r['similarity'] <= 0 for r in rows):
+        raise AssertionError(f"Vizinhos sem pontos por especialidade ou com semelhança 0: {rows}")
+    sprinter_climber = (riders[2].full_name, riders[3].full_name)
+    if sprinter_climber in pairs or (riders[0].full_name, riders[1].full_name) not in pairs:
+        raise AssertionError(f"Vizinhos errados: {sorted(pairs)}")
+    print("  Pontos do Rider.parse() lidos, sem vizinhos com semelhança <= 0 ✓")
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--bench':
+        benchmark(int(args[1]) if len(args) > 1 else 20_000)
+        return
+
+    print("Uso: python similar_riders.py --bench [n_ciclistas]")
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
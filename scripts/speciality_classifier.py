@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Classificador de especialidade e categoria dos ciclistas.
+
+Substitui as três versões que havia nos scripts (determine_category e
+get_speciality_name em enrich_cyclists.py, os "if 'sprint' in ..." de
+extract_cyclists.py / extract_riders.py e as listas de nomes de
+enrich_from_cyclingranking.py):
+
+- recebe uma matriz ciclistas x especialidades com os pontos do PCS
+  (points_per_speciality) e classifica todos os ciclistas de uma vez;
+- cada linha é normalizada pelo total (quota de cada especialidade, com
+  pesos opcionais por especialidade) e a principal é o argmax;
+- margin: se a principal não bater a segunda por pelo menos esta quota, o
+  ciclista fica "All-rounder" / ROULEUR;
+- secondary_share: a segunda especialidade só é dada se tiver pelo menos
+  esta quota;
+- aceita chaves com '-' ou '_' ("one-day-races" / "one_day_races").
+
+Uso:
+    pip install numpy
+    python speciality_classifier.py --bench [n_ciclistas]
+"""
+
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("A instalar numpy...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "numpy"])
+    import numpy as np
+
+# Especialidades do PCS (ordem das colunas da matriz)
+SPECIALITIES = ['one_day_races', 'gc', 'time_trial', 'sprint', 'climber', 'hills']
+
+SPECIALITY_NAMES = {
+    'one_day_races': 'Classics',
+    'gc': 'GC',
+    'time_trial': 'Time Trial',
+    'sprint': 'Sprinter',
+    'climber': 'Climber',
+    'hills': 'Puncheur',
+}
+
+SPECIALITY_CATEGORY = {
+    'one_day_races': 'CLASSICS',
+    'gc': 'GC',
+    'time_trial': 'ROULEUR',
+    'sprint': 'SPRINTER',
+    'climber': 'CLIMBER',
+    'hills': 'CLASSICS',
+}
+
+ALL_ROUNDER = 'All-rounder'
+DEFAULT_CATEGORY = 'ROULEUR'
+
+# Ciclistas conhecidos, para quando não há pontos por especialidade
+KNOWN_RIDERS: Dict[str, List[str]] = {
+    'SPRINTER': ['philipsen', 'milan', 'groenewegen', 'merlier', 'ackermann',
+                 'cavendish', 'jakobsen', 'kooij', 'de lie', 'groves', 'matthews'],
+    'GC': ['pogačar', 'pogacar', 'vingegaard', 'evenepoel', 'roglic', 'roglič',
+           'almeida', 'ayuso', 'rodriguez', 'yates', 'mas', 'carapaz', 'bernal',
+           'hindley', 'vlasov', 'tiberi', 'jorgenson', 'uijtdebroeks', 'thomas'],
+    'CLIMBER': ['healy', 'vine', 'gaudu', 'martinez', 'bilbao', 'landa', 'ciccone',
+                'buitrago', 'quintana', 'kuss', 'powless', 'bardet', 'gall'],
+    'CLASSICS': ['van der poel', 'van aert', 'pidcock', 'pedersen', 'asgreen',
+                 'mohoric', 'mohorič', 'alaphilippe', 'laporte', 'van baarle', 'benoot'],
+}
+
+
+def speciality_key(key: str) -> str:
+    """Normaliza a chave do PCS ("One-Day-Races" -> "one_day_races")."""
+    return key.strip().lower().replace('-', '_').replace(' ', '_')
+
+
+def speciality_points(rider: Dict) -> Dict[str, int]:
+    """Pontos por especialidade de um Rider(...).parse() do PCS (chave points_per_speciality)."""
+    return rider.get('points_per_speciality') or {}
+
+
+def points_matrix(points: Sequence[Optional[Dict[str, int]]]) -> np.ndarray:
+    """Matriz ciclistas x SPECIALITIES a partir dos dicts points_per_speciality."""
+    column = {s: j for j, s in enumerate(SPECIALITIES)}
+    matrix = np.zeros((len(points), len(SPECIALITIES)), dtype=np.float64)
+    for i, row in enumerate(points):
+        for key, value in (row or {}).items():
+            j = column.get(speciality_key(key))
+            if j is not None and value:
+                matrix[i, j] = float(value)
+    return matrix
+
+
+class Classification:
+    """Resultado de classify: índices em SPECIALITIES (-1 = nenhuma) e quotas."""
+
+    def __init__(self, primary: np.ndarray, secondary: np.ndarray, shares: np.ndarray):
+        self.primary = primary
+        self.secondary = secondary
+        self.shares = shares
+
+    def __len__(self) -> int:
+        return len(self.primary)
+
+    def category(self, i: int) -> str:
+        j = self.primary[i]
+        return SPECIALITY_CATEGORY[SPECIALITIES[j]] if j >= 0 else DEFAULT_CATEGORY
+
+    def speciality(self, i: int) -> str:
+        j = self.primary[i]
+        return SPECIALITY_NAMES[SPECIALITIES[j]] if j >= 0 else ALL_ROUNDER
+
+    def secondary_speciality(self, i: int) -> str:
+        j = self.secondary[i]
+        return SPECIALITY_NAMES[SPECIALITIES[j]] if j >= 0 else ''
+
+    def categories(self) -> List[str]:
+        return [self.category(i) for i in range(len(self))]
+
+    def specialities(self) -> List[str]:
+        return [self.speciality(i) for i in range(len(self))]
+
+
+def classify(matrix: np.ndarray, weights: Optional[Sequence[float]] = None,
+             margin: float = 0.0, secondary_share: float = 0.2) -> Classification:
+    """
+    Classifica todos os ciclistas numa passagem.
+
+    weights multiplica cada coluna antes de normalizar (ex.: para compensar
+    especialidades que dão mais pontos no PCS). Linhas sem pontos ficam sem
+    especialidade.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    if weights is not None:
+        matrix = matrix * np.asarray(weights, dtype=np.float64)
+    total = matrix.sum(axis=1, keepdims=True)
+    shares = np.divide(matrix, total, out=np.zeros_like(matrix), where=total > 0)
+
+    # Duas maiores quotas de cada linha (argsort estável: empate fica na primeira coluna)
+    order = np.argsort(-shares, axis=1, kind='stable')
+    first, second = order[:, 0], order[:, 1]
+    rows = np.arange(len(shares))
+    first_share, second_share = shares[rows, first], shares[rows, second]
+
+    decisive = (first_share > 0) & (first_share - second_share >= margin)
+    primary = np.where(decisive, first, -1)
+    secondary = np.where(decisive & (second_share > 0) & (second_share >= secondary_share), second, -1)
+    return Classification(primary, secondary, shares)
+
+
+def classify_rider(points: Optional[Dict[str, int]], **options) -> Tuple[str, str, str]:
+    """(especialidade, categoria, especialidade secundária) de um só ciclista."""
+    result = classify(points_matrix([points]), **options)
+    return result.speciality(0), result.category(0), result.secondary_speciality(0)
+
+
+def category_from_name(name: str) -> str:
+    """Categoria por nome de ciclista conhecido (fallback sem pontos por especialidade)."""
+    name_lower = name.lower()
+    for category, names in KNOWN_RIDERS.items():
+        if any(n in name_lower for n in names):
+            return category
+    return DEFAULT_CATEGORY
+
+
+def reference_classify(points: Dict[str, int]) -> Tuple[str, str]:
+    """Versão escalar (um ciclista de cada vez), para verificar classify."""
+    best, best_points = None, 0
+    for key, value in points.items():
+        if value and value > best_points:
+            best, best_points = speciality_key(key), value
+    if best is None:
+        return ALL_ROUNDER, DEFAULT_CATEGORY
+    return SPECIALITY_NAMES[best], SPECIALITY_CATEGORY[best]
+
+
+def benchmark(n_riders: int = 100_000, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    raw = rng.integers(0, 3000, (n_riders, len(SPECIALITIES)))
+    raw[rng.random(raw.shape) < 0.3] = 0
+    keys = [s.replace('_', '-') if k % 2 else s for k, s in enumerate(SPECIALITIES)]
+    dicts = [dict(zip(keys, row)) for row in raw.tolist()]
+
+    t0 = time.perf_counter()
+    matrix = points_matrix(dicts)
+    t1 = time.perf_counter()
+    result = classify(matrix)
+    categories = result.categories()
+    t2 = time.perf_counter()
+    expected = [reference_classify(d) for d in dicts]
+    t3 = time.perf_counter()
+
+    print(f"{n_riders:,} ciclistas:")
+    print(f"  matriz:      {(t1 - t0) * 1000:8.1f} ms")
+    print(f"  classify:    {(t2 - t1) * 1000:8.1f} ms")
+    print(f"  escalar:     {(t3 - t2) * 1000:8.1f} ms")
+
+    for i, (speciality, category) in enumerate(expected):
+        if (result.speciality(i), categories[i]) != (speciality, category):
+            raise AssertionError(f"Ciclista {i} {dicts[i]}: {result.speciality(i)}/{categories[i]} "
+                                 f"!= {speciality}/{category}")
+    print("  Igual à versão escalar ✓")
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--bench':
+        benchmark(int(args[1]) if len(args) > 1 else 100_000)
+        return
+
+    print("Uso: python speciality_classifier.py --bench [n_ciclistas]")
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
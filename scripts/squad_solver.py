@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Plantel ótimo para um orçamento (calibração de preços).
+
+Para verificar se os preços do calculate_price dão um jogo equilibrado,
+calcula o melhor plantel que cada orçamento consegue comprar, com as
+regras do FantasyGameRules:
+
+- 15 ciclistas com a composição exata por categoria (3 GC, 3 CLIMBER,
+  3 SPRINT, 2 TT, 2 HILLS, 2 ONEDAY);
+- custo total <= orçamento (100M por omissão);
+- no máximo 3 ciclistas da mesma equipa.
+
+Como funciona:
+1. Os preços passam a inteiros em unidades de 0.1M (orçamento 100M = 1000).
+2. Por categoria, uma mochila 0/1 com número exato de escolhas dá o melhor
+   total para cada custo (vetorizada em NumPy sobre o orçamento).
+3. As categorias combinam-se por convolução (max, +) sobre o orçamento.
+4. O limite por equipa resolve-se por branch-and-bound: se a solução tiver
+   4+ ciclistas de uma equipa, ramifica excluindo um deles de cada vez; a
+   programação dinâmica de cada ramo é o limite superior.
+
+Os pontos esperados vêm de um CSV (first_name,last_name,expected_points);
+sem ele usa-se uma aproximação pelo ranking UCI (1000 / (ranking + 9)).
+
+Uso:
+    pip install numpy
+    python squad_solver.py cyclists.csv [--points points.csv] [--budget 100] [--what-if precos1.csv ...]
+    python squad_solver.py --bench
+
+As tabelas --what-if são CSVs de ciclistas (mesmo esquema) com outros
+preços; cada uma é resolvida com o mesmo conjunto de ciclistas e pontos.
+"""
+
+import csv
+import heapq
+import sys
+import time
+from itertools import combinations, product
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("A instalar numpy...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "numpy"])
+    import numpy as np
+
+from fantasy_rules import (
+    CATEGORY_REQUIREMENTS, INITIAL_BUDGET, MAX_FROM_SAME_PRO_TEAM, game_category,
+)
+from rider_record import RiderRecord, read_csv
+
+PRICE_UNIT = 0.1
+CATEGORIES = list(CATEGORY_REQUIREMENTS)
+
+NEG_INF = float('-inf')
+
+
+def to_units(price: float) -> int:
+    """Preço em milhões -> unidades de 0.1M."""
+    return int(round(price / PRICE_UNIT))
+
+
+def ranking_points(ranking: Optional[int]) -> float:
+    """Pontos esperados aproximados a partir do ranking UCI (sem ranking: 0)."""
+    if not ranking or ranking <= 0:
+        return 0.0
+    return round(1000 / (ranking + 9), 1)
+
+
+class RiderPool:
+    """Ciclistas elegíveis em colunas: categoria, equipa, custo e pontos."""
+
+    def __init__(self, names: Sequence[str], teams: Sequence[str], categories: Sequence[str],
+                 prices: Sequence[float], points: Sequence[float]):
+        self.names = list(names)
+        self.teams = list(teams)
+        self.category = np.array([CATEGORIES.index(c) for c in categories], dtype=np.int64)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.cost = np.array([to_units(p) for p in self.prices], dtype=np.int64)
+        self.points = np.asarray(points, dtype=np.float64)
+
+    @classmethod
+    def from_records(cls, records: Sequence[RiderRecord],
+                     points_by_name: Optional[Dict[str, float]] = None) -> 'RiderPool':
+        """Só entram ciclistas com uma categoria que a app aceita."""
+        names, teams, categories, prices, points = [], [], [], [], []
+        for record in records:
+            category = game_category(record.category) or game_category(record.speciality)
+            if category is None:
+                continue
+            names.append(record.full_name)
+            teams.append(record.team)
+            categories.append(category)
+            prices.append(record.price)
+            if points_by_name is not None:
+                points.append(points_by_name.get(record.full_name.lower(), 0.0))
+            else:
+                points.append(ranking_points(record.uci_ranking))
+        return cls(names, teams, categories, prices, points)
+
+    def with_prices(self, prices: Sequence[float]) -> 'RiderPool':
+        """Mesmos ciclistas e pontos com outra tabela de preços."""
+        pool = RiderPool.__new__(RiderPool)
+        pool.names, pool.teams, pool.category = self.names, self.teams, self.category
+        pool.points = self.points
+        pool.prices = np.asarray(prices, dtype=np.float64)
+        pool.cost = np.array([to_units(p) for p in pool.prices], dtype=np.int64)
+        return pool
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class Squad:
+    """Um plantel: índices dos ciclistas no RiderPool, custo e pontos."""
+
+    def __init__(self, pool: RiderPool, riders: Sequence[int]):
+        self.pool = pool
+        self.riders = sorted(riders, key=lambda i: (pool.category[i], -pool.points[i]))
+        self.cost = int(pool.cost[self.riders].sum()) if self.riders else 0
+        self.points = float(pool.points[self.riders].sum()) if self.riders else 0.0
+
+    @property
+    def price(self) -> float:
+        return round(self.cost * PRICE_UNIT, 1)
+
+    def overfull_team(self) -> Optional[str]:
+        """Uma equipa com mais de MAX_FROM_SAME_PRO_TEAM ciclistas, ou None."""
+        counts: Dict[str, int] = {}
+        for i in self.riders:
+            team = self.pool.teams[i]
+            if team:
+                counts[team] = counts.get(team, 0) + 1
+                if counts[team] > MAX_FROM_SAME_PRO_TEAM:
+                    return team
+        return None
+
+    def print(self):
+        for i in self.riders:
+            print(f"  {CATEGORIES[self.pool.category[i]]:<8} {self.pool.names[i]:<30} "
+                  f"{self.pool.teams[i][:28]:<28} €{self.pool.prices[i]:>5.1f}M  {self.pool.points[i]:>6.1f}")
+        print(f"  Total: €{self.price:.1f}M, {self.points:.1f} pontos")
+
+
+def category_table(cost: np.ndarray, points: np.ndarray, k: int, budget: int
+                   ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mochila 0/1 com exatamente k escolhas.
+
+    best[j, b] = melhores pontos com j ciclistas e custo <= b (-inf se impossível);
+    take[i, j, b] = o ciclista i entra na melhor solução (j, b) dos primeiros i+1.
+    """
+    best = np.full((k + 1, budget + 1), NEG_INF)
+    best[0] = 0.0
+    take = np.zeros((len(cost), k + 1, budget + 1), dtype=bool)
+    for i, (c, p) in enumerate(zip(cost.tolist(), points.tolist())):
+        if c > budget:
+            continue
+        for j in range(k, 0, -1):
+            candidate = best[j - 1, :budget + 1 - c] + p
+            better = candidate > best[j, c:]
+            take[i, j, c:] = better
+            best[j, c:][better] = candidate[better]
+    return best, take
+
+
+def combine(left: np.ndarray, right: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convolução (max, +) de duas curvas "melhor com custo <= b".
+
+    Retorna (curva, split) com split[b] = orçamento dado à curva da esquerda.
+    Como as curvas não decrescem, só interessam os b em que left sobe.
+    """
+    size = len(left)
+    result = np.full(size, NEG_INF)
+    split = np.zeros(size, dtype=np.int64)
+    steps = np.flatnonzero(np.isfinite(left) & (left > np.concatenate(([NEG_INF], left[:-1]))))
+    for a in steps.tolist():
+        candidate = left[a] + right[:size - a]
+        better = candidate > result[a:]
+        result[a:][better] = candidate[better]
+        split[a:][better] = a
+    return result, split
+
+
+class SquadSolver:
+    """Programação dinâmica por categoria + branch-and-bound no limite por equipa."""
+
+    def __init__(self, pool: RiderPool, budget: float = INITIAL_BUDGET):
+        self.pool = pool
+        self.budget = to_units(budget)
+        self.members = [np.flatnonzero(pool.category == c) for c in range(len(CATEGORIES))]
+        self._tables: Dict[Tuple[int, FrozenSet[int]], Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self.nodes = 0
+
+    def _table(self, c: int, excluded: FrozenSet[int]):
+        """Tabela da categoria c sem os ciclistas excluídos (em cache)."""
+        key = (c, excluded)
+        if key not in self._tables:
+            riders = np.array([i for i in self.members[c].tolist() if i not in excluded], dtype=np.int64)
+            best, take = category_table(self.pool.cost[riders], self.pool.points[riders],
+                                        CATEGORY_REQUIREMENTS[CATEGORIES[c]], self.budget)
+            self._tables[key] = (riders, best, take)
+        return self._tables[key]
+
+    def relaxed(self, excluded: FrozenSet[int] = frozenset()) -> Optional[Squad]:
+        """Melhor plantel ignorando o limite por equipa (None se não houver)."""
+        self.nodes += 1
+        tables = []
+        for c in range(len(CATEGORIES)):
+            cat_excluded = frozenset(i for i in excluded if self.pool.category[i] == c)
+            riders, best, take = self._table(c, cat_excluded)
+            tables.append((riders, best[-1], take))
+
+        curve = tables[0][1]
+        splits = []
+        for _riders, right, _take in tables[1:]:
+            curve, split = combine(curve, right)
+            splits.append(split)
+        if not np.isfinite(curve[-1]):
+            return None
+
+        # Reconstrução: orçamento de cada categoria, da última para a primeira
+        budgets = [0] * len(tables)
+        b = self.budget
+        for c in range(len(tables) - 1, 0, -1):
+            a = int(splits[c - 1][b])
+            budgets[c] = b - a
+            b = a
+        budgets[0] = b
+
+        chosen = []
+        for (riders, _best, take), b in zip(tables, budgets):
+            j = take.shape[1] - 1
+            for i in range(len(riders) - 1, -1, -1):
+                if j == 0:
+                    break
+                if take[i, j, b]:
+                    chosen.append(int(riders[i]))
+                    b -= int(self.pool.cost[riders[i]])
+                    j -= 1
+        return Squad(self.pool, chosen)
+
+    def solve(self) -> Optional[Squad]:
+        """Plantel ótimo com todas as regras (None se não houver plantel possível)."""
+        root = self.relaxed()
+        if root is None:
+            return None
+        heap = [(-root.points, 0, frozenset(), root)]
+        seen = {frozenset()}
+        counter = 1
+        while heap:
+            _bound, _, excluded, squad = heapq.heappop(heap)
+            team = squad.overfull_team()
+            if team is None:
+                # Primeiro plantel válido a sair da fila: nenhum ramo pode ter mais pontos
+                return squad
+            # Uma solução válida deixa de fora pelo menos um destes
+            for i in squad.riders:
+                if self.pool.teams[i] != team:
+                    continue
+                child = excluded | {i}
+                if child in seen:
+                    continue
+                seen.add(child)
+                child_squad = self.relaxed(child)
+                if child_squad is not None:
+                    heapq.heappush(heap, (-child_squad.points, counter, child, child_squad))
+                    counter += 1
+        return None
+
+
+def solve(pool: RiderPool, budget: float = INITIAL_BUDGET) -> Optional[Squad]:
+    return SquadSolver(pool, budget).solve()
+
+
+def solve_many(pool: RiderPool, price_tables: Sequence[Sequence[float]],
+               budget: float = INITIAL_BUDGET) -> List[Optional[Squad]]:
+    """Plantel ótimo para cada tabela de preços (what-if)."""
+    return [solve(pool.with_prices(prices), budget) for prices in price_tables]
+
+
+def brute_force(pool: RiderPool, budget: float = INITIAL_BUDGET) -> Optional[Tuple[float, int]]:
+    """Todas as combinações (só para conjuntos pequenos, para verificação)."""
+    budget_units = to_units(budget)
+    per_category = [list(combinations(np.flatnonzero(pool.category == c).tolist(),
+                                      CATEGORY_REQUIREMENTS[name]))
+                    for c, name in enumerate(CATEGORIES)]
+    best = None
+    for picks in product(*per_category):
+        squad = Squad(pool, [i for pick in picks for i in pick])
+        if squad.cost > budget_units or squad.overfull_team() is not None:
+            continue
+        if best is None or squad.points > best[0]:
+            best = (squad.points, squad.cost)
+    return best
+
+
+def random_pool(rng, n_riders: int, n_teams: int) -> RiderPool:
+    categories = [CATEGORIES[i % len(CATEGORIES)] for i in range(n_riders)]
+    teams = [f"Equipa {t}" for t in rng.integers(0, n_teams, n_riders).tolist()]
+    points = np.round(rng.gamma(2.0, 40.0, n_riders), 1)
+    # Preço correlacionado com os pontos, com ruído, entre 3M e 15M
+    prices = np.clip(np.round(3.0 + points / 20 + rng.normal(0, 1.0, n_riders), 1), 3.0, 15.0)
+    return RiderPool([f"Ciclista {i}" for i in range(n_riders)], teams, categories, prices, points)
+
+
+def benchmark(n_riders: int = 600, n_tables: int = 100, seed: int = 42):
+    """Mede o tempo de resolver um conjunto de n_riders e n_tables what-if."""
+    rng = np.random.default_rng(seed)
+
+    # Verificação contra força bruta em conjuntos pequenos (4 por categoria)
+    for _ in range(20):
+        pool = random_pool(rng, 24, 6)
+        squad = solve(pool, 90.0)
+        expected = brute_force(pool, 90.0)
+        got = None if squad is None else (squad.points, squad.cost)
+        if (expected is None) != (got is None) or (got and abs(got[0] - expected[0]) > 1e-9):
+            raise AssertionError(f"Solver {got} != força bruta {expected}")
+    print("Igual à força bruta em 20 conjuntos pequenos ✓")
+
+    pool = random_pool(rng, n_riders, 30)
+    t0 = time.perf_counter()
+    solver = SquadSolver(pool)
+    squad = solver.solve()
+    t1 = time.perf_counter()
+    print(f"\n{n_riders} ciclistas: {(t1 - t0) * 1000:.1f}ms ({solver.nodes} nós)")
+    squad.print()
+
+    tables = [np.clip(np.round(pool.prices * rng.uniform(0.8, 1.2, n_riders), 1), 1.0, 25.0)
+              for _ in range(n_tables)]
+    t0 = time.perf_counter()
+    squads = solve_many(pool, tables)
+    t1 = time.perf_counter()
+    points = [s.points for s in squads if s is not None]
+    print(f"\n{n_tables} tabelas what-if: {t1 - t0:.2f}s ({(t1 - t0) / n_tables * 1000:.1f}ms cada)")
+    print(f"  Pontos do plantel ótimo: min {min(points):.1f}, max {max(points):.1f}")
+
+
+def read_points(filename: str) -> Dict[str, float]:
+    points = {}
+    with open(filename, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            name = f"{row.get('first_name', '')} {row.get('last_name', '')}".strip().lower()
+            try:
+                points[name] = float(row.get('expected_points') or 0)
+            except ValueError:
+                points[name] = 0.0
+    return points
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--bench':
+        benchmark()
+        return
+    if not args:
+        print("Uso: python squad_solver.py cyclists.csv [--points points.csv] [--budget 100] [--what-if precos.csv ...]")
+        print("     python squad_solver.py --bench")
+        sys.exit(1)
+
+    budget = INITIAL_BUDGET
+    points_by_name = None
+    what_if: List[str] = []
+    if '--what-if' in args:
+        pos = args.index('--what-if')
+        what_if = args[pos + 1:]
+        args = args[:pos]
+    if '--points' in args:
+        pos = args.index('--points')
+        points_by_name = read_points(args[pos + 1])
+        del args[pos:pos + 2]
+    if '--budget' in args:
+        pos = args.index('--budget')
+        budget = float(args[pos + 1])
+        del args[pos:pos + 2]
+
+    records = list(read_csv(args[0]))
+    pool = RiderPool.from_records(records, points_by_name)
+    print(f"{len(pool)} de {len(records)} ciclistas com categoria válida")
+    for c, name in enumerate(CATEGORIES):
+        available = int((pool.category == c).sum())
+        if available < CATEGORY_REQUIREMENTS[name]:
+            print(f"  ⚠ {name}: {available} ciclistas, o plantel precisa de {CATEGORY_REQUIREMENTS[name]}")
+
+    t0 = time.perf_counter()
+    squad = solve(pool, budget)
+    print(f"Orçamento €{budget:.1f}M ({(time.perf_counter() - t0) * 1000:.1f}ms)")
+    if squad is None:
+        print("✗ Nenhum plantel possível (faltam ciclistas numa categoria ou o orçamento não chega)")
+    else:
+        squad.print()
+
+    for filename in what_if:
+        prices_by_name = {r.full_name: r.price for r in read_csv(filename)}
+        prices = [prices_by_name.get(name, price) for name, price in zip(pool.names, pool.prices)]
+        result = solve_many(pool, [prices], budget)[0]
+        if result is None:
+            print(f"{filename}: nenhum plantel possível")
+        else:
+            print(f"{filename}: {result.points:.1f} pontos por €{result.price:.1f}M")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Índice de nomes canónicos de equipas.
+
+O mesmo nome aparece escrito de várias formas: "Alpecin–Premier Tech"
+(travessão da Wikipedia), "Alpecin-Premier Tech", "UAE Team Emirates" vs
+"UAE Team Emirates-XRG", "Groupama-FDJ" vs "Groupama-FDJ United", slugs do
+PCS ("alpecin-premier-tech-2026")...
+
+team_key() normaliza um nome (acentos, hífens/travessões, maiúsculas,
+palavras genéricas como "Team"/"Cycling", anos e ordem das palavras) e
+TEAM_INDEX, precalculado ao importar o módulo, mapeia essa chave para o nome
+canónico. Resolver uma equipa é um lookup O(1) num dicionário.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+# Nível de cada equipa
+WORLDTEAM = 'WT'
+PROTEAM = 'PRT'
+
+# Nome canónico -> nível e aliases (nomes antigos de patrocinadores, abreviaturas)
+TEAMS: Dict[str, Dict] = {
+    'Alpecin-Premier Tech': {'level': WORLDTEAM, 'aliases': [
+        'Alpecin-Deceuninck', 'Alpecin', 'Alpecin-Fenix']},
+    'Bahrain Victorious': {'level': WORLDTEAM, 'aliases': [
+        'Team Bahrain Victorious', 'Bahrain']},
+    'Decathlon-CMA CGM': {'level': WORLDTEAM, 'aliases': [
+        'Decathlon CMA CGM Team', 'Decathlon-AG2R', 'Decathlon AG2R La Mondiale',
+        'AG2R Citroën', 'Decathlon']},
+    'EF Education-EasyPost': {'level': WORLDTEAM, 'aliases': [
+        'EF Education', 'EF Education First', 'EF']},
+    'Groupama-FDJ United': {'level': WORLDTEAM, 'aliases': [
+        'Groupama-FDJ', 'FDJ', 'FDJ United']},
+    'INEOS Grenadiers': {'level': WORLDTEAM, 'aliases': [
+        'Ineos', 'Team INEOS']},
+    'Lidl-Trek': {'level': WORLDTEAM, 'aliases': [
+        'Trek-Segafredo', 'Trek']},
+    'Lotto-Intermarché': {'level': WORLDTEAM, 'aliases': [
+        'Lotto', 'Lotto Dstny', 'Intermarché-Wanty', 'Intermarché-Wanty-Gobert']},
+    'Movistar Team': {'level': WORLDTEAM, 'aliases': [
+        'Movistar']},
+    'NSN Cycling': {'level': WORLDTEAM, 'aliases': [
+        'NSN Cycling Team', 'Israel-Premier Tech', 'Israel Premier Tech', 'Israel']},
+    'Red Bull-BORA-hansgrohe': {'level': WORLDTEAM, 'aliases': [
+        'BORA-hansgrohe', 'Red Bull-BORA', 'Red Bull Bora']},
+    'Soudal Quick-Step': {'level': WORLDTEAM, 'aliases': [
+        'Soudal-QS', 'Quick-Step', 'Deceuninck-Quick-Step', 'Quick-Step Alpha Vinyl']},
+    'Team Jayco-AlUla': {'level': WORLDTEAM, 'aliases': [
+        'Jayco', 'GreenEDGE']},
+    'Team Picnic-PostNL': {'level': WORLDTEAM, 'aliases': [
+        'Picnic', 'Team dsm-firmenich PostNL', 'dsm-firmenich PostNL', 'Team DSM']},
+    'Team Visma-Lease a Bike': {'level': WORLDTEAM, 'aliases': [
+        'Visma-LAB', 'Visma', 'Jumbo-Visma', 'Team Jumbo-Visma']},
+    'UAE Team Emirates-XRG': {'level': WORLDTEAM, 'aliases': [
+        'UAE Team Emirates', 'UAE Emirates', 'UAE']},
+    'Uno-X Mobility': {'level': WORLDTEAM, 'aliases': [
+        'Uno-X', 'Uno-X Pro Cycling']},
+    'XDS Astana': {'level': WORLDTEAM, 'aliases': [
+        'XDS Astana Team', 'Astana', 'Astana Qazaqstan']},
+    'Burgos-Burpellet-BH': {'level': PROTEAM, 'aliases': ['Burgos-BH']},
+    'Equipo Kern Pharma': {'level': PROTEAM, 'aliases': ['Kern Pharma']},
+    'Euskaltel-Euskadi': {'level': PROTEAM, 'aliases': []},
+    'MBH Bank CSB': {'level': PROTEAM, 'aliases': ['MBH Bank Colpack Ballan']},
+    'Pinarello-Q36.5': {'level': PROTEAM, 'aliases': ['Q36.5', 'Q36.5 Pro Cycling Team']},
+    'Team Polti-VisitMalta': {'level': PROTEAM, 'aliases': ['Polti-Kometa', 'Team Polti']},
+    'Team TotalEnergies': {'level': PROTEAM, 'aliases': ['TotalEnergies']},
+    'Unibet Rose Rockets': {'level': PROTEAM, 'aliases': ['Unibet Tietema Rockets']},
+}
+
+# Palavras que não distinguem equipas
+GENERIC_TOKENS = {'team', 'cycling', 'pro', 'procycling', 'equipo', 'equipe', 'the'}
+
+# Hífens, travessões e outros separadores que a Wikipedia/PCS usam
+_SEPARATORS = dict.fromkeys(map(ord, '‐‑‒–—―−-_/.,'), ' ')
+_NON_ALNUM = re.compile(r'[^a-z0-9 ]+')
+_YEAR = re.compile(r'^(19|20)\d\d$')
+
+
+def team_key(name: str) -> str:
+    """
+    Chave normalizada de um nome de equipa.
+
+    Ex: "Alpecin–Premier Tech", "alpecin-premier-tech-2026" e
+    "Premier Tech Alpecin" dão todos "alpecin premier tech".
+    """
+    text = unicodedata.normalize('NFKD', name or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    text = _NON_ALNUM.sub(' ', text.translate(_SEPARATORS))
+    tokens = [t for t in text.split() if t not in GENERIC_TOKENS and not _YEAR.match(t)]
+    return ' '.join(sorted(tokens))
+
+
+def _build_index() -> Dict[str, str]:
+    index = {}
+    for canonical, info in TEAMS.items():
+        for alias in [canonical] + info['aliases']:
+            key = team_key(alias)
+            if key in index and index[key] != canonical:
+                raise ValueError(f"Alias ambíguo '{alias}': {index[key]} / {canonical}")
+            index[key] = canonical
+    return index
+
+
+# Chave normalizada -> nome canónico
+TEAM_INDEX: Dict[str, str] = _build_index()
+
+
+@lru_cache(maxsize=4096)
+def resolve_team(name: str) -> Optional[str]:
+    """Nome canónico de uma equipa conhecida, ou None."""
+    if not name:
+        return None
+    return TEAM_INDEX.get(team_key(name))
+
+
+def canonical_team(name: str) -> str:
+    """Nome canónico se a equipa for conhecida; senão o nome original (sem espaços a mais)."""
+    name = (name or '').strip()
+    return resolve_team(name) or name
+
+
+def team_level(name: str) -> Optional[str]:
+    """WT / PRT para equipas conhecidas, None para as restantes."""
+    canonical = resolve_team(name)
+    return TEAMS[canonical]['level'] if canonical else None
+
+
+def group_by_team(records: Iterable) -> Dict[str, List]:
+    """Agrupa registos (com atributo .team) pelo nome canónico da equipa."""
+    groups: Dict[str, List] = {}
+    for record in records:
+        groups.setdefault(canonical_team(record.team), []).append(record)
+    return groups
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+TipoNormalizer em lote: tipo de prova (BTT, Estrada, Gravel) para milhares
+de provas de uma vez.
+
+Faz o mesmo que TipoNormalizer.normalizeAdvanced / detectFromText da app,
+mas em vez de percorrer as listas de palavras-chave para cada prova:
+
+- todas as palavras-chave vão para um só autómato Aho-Corasick
+  (pyahocorasick), corrido uma vez sobre os textos de todas as provas
+  juntos (separados por '\\0');
+- o autómato dá todas as ocorrências, mesmo sobrepostas (ex.: "xc" dentro
+  de "xc marathon"), por isso o resultado é igual ao contains() do Kotlin;
+- a presença das palavras (provas x palavras) vezes a matriz de pesos dá
+  as pontuações BTT / Estrada / Gravel, e a decisão é vetorizada.
+
+Uso:
+    pip install numpy pyahocorasick
+    python tipo_normalizer.py provas.csv [output.csv]
+    python tipo_normalizer.py --bench [n_provas]
+
+provas.csv: cabeçalho com os campos de ProvaEntity (nome[,tipo][,urlInscricao][,descricao]);
+também aceita url. A saída é o mesmo CSV com a coluna tipo normalizada.
+"""
+
+import csv
+import sys
+import time
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+    import ahocorasick
+except ImportError:
+    print("A instalar numpy e pyahocorasick...")
+    import subprocess
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "numpy", "pyahocorasick"])
+    import numpy as np
+    import ahocorasick
+
+from rider_record import read_rows
+
+TYPES = ['BTT', 'Estrada', 'Gravel']
+BTT, ESTRADA, GRAVEL = range(len(TYPES))
+
+MIN_THRESHOLD = 5
+URL_WEIGHT = 15
+WEB_CONTENT_LIMIT = 5000
+
+# Palavras-chave com pesos (maior = mais confiança), como no TipoNormalizer
+BTT_KEYWORDS: Dict[str, int] = {
+    "btt": 10, "mtb": 10, "mountain bike": 10, "mountainbike": 10, "xco": 8,
+    "xc marathon": 8, "xc": 6, "cross country": 8, "marathon btt": 10, "enduro": 8,
+    "downhill": 8, "dh ": 7, "trilhos": 6, "trail": 5, "todo-o-terreno": 8,
+    "todo terreno": 8, "off-road": 6, "offroad": 6, "singletracks": 7, "singletrack": 7,
+    "bike park": 7, "maratona btt": 10, "rally btt": 10, "passeio btt": 10,
+    "subida btt": 10, "descida": 5, "monte": 3, "serra": 3, "floresta": 3,
+    "rota de btt": 10, "rota btt": 10, "percurso btt": 10, "circuito btt": 10,
+    "desafio btt": 10, "bttrack": 10, "xc maratona": 8, "marathon mtb": 10,
+    "maratona mtb": 10, "passeio de btt": 10, "passeio mtb": 10, "raid btt": 10,
+    "raid mtb": 10, "ecovia": 4, "ciclovia": 3, "caminho": 2, "ecopista": 3,
+}
+
+ESTRADA_KEYWORDS: Dict[str, int] = {
+    "estrada": 10, "road": 10, "gran fondo": 10, "granfondo": 10, "gf ": 8,
+    "clássica": 8, "classica": 8, "pista": 6, "criterium": 8, "contra-relógio": 8,
+    "contra relógio": 8, "crono": 7, "time trial": 8, "tt ": 6, "ciclismo de estrada": 10,
+    "prova de estrada": 10, "volta": 5, "tour": 4, "asfalto": 6, "pelotão": 5,
+}
+
+GRAVEL_KEYWORDS: Dict[str, int] = {
+    "gravel": 10, "all road": 8, "allroad": 8, "ciclocross": 8, "cyclocross": 8,
+    "cx ": 6, "misto": 5, "mixed terrain": 7, "adventure cycling": 7,
+    "bikepacking": 6, "ultraciclismo": 5,
+}
+
+BTT_URL_PATTERNS = [
+    "/btt", "-btt", "_btt", "btt-", "btt_", "btt.",
+    "/mtb", "-mtb", "_mtb", "mtb-", "mtb_", "mtb.",
+    "mountainbike", "mountain-bike",
+    "/enduro", "-enduro",
+    "/downhill", "-downhill",
+    "/xco", "-xco",
+    "/trilhos", "-trilhos",
+]
+
+GRAVEL_URL_PATTERNS = [
+    "/gravel", "-gravel", "_gravel", "gravel-", "gravel_", "gravel.",
+    "ciclocross", "cyclocross",
+]
+
+SEPARATOR = '\0'
+
+
+class KeywordMatcher:
+    """Um autómato para um conjunto de palavras-chave, com pesos por tipo."""
+
+    def __init__(self, keyword_weights: Sequence[Dict[str, int]]):
+        keywords = sorted({k for weights in keyword_weights for k in weights})
+        self.keywords = keywords
+        self.automaton = ahocorasick.Automaton()
+        for j, keyword in enumerate(keywords):
+            self.automaton.add_word(keyword, j)
+        self.automaton.make_automaton()
+
+        self.weights = np.zeros((len(keywords), len(keyword_weights)), dtype=np.int32)
+        for t, weights in enumerate(keyword_weights):
+            for keyword, weight in weights.items():
+                self.weights[keywords.index(keyword), t] = weight
+
+    def presence(self, texts: Sequence[str]) -> np.ndarray:
+        """Matriz bool textos x palavras: a palavra aparece no texto (contains)."""
+        present = np.zeros((len(texts), len(self.keywords)), dtype=bool)
+        if not texts:
+            return present
+        joined = SEPARATOR.join(texts)
+        ends, columns = [], []
+        for end, column in self.automaton.iter(joined):
+            ends.append(end)
+            columns.append(column)
+        if ends:
+            starts = np.cumsum([0] + [len(t) + 1 for t in texts[:-1]])
+            rows = np.searchsorted(starts, ends, side='right') - 1
+            present[rows, columns] = True
+        return present
+
+    def scores(self, texts: Sequence[str]) -> np.ndarray:
+        """Pontuação de cada texto para cada conjunto de palavras (textos x conjuntos)."""
+        return self.presence(texts).astype(np.int32) @ self.weights
+
+
+TEXT_MATCHER = KeywordMatcher([BTT_KEYWORDS, ESTRADA_KEYWORDS, GRAVEL_KEYWORDS])
+URL_MATCHER = KeywordMatcher([{p: URL_WEIGHT for p in BTT_URL_PATTERNS}, {},
+                              {p: URL_WEIGHT for p in GRAVEL_URL_PATTERNS}])
+
+
+def normalize(texts: Sequence[str]) -> List[str]:
+    """TipoNormalizer.normalize / detectFromText: BTT > Gravel > Estrada por presença."""
+    scores = TEXT_MATCHER.scores([t.lower() for t in texts])
+    result = np.where(scores[:, BTT] > 0, BTT, np.where(scores[:, GRAVEL] > 0, GRAVEL, ESTRADA))
+    return [TYPES[t] for t in result.tolist()]
+
+
+def normalize_advanced(tipos: Sequence[str], nomes: Sequence[str],
+                       urls: Optional[Sequence[str]] = None,
+                       descricoes: Optional[Sequence[str]] = None) -> List[str]:
+    """TipoNormalizer.normalizeAdvanced para todas as provas de uma vez."""
+    n = len(nomes)
+    urls = urls if urls is not None else [''] * n
+    descricoes = descricoes if descricoes is not None else [''] * n
+    texts = [f"{t} {nome} {d}".lower() for t, nome, d in zip(tipos, nomes, descricoes)]
+
+    scores = TEXT_MATCHER.scores(texts) + URL_MATCHER.scores([u.lower() for u in urls])
+    btt, estrada, gravel = scores[:, BTT], scores[:, ESTRADA], scores[:, GRAVEL]
+
+    simple = np.array([TYPES.index(t) for t in normalize(list(tipos))], dtype=np.int64)
+    has_tipo = np.array([bool(t.strip()) for t in tipos], dtype=bool)
+    result = np.select(
+        [
+            (btt >= MIN_THRESHOLD) & (btt > estrada) & (btt > gravel),
+            (gravel >= MIN_THRESHOLD) & (gravel > estrada) & (gravel >= btt),
+            estrada >= MIN_THRESHOLD,
+            has_tipo,
+        ],
+        [BTT, GRAVEL, ESTRADA, simple],
+        default=ESTRADA,
+    )
+    return [TYPES[t] for t in result.tolist()]
+
+
+def detect_from_web_content(nomes: Sequence[str], urls: Sequence[str],
+                            page_contents: Sequence[str]) -> List[str]:
+    """detectFromWebContent: só os primeiros 5000 caracteres de cada página."""
+    return normalize_advanced([''] * len(nomes), nomes, urls,
+                              [c[:WEB_CONTENT_LIMIT].lower() for c in page_contents])
+
+
+def reference_normalize(tipo: str) -> str:
+    """normalize escalar: BTT se tiver palavra BTT, senão Gravel, senão Estrada."""
+    tipo_lower = tipo.lower()
+    if any(k in tipo_lower for k in BTT_KEYWORDS):
+        return 'BTT'
+    if any(k in tipo_lower for k in GRAVEL_KEYWORDS):
+        return 'Gravel'
+    return 'Estrada'
+
+
+def reference_normalize_advanced(tipo: str, nome: str, url: str = '', descricao: str = '') -> str:
+    """Versão escalar, linha a linha como no Kotlin, para verificar normalize_advanced."""
+    full_text = f"{tipo} {nome} {descricao}".lower()
+    url_lower = url.lower()
+    btt = sum(w for k, w in BTT_KEYWORDS.items() if k in full_text)
+    estrada = sum(w for k, w in ESTRADA_KEYWORDS.items() if k in full_text)
+    gravel = sum(w for k, w in GRAVEL_KEYWORDS.items() if k in full_text)
+    btt += URL_WEIGHT * sum(p in url_lower for p in BTT_URL_PATTERNS)
+    gravel += URL_WEIGHT * sum(p in url_lower for p in GRAVEL_URL_PATTERNS)
+
+    if btt >= MIN_THRESHOLD and btt > estrada and btt > gravel:
+        return 'BTT'
+    if gravel >= MIN_THRESHOLD and gravel > estrada and gravel >= btt:
+        return 'Gravel'
+    if estrada >= MIN_THRESHOLD:
+        return 'Estrada'
+    if tipo.strip():
+        return reference_normalize(tipo)
+    return 'Estrada'
+
+
+def random_provas(rng, n: int):
+    """Títulos, tipos, URLs e descrições sintéticos com as palavras-chave misturadas."""
+    words = list(BTT_KEYWORDS) + list(ESTRADA_KEYWORDS) + list(GRAVEL_KEYWORDS)
+    filler = ('a prova decorre no dia com partida da praça central e chegada junto ao pavilhão '
+              'municipal inscrições abertas até ao limite de participantes seguro incluído '
+              'abastecimentos ao longo do percurso').split()
+    vocab = words + filler * 20
+
+    def sentence(k):
+        return ' '.join(vocab[i] for i in rng.integers(0, len(vocab), k))
+
+    tipos = [rng.choice(['', 'Estrada', 'BTT', 'XCO', 'Gravel', 'Pista', 'Outro']) for _ in range(n)]
+    nomes = [sentence(4).title() for _ in range(n)]
+    urls = [f"https://site{i}.pt/{rng.choice(BTT_URL_PATTERNS + GRAVEL_URL_PATTERNS + ['/evento'])}x"
+            for i in range(n)]
+    descricoes = [sentence(60) for _ in range(n)]
+    return tipos, nomes, urls, descricoes
+
+
+def benchmark(n: int = 10_000, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    tipos, nomes, urls, descricoes = random_provas(rng, n)
+
+    t0 = time.perf_counter()
+    result = normalize_advanced(tipos, nomes, urls, descricoes)
+    batch_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    expected = [reference_normalize_advanced(*row) for row in zip(tipos, nomes, urls, descricoes)]
+    scalar_time = time.perf_counter() - t0
+
+    counts = {t: result.count(t) for t in TYPES}
+    print(f"{n:,} provas ({sum(map(len, descricoes)) / 1e6:.1f}M caracteres de descrição):")
+    print(f"  em lote:  {batch_time * 1000:8.1f} ms")
+    print(f"  escalar:  {scalar_time * 1000:8.1f} ms")
+    print(f"  {counts}")
+
+    for i, (got, want) in enumerate(zip(result, expected)):
+        if got != want:
+            raise AssertionError(f"Prova {i} '{nomes[i]}': {got} != {want}")
+    if normalize(nomes) != [reference_normalize(t) for t in nomes]:
+        raise AssertionError("normalize diferente da versão escalar")
+    print("  Igual à versão escalar ✓")
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--bench':
+        benchmark(int(args[1]) if len(args) > 1 else 10_000)
+        return
+
+    if len(args) not in (1, 2):
+        print("Uso: python tipo_normalizer.py provas.csv [output.csv]")
+        print("     python tipo_normalizer.py --bench [n_provas]")
+        sys.exit(1)
+
+    input_file = args[0]
+    output_file = args[1] if len(args) > 1 else input_file
+    rows = read_rows(input_file)
+    if not rows or 'nome' not in rows[0]:
+        print(f"Erro: {input_file} não tem a coluna nome")
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    tipos = normalize_advanced([r.get('tipo') or '' for r in rows],
+                               [r.get('nome') or '' for r in rows],
+                               [r.get('urlInscricao') or r.get('url') or '' for r in rows],
+                               [r.get('descricao') or '' for r in rows])
+    elapsed = time.perf_counter() - t0
+
+    fieldnames = list(rows[0].keys())
+    if 'tipo' not in fieldnames:
+        fieldnames.append('tipo')
+    changed = 0
+    for row, tipo in zip(rows, tipos):
+        changed += row.get('tipo') != tipo
+        row['tipo'] = tipo
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    counts = {t: tipos.count(t) for t in TYPES}
+    print(f"✓ {len(rows)} provas em {elapsed * 1000:.0f} ms ({changed} tipos alterados) -> {output_file}")
+    for tipo, count in counts.items():
+        print(f"  {tipo}: {count}")
+
+
+if __name__ == '__main__':
+    main()
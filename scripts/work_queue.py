@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Fila de trabalho com leases (SQLite) para enriquecer ciclistas em paralelo.
+
+O enrich_cyclists.py e o extract_riders.py buscam os ciclistas um a um num só
+processo. Para um backfill grande (todos os ciclistas, várias épocas) este
+script põe os ciclistas numa fila durável e vários workers (processos ou
+máquinas) vão tirando trabalho até a fila esvaziar:
+
+- cada job é um ciclista de uma source (enrich_cyclists, extract_riders),
+  único por (source, key) — voltar a pôr o mesmo ficheiro na fila não duplica;
+- um worker recebe um lote de jobs com lease de LEASE_SECONDS segundos e uma
+  thread de heartbeat vai renovando o lease enquanto trabalha;
+- se o worker morrer, o lease expira e outro worker volta a pegar no job; só
+  quem tem o lease pode concluir o job, por isso um worker atrasado não
+  escreve por cima de outro;
+- falhas voltam para a fila até MAX_ATTEMPTS tentativas e depois ficam como
+  'failed' (o comando requeue volta a pô-las pendentes);
+- export escreve o CSV de saída pela ordem em que os ciclistas entraram.
+
+O jobs.db é um ficheiro SQLite em WAL: vários processos na mesma máquina
+partilham-no sem problemas; entre máquinas só num disco partilhado com locks
+fiáveis (não NFS), e os relógios têm de estar sincronizados porque os leases
+são timestamps.
+
+Uso:
+    python work_queue.py enqueue jobs.db enrich_cyclists input.csv
+    python work_queue.py enqueue jobs.db extract_riders urls.txt
+    python work_queue.py worker jobs.db enrich_cyclists [--processes N]
+    python work_queue.py status jobs.db
+    python work_queue.py export jobs.db enrich_cyclists output.csv
+    python work_queue.py requeue jobs.db enrich_cyclists
+    python work_queue.py --bench [n_jobs]
+"""
+
+import importlib
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from refresh_scheduler import read_input, rider_key
+from rider_record import RiderRecord, write_csv
+
+LEASE_SECONDS = 60.0
+MAX_ATTEMPTS = 3
+BATCH = 4
+# Sem jobs livres, de quanto em quanto tempo ver se os outros workers acabaram
+POLL_SECONDS = 1.0
+
+# source -> (módulo com queue_job(payload), CSV exportado com cabeçalho, pausa entre pedidos)
+SOURCES = {
+    'enrich_cyclists': ('enrich_cyclists', True, 1.5),
+    'extract_riders': ('extract_riders', False, 0.5),
+}
+
+Handler = Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+class WorkQueue:
+    """Tabela jobs num ficheiro SQLite; cada operação é uma transação curta."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY, source TEXT NOT NULL, key TEXT NOT NULL,
+            payload TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'pending',
+            worker TEXT, lease_until REAL NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0, result TEXT, error TEXT,
+            updated_at REAL NOT NULL DEFAULT 0,
+            UNIQUE (source, key)
+        );
+        CREATE INDEX IF NOT EXISTS jobs_status ON jobs (source, status);
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(self.SCHEMA)
+
+    def _transaction(self, fn: Callable[[], Any]) -> Any:
+        # IMMEDIATE: o lock de escrita é pedido logo, dois workers não leem os mesmos jobs
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            value = fn()
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+        return value
+
+    def enqueue(self, source: str, jobs: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """Acrescenta jobs (key, payload); os que já existem são ignorados. Retorna os novos."""
+        rows = [(source, key, json.dumps(payload, ensure_ascii=False), time.time())
+                for key, payload in jobs]
+
+        def insert():
+            before = self.conn.total_changes
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO jobs (source, key, payload, updated_at) VALUES (?, ?, ?, ?)', rows)
+            return self.conn.total_changes - before
+        return self._transaction(insert)
+
+    def lease(self, worker: str, source: str, n: int = BATCH,
+              lease_seconds: float = LEASE_SECONDS) -> List[Dict[str, Any]]:
+        """Até n jobs pendentes (ou com lease expirado) para este worker."""
+        def take():
+            now = time.time()
+            # Leases expirados que já gastaram as tentativas todas não voltam à fila
+            self.conn.execute(
+                "UPDATE jobs SET status = 'failed', worker = NULL, error = 'lease expirou', "
+                "updated_at = ? WHERE source = ? AND status = 'leased' AND lease_until < ? "
+                "AND attempts >= ?", (now, source, now, MAX_ATTEMPTS))
+            rows = self.conn.execute(
+                "SELECT id, key, payload, attempts FROM jobs WHERE source = ? AND "
+                "(status = 'pending' OR (status = 'leased' AND lease_until < ?)) "
+                "ORDER BY id LIMIT ?", (source, now, n)).fetchall()
+            self.conn.executemany(
+                "UPDATE jobs SET status = 'leased', worker = ?, lease_until = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                [(worker, now + lease_seconds, now, job_id) for job_id, _, _, _ in rows])
+            return [{'id': job_id, 'key': key, 'payload': json.loads(payload), 'attempts': attempts + 1}
+                    for job_id, key, payload, attempts in rows]
+        return self._transaction(take)
+
+    def heartbeat(self, worker: str, job_ids: Sequence[int],
+                  lease_seconds: float = LEASE_SECONDS) -> int:
+        """Renova os leases que este worker ainda tem. Retorna quantos renovou."""
+        now = time.time()
+        return self._transaction(lambda: self.conn.executemany(
+            "UPDATE jobs SET lease_until = ?, updated_at = ? "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            [(now + lease_seconds, now, job_id, worker) for job_id in job_ids]).rowcount)
+
+    def complete(self, worker: str, job_id: int, result: Dict[str, Any]) -> bool:
+        """Conclui o job. False se o lease já não é deste worker (expirou e outro pegou nele)."""
+        return self._transaction(lambda: self.conn.execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, updated_at = ? "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            (json.dumps(result, ensure_ascii=False), time.time(), job_id, worker)).rowcount == 1)
+
+    def fail(self, worker: str, job_id: int, error: str) -> bool:
+        """Devolve o job à fila (ou marca-o 'failed' ao fim de MAX_ATTEMPTS tentativas)."""
+        return self._transaction(lambda: self.conn.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker = NULL, lease_until = 0, error = ?, updated_at = ? "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            (MAX_ATTEMPTS, error, time.time(), job_id, worker)).rowcount == 1)
+
+    def next_expiry(self, source: str) -> Optional[float]:
+        """Quando expira o próximo lease de outro worker (None se nada está em curso)."""
+        return self.conn.execute(
+            "SELECT MIN(lease_until) FROM jobs WHERE source = ? AND status = 'leased'",
+            (source,)).fetchone()[0]
+
+    def requeue(self, source: str) -> int:
+        """Volta a pôr os jobs 'failed' pendentes, com as tentativas a zero."""
+        return self._transaction(lambda: self.conn.execute(
+            "UPDATE jobs SET status = 'pending', attempts = 0, updated_at = ? "
+            "WHERE source = ? AND status = 'failed'", (time.time(), source)).rowcount)
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """{source: {status: n}}"""
+        counts: Dict[str, Dict[str, int]] = {}
+        for source, status, n in self.conn.execute(
+                'SELECT source, status, COUNT(*) FROM jobs GROUP BY source, status'):
+            counts.setdefault(source, {})[status] = n
+        return counts
+
+    def results(self, source: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """(key, resultado) dos jobs concluídos, pela ordem em que entraram na fila."""
+        for key, result in self.conn.execute(
+                "SELECT key, result FROM jobs WHERE source = ? AND status = 'done' ORDER BY id",
+                (source,)):
+            yield key, json.loads(result)
+
+    def failures(self, source: str) -> List[Tuple[str, int, str]]:
+        """(key, tentativas, erro) dos jobs 'failed'."""
+        return self.conn.execute(
+            "SELECT key, attempts, error FROM jobs WHERE source = ? AND status = 'failed' ORDER BY id",
+            (source,)).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+class Heartbeat(threading.Thread):
+    """Renova os leases dos jobs em mãos a cada terço do lease (com a sua própria ligação)."""
+
+    def __init__(self, path: str, worker: str, lease_seconds: float):
+        super().__init__(daemon=True)
+        self.path = path
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.held: set = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def hold(self, job_ids: Iterable[int]):
+        with self.lock:
+            self.held.update(job_ids)
+
+    def release(self, job_id: int):
+        with self.lock:
+            self.held.discard(job_id)
+
+    def run(self):
+        queue = WorkQueue(self.path)
+        try:
+            while not self.stopped.wait(self.lease_seconds / 3):
+                with self.lock:
+                    job_ids = list(self.held)
+                if job_ids:
+                    queue.heartbeat(self.worker, job_ids, self.lease_seconds)
+        finally:
+            queue.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def worker_id() -> str:
+    """Identificador único do worker: máquina, processo e um sufixo aleatório."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def handler_for(source: str) -> Handler:
+    """queue_job do script da source (importado só no worker)."""
+    if source not in SOURCES:
+        raise ValueError(f"Source desconhecida '{source}' (usar {', '.join(SOURCES)})")
+    return importlib.import_module(SOURCES[source][0]).queue_job
+
+
+def run_worker(path: str, source: str, handler: Optional[Handler] = None,
+               batch: int = BATCH, lease_seconds: float = LEASE_SECONDS,
+               delay: Optional[float] = None, worker: Optional[str] = None,
+               poll_seconds: float = POLL_SECONDS) -> Tuple[int, int]:
+    """
+    Tira jobs da fila até não haver pendentes nem leases de outros workers
+    em curso (espera que expirem, para apanhar os de workers que morreram).
+    Retorna (concluídos, falhados) por este worker.
+    """
+    handler = handler or handler_for(source)
+    delay = SOURCES.get(source, (None, None, 0.0))[2] if delay is None else delay
+    worker = worker or worker_id()
+    queue = WorkQueue(path)
+    heartbeat = Heartbeat(path, worker, lease_seconds)
+    heartbeat.start()
+    done = failed = 0
+    try:
+        while True:
+            jobs = queue.lease(worker, source, batch, lease_seconds)
+            if not jobs:
+                expiry = queue.next_expiry(source)
+                if expiry is None:
+                    break
+                time.sleep(min(max(expiry - time.time(), 0.0) + 0.01, poll_seconds))
+                continue
+            heartbeat.hold(job['id'] for job in jobs)
+            for job in jobs:
+                try:
+                    result, error = handler(job['payload']), 'sem dados'
+                except Exception as e:
+                    result, error = None, f"{type(e).__name__}: {e}"
+                if result is not None and queue.complete(worker, job['id'], result):
+                    done += 1
+                elif result is None and queue.fail(worker, job['id'], error):
+                    failed += 1
+                heartbeat.release(job['id'])
+                if delay:
+                    time.sleep(delay)
+    finally:
+        heartbeat.stop()
+        queue.close()
+    return done, failed
+
+
+def run_workers(path: str, source: str, processes: int, **kwargs) -> float:
+    """Lança `processes` workers nesta máquina e espera por todos. Retorna os segundos."""
+    import multiprocessing
+    t0 = time.perf_counter()
+    workers = [multiprocessing.Process(target=run_worker, args=(path, source), kwargs=kwargs)
+               for _ in range(processes)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+    return time.perf_counter() - t0
+
+
+def read_jobs(source: str, input_file: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """Jobs a partir do ficheiro de entrada de cada script."""
+    if source == 'enrich_cyclists':
+        # O mesmo CSV do enrich_cyclists.py (Nome,Equipa,Ranking,URL)
+        return [(rider_key(r['url']), {'name': r['name'], 'team': r['team'],
+                                       'ranking': r['ranking'], 'url': r['url']})
+                for r in read_input(input_file) if r['url']]
+    if source == 'extract_riders':
+        # Um URL (ou slug) do PCS por linha, como no input do extract_riders.py
+        jobs = []
+        with open(input_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                url = line.strip()
+                if not url:
+                    continue
+                if 'rider/' not in url and not url.startswith('http'):
+                    url = f"rider/{url}"
+                jobs.append((rider_key(url), {'url': url, 'team': ''}))
+        return jobs
+    raise ValueError(f"Source desconhecida '{source}' (usar {', '.join(SOURCES)})")
+
+
+def export(queue: WorkQueue, source: str, output_file: str) -> int:
+    """Escreve o CSV de saída com os jobs concluídos. Retorna quantas linhas."""
+    records = [RiderRecord.from_row(row) for _, row in queue.results(source)]
+    write_csv(output_file, records, header=SOURCES[source][1])
+    return len(records)
+
+
+def _bench_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Um pedido HTTP simulado
+    time.sleep(payload['seconds'])
+    return {'n': payload['n']}
+
+
+def _crash_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Worker que morre com os leases na mão (sem fechar nada)
+    os._exit(1)
+
+
+def benchmark(n: int = 400, job_seconds: float = 0.02):
+    import multiprocessing
+    import tempfile
+
+    def fill(path: str, count: int) -> WorkQueue:
+        queue = WorkQueue(path)
+        queue.enqueue('bench', ((str(i), {'n': i, 'seconds': job_seconds}) for i in range(count)))
+        return queue
+
+    def check(queue: WorkQueue, count: int):
+        keys = [int(key) for key, result in queue.results('bench') if result['n'] == int(key)]
+        if sorted(keys) != list(range(count)) or queue.counts()['bench'] != {'done': count}:
+            raise AssertionError(f"fila por concluir: {queue.counts()}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        print(f"{n} jobs de {job_seconds * 1000:.0f} ms:")
+        base = None
+        for processes in (1, 2, 4, 8):
+            path = os.path.join(folder, f'jobs_{processes}.db')
+            queue = fill(path, n)
+            seconds = run_workers(path, 'bench', processes, handler=_bench_job, delay=0,
+                                  poll_seconds=0.05)
+            check(queue, n)
+            queue.close()
+            base = base or seconds
+            print(f"  {processes} workers: {seconds:5.2f}s  {n / seconds:6.0f} jobs/s  "
+                  f"{base / seconds:4.1f}x  ✓")
+
+        path = os.path.join(folder, 'jobs_crash.db')
+        queue = fill(path, n // 4)
+        crasher = multiprocessing.Process(target=run_worker, args=(path, 'bench'),
+                                          kwargs={'handler': _crash_job, 'batch': 5, 'lease_seconds': 1.0})
+        crasher.start()
+        crasher.join()
+        run_workers(path, 'bench', 4, handler=_bench_job, delay=0, lease_seconds=1.0,
+                    poll_seconds=0.05)
+        check(queue, n // 4)
+        retried = queue.conn.execute("SELECT COUNT(*) FROM jobs WHERE attempts = 2").fetchone()[0]
+        queue.close()
+        if retried != 5:
+            raise AssertionError(f"{retried} jobs repetidos em vez dos 5 do worker que morreu")
+        print(f"✓ Worker morto com 5 leases (exit {crasher.exitcode}): os 5 jobs voltaram à fila "
+              f"quando o lease expirou, {n // 4} concluídos uma só vez")
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == '--bench':
+        benchmark(int(args[1]) if len(args) > 1 else 400)
+        return
+
+    processes = 1
+    if '--processes' in args:
+        pos = args.index('--processes')
+        processes = int(args[pos + 1])
+        del args[pos:pos + 2]
+
+    command = args[0] if args else ''
+    arity = {'enqueue': 4, 'worker': 3, 'status': 2, 'export': 4, 'requeue': 3}
+    if arity.get(command) != len(args):
+        print("Uso: python work_queue.py enqueue jobs.db enrich_cyclists|extract_riders input")
+        print("     python work_queue.py worker jobs.db source [--processes N]")
+        print("     python work_queue.py status jobs.db")
+        print("     python work_queue.py export jobs.db source output.csv")
+        print("     python work_queue.py requeue jobs.db source")
+        print("     python work_queue.py --bench [n_jobs]")
+        sys.exit(1)
+
+    path = args[1]
+    queue = WorkQueue(path)
+    if command == 'enqueue':
+        jobs = read_jobs(args[2], args[3])
+        print(f"✓ {queue.enqueue(args[2], jobs)} jobs novos em {path} ({len(jobs)} lidos)")
+    elif command == 'worker':
+        handler_for(args[2])
+        queue.close()
+        if processes > 1:
+            seconds = run_workers(path, args[2], processes)
+            print(f"✓ {processes} workers terminaram em {seconds:.0f}s")
+        else:
+            done, failed = run_worker(path, args[2])
+            print(f"✓ Worker terminou: {done} concluídos, {failed} falhados")
+        queue = WorkQueue(path)
+    elif command == 'status':
+        for source, counts in sorted(queue.counts().items()):
+            print(f"{source}: " + ', '.join(f"{status} {n}" for status, n in sorted(counts.items())))
+    elif command == 'export':
+        count = export(queue, args[2], args[3])
+        print(f"✓ {count} ciclistas exportados para {args[3]}")
+        failures = queue.failures(args[2])
+        if failures:
+            print(f"{len(failures)} jobs falhados (python work_queue.py requeue {path} {args[2]}):")
+            for key, attempts, error in failures[:20]:
+                print(f"  {key} ({attempts} tentativas): {error}")
+    elif command == 'requeue':
+        print(f"✓ {queue.requeue(args[2])} jobs voltaram à fila")
+    queue.close()
+
+
+if __name__ == '__main__':
+    main()